@@ -0,0 +1,43 @@
+"""Create fhir_export_jobs table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fhir_export_jobs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column(
+            "status",
+            sa.Enum("accepted", "in-progress", "completed", "failed", "cancelled", name="exportstatus"),
+            nullable=False,
+            index=True,
+        ),
+        sa.Column("resource_types", sa.String(255), nullable=False),
+        sa.Column("since", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("request_url", sa.String(1000), nullable=False),
+        sa.Column("requested_by_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("output", sa.JSON(), nullable=True),
+        sa.Column("resources_exported", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("transaction_time", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fhir_export_jobs")
+    sa.Enum(name="exportstatus").drop(op.get_bind(), checkfirst=True)
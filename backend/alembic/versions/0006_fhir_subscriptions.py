@@ -0,0 +1,46 @@
+"""Create fhir_subscriptions table
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fhir_subscriptions",
+        sa.Column("id", sa.Integer(), primary_key=True, index=True),
+        sa.Column(
+            "status",
+            sa.Enum("requested", "active", "error", "off", name="subscriptionstatus"),
+            nullable=False,
+            index=True,
+        ),
+        sa.Column("criteria", sa.String(500), nullable=False),
+        sa.Column("resource_type", sa.String(50), nullable=False, index=True),
+        sa.Column("reason", sa.Text(), nullable=True),
+        sa.Column("endpoint", sa.String(1000), nullable=False),
+        sa.Column("payload", sa.String(50), nullable=True),
+        sa.Column("headers", sa.JSON(), nullable=True),
+        sa.Column("end", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_by_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("last_delivered_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fhir_subscriptions")
+    sa.Enum(name="subscriptionstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,33 @@
+"""Create study_metadata_cache table
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "study_metadata_cache",
+        sa.Column("orthanc_study_id", sa.String(100), primary_key=True),
+        sa.Column("study_instance_uid", sa.String(255), nullable=False, index=True),
+        sa.Column("study", sa.JSON(), nullable=False),
+        sa.Column("series", sa.JSON(), nullable=False),
+        sa.Column("series_count", sa.Integer(), server_default="0"),
+        sa.Column("instances_count", sa.Integer(), server_default="0"),
+        sa.Column("fetched_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("study_metadata_cache")
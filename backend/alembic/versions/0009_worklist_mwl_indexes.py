@@ -0,0 +1,33 @@
+"""Composite indexes on dicom_worklist_entries for MWL C-FIND
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_dicom_worklist_entries_status_modality_scheduled",
+        "dicom_worklist_entries",
+        ["status", "modality", "scheduled_datetime"],
+    )
+    op.create_index(
+        "ix_dicom_worklist_entries_status_ae_scheduled",
+        "dicom_worklist_entries",
+        ["status", "scheduled_station_ae_title", "scheduled_datetime"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dicom_worklist_entries_status_ae_scheduled", table_name="dicom_worklist_entries")
+    op.drop_index("ix_dicom_worklist_entries_status_modality_scheduled", table_name="dicom_worklist_entries")
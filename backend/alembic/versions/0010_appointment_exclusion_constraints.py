@@ -0,0 +1,63 @@
+"""Exclusion constraints against double-booking of resources and patients
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_HOLDS_SLOT = "status NOT IN ('cancelled', 'noshow')"
+
+
+def upgrade() -> None:
+    # GiST operator classes for plain scalar columns (resource_id WITH =)
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.add_column(
+        "appointments",
+        sa.Column(
+            "during",
+            postgresql.TSTZRANGE(),
+            sa.Computed("tstzrange(start_datetime, end_datetime, '[)')", persisted=True),
+            nullable=False,
+        ),
+    )
+
+    conn = op.get_bind()
+    for column in ("resource_id", "patient_id"):
+        overlaps = conn.execute(sa.text(
+            f"SELECT a.id, b.id FROM appointments a JOIN appointments b "
+            f"ON a.{column} = b.{column} AND a.id < b.id AND a.during && b.during "
+            f"WHERE a.{_HOLDS_SLOT} AND b.{_HOLDS_SLOT} LIMIT 20"
+        )).all()
+        if overlaps:
+            pairs = ", ".join(f"{a}/{b}" for a, b in overlaps)
+            raise RuntimeError(
+                f"Overlapping appointments on {column} must be cancelled before this migration: {pairs}"
+            )
+
+    op.create_exclude_constraint(
+        "appointments_resource_no_overlap", "appointments",
+        ("resource_id", "="), ("during", "&&"),
+        using="gist", where=_HOLDS_SLOT,
+    )
+    op.create_exclude_constraint(
+        "appointments_patient_no_overlap", "appointments",
+        ("patient_id", "="), ("during", "&&"),
+        using="gist", where=_HOLDS_SLOT,
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("appointments_patient_no_overlap", "appointments")
+    op.drop_constraint("appointments_resource_no_overlap", "appointments")
+    op.drop_column("appointments", "during")
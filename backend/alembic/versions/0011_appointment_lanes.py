@@ -0,0 +1,39 @@
+"""Appointment lanes so resources with capacity > 1 can hold parallel bookings
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_HOLDS_SLOT = "status NOT IN ('cancelled', 'noshow')"
+
+
+def upgrade() -> None:
+    # Existing bookings never overlap per resource (0010), so they all fit in lane 0
+    op.add_column("appointments", sa.Column("lane", sa.SmallInteger(), nullable=False, server_default="0"))
+    op.drop_constraint("appointments_resource_no_overlap", "appointments")
+    op.create_exclude_constraint(
+        "appointments_resource_no_overlap", "appointments",
+        ("resource_id", "="), ("lane", "="), ("during", "&&"),
+        using="gist", where=_HOLDS_SLOT,
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("appointments_resource_no_overlap", "appointments")
+    op.create_exclude_constraint(
+        "appointments_resource_no_overlap", "appointments",
+        ("resource_id", "="), ("during", "&&"),
+        using="gist", where=_HOLDS_SLOT,
+    )
+    op.drop_column("appointments", "lane")
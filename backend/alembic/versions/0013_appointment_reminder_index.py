@@ -0,0 +1,27 @@
+"""Index on appointments (reminder_sent, start_datetime) for the reminder dispatcher
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_appointments_reminder_sent_start",
+        "appointments",
+        ["reminder_sent", "start_datetime"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_appointments_reminder_sent_start", table_name="appointments")
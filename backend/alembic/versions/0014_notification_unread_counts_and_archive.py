@@ -0,0 +1,67 @@
+"""Unread-notification index and counters, notifications archive
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0014"
+down_revision: Union[str, None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A boolean on its own is a poor index; unread rows are found per user instead
+    op.drop_index("ix_notifications_is_read", table_name="notifications")
+    op.create_index(
+        "ix_notifications_user_unread",
+        "notifications",
+        ["user_id", "created_at"],
+        postgresql_where=sa.text("NOT is_read"),
+    )
+    op.create_index(
+        "ix_notifications_read_created",
+        "notifications",
+        ["created_at"],
+        postgresql_where=sa.text("is_read"),
+    )
+
+    op.create_table(
+        "notification_unread_counts",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("unread", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        "INSERT INTO notification_unread_counts (user_id, unread) "
+        "SELECT user_id, count(*) FROM notifications WHERE NOT is_read GROUP BY user_id"
+    )
+
+    op.create_table(
+        "notifications_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("user_id", sa.Integer(), nullable=False, index=True),
+        sa.Column("type", sa.String(50), nullable=False),
+        sa.Column("title", sa.String(255), nullable=False),
+        sa.Column("body", sa.Text(), nullable=True),
+        sa.Column("link", sa.String(500), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "INSERT INTO notifications (id, user_id, type, title, body, link, is_read, created_at) "
+        "SELECT id, user_id, type, title, body, link, true, created_at FROM notifications_archive"
+    )
+    op.drop_table("notifications_archive")
+    op.drop_table("notification_unread_counts")
+    op.drop_index("ix_notifications_read_created", table_name="notifications")
+    op.drop_index("ix_notifications_user_unread", table_name="notifications")
+    op.create_index("ix_notifications_is_read", "notifications", ["is_read"])
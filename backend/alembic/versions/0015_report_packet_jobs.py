@@ -0,0 +1,50 @@
+"""Create report_packet_jobs table, index reports by signing time
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0015"
+down_revision: Union[str, None] = "0014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Report packets select signed reports by date range
+    op.create_index("ix_radiology_reports_signed_at", "radiology_reports", ["signed_at"])
+
+    op.create_table(
+        "report_packet_jobs",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column(
+            "status",
+            sa.Enum("accepted", "in-progress", "completed", "failed", "cancelled", name="packetstatus"),
+            nullable=False,
+            index=True,
+        ),
+        sa.Column("format", sa.Enum("pdf", "zip", name="packetformat"), nullable=False),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+        sa.Column("date_from", sa.Date(), nullable=True),
+        sa.Column("date_to", sa.Date(), nullable=True),
+        sa.Column("requested_by_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("done", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("filename", sa.String(255), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("report_packet_jobs")
+    sa.Enum(name="packetformat").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="packetstatus").drop(op.get_bind(), checkfirst=True)
+    op.drop_index("ix_radiology_reports_signed_at", table_name="radiology_reports")
@@ -46,11 +46,100 @@ class Settings(BaseSettings):
     orthanc_password: str = "orthanc"
     orthanc_dicom_port: int = 4242
     orthanc_ae_title: str = "ORTHANC"
+    orthanc_timeout_seconds: float = 30.0
+    orthanc_connect_timeout_seconds: float = 5.0
+    orthanc_max_connections: int = 20
+    orthanc_max_keepalive_connections: int = 10
+    orthanc_keepalive_expiry_seconds: float = 30.0
+    orthanc_breaker_failure_threshold: int = 5
+    orthanc_breaker_reset_seconds: float = 30.0
+    # /changes poller (alternative to the per-study webhook)
+    orthanc_changes_poller_enabled: bool = False
+    orthanc_changes_poll_interval_seconds: float = 5.0
+    orthanc_changes_batch_limit: int = 200
+    orthanc_changes_concurrency: int = 8
 
     # ── DICOM / Worklist ───────────────────────────────────────────────
     worklist_dir: str = "/var/lib/orthanc/worklists"
     institution_name: str = "Hospital General"
     institution_ae_title: str = "HIS_RIS_SCP"
+    # Write one .wl file per order for Orthanc's worklist plugin
+    worklist_files_enabled: bool = True
+    worklist_writer_threads: int = 2  # dataset encoding is CPU-bound (GIL); more threads do not help
+    worklist_writer_batch_size: int = 200
+    # Active entries scheduled longer ago are cancelled by the reconciler
+    worklist_expiry_days: int = 7
+    # Built-in C-FIND SCP answering straight from dicom_worklist_entries
+    mwl_scp_enabled: bool = False
+    mwl_scp_ae_title: str = "HIS_RIS_MWL"
+    mwl_scp_port: int = 11112
+    mwl_scp_max_associations: int = 20
+    mwl_scp_max_results: int = 500
+    mwl_scp_query_timeout_seconds: float = 10.0
+
+    # ── Orders ─────────────────────────────────────────────────────────
+    orders_bulk_max_items: int = 1000
+
+    # ── Scheduling ─────────────────────────────────────────────────────
+    # Resource operating hours are wall-clock hours in this zone
+    schedule_timezone: str = "UTC"
+    slot_step_minutes: int = 15
+    slot_search_max_days: int = 60
+    # Utilization of days older than this is computed once and cached
+    utilization_cache_after_days: int = 2
+    utilization_max_days: int = 366
+
+    # ── Notifications ──────────────────────────────────────────────────
+    # Redis pub/sub channel fanning notification events out to all API replicas
+    notification_channel: str = "his_ris:notifications"
+    notification_stream_heartbeat_seconds: float = 15.0
+    notification_stream_queue_size: int = 100
+    # Lifetime of the ?token= used to open the stream (URLs end up in logs and history)
+    notification_stream_token_seconds: int = 60
+    # Read notifications older than this are moved to notifications_archive
+    notification_retention_days: int = 90
+    notification_archive_batch_size: int = 5000
+
+    # ── Appointment reminders ──────────────────────────────────────────
+    # Off until a real channel is configured; a pass marks the reminders as sent
+    reminders_enabled: bool = False
+    # Appointments starting within this many hours get their reminder
+    reminder_lead_hours: int = 24
+    reminder_batch_size: int = 200
+    reminder_concurrency: int = 10
+    # Comma-separated: smtp, http, log (local stand-in); empty = no pass runs
+    reminder_channels: str = ""
+    smtp_host: str = "localhost"
+    smtp_port: int = 587
+    smtp_username: str = ""
+    smtp_password: str = ""
+    smtp_use_tls: bool = True
+    smtp_from: str = "citas@hospital.local"
+    smtp_timeout_seconds: float = 10.0
+    # SMS/messaging gateway: POST {"to", "message"} with a bearer token
+    reminder_gateway_url: str = ""
+    reminder_gateway_token: str = ""
+    reminder_gateway_timeout_seconds: float = 10.0
+
+    # ── Study previews ─────────────────────────────────────────────────
+    preview_cache_dir: str = "/var/lib/his_ris/previews"
+    preview_cache_max_mb: int = 1024
+    preview_size: int = 256
+    preview_format: str = "webp"  # webp | png
+    preview_max_age_seconds: int = 7 * 24 * 3600
+
+    # ── Report PDFs ────────────────────────────────────────────────────
+    # signed/ keeps signed reports for good; drafts/ is an LRU cache
+    report_pdf_dir: str = "/var/lib/his_ris/reports"
+    report_pdf_cache_max_mb: int = 512
+    # ReportLab worker processes (0 = render in a thread)
+    report_pdf_workers: int = 2
+    # nginx internal location aliasing report_pdf_dir, e.g. /_report_pdfs (sendfile); empty = serve from the API
+    report_pdf_accel_redirect: str = ""
+    # Packets (batch downloads) are written under <report_pdf_dir>/packets
+    report_packet_max_reports: int = 1000
+    report_packet_batch_size: int = 50
+    report_packet_retention_hours: int = 24
 
     # ── HL7 ────────────────────────────────────────────────────────────
     hl7_listener_host: str = "0.0.0.0"
@@ -58,6 +147,25 @@ class Settings(BaseSettings):
     hl7_sending_facility: str = "HIS_RIS"
     hl7_receiving_facility: str = "PACS"
 
+    # ── FHIR Bulk Data ($export) ───────────────────────────────────────
+    fhir_export_dir: str = "/var/lib/his_ris/fhir_export"
+    fhir_export_batch_size: int = 5000
+    fhir_export_retention_hours: int = 24
+    fhir_bundle_max_entries: int = 1000
+
+    # ── FHIR Subscriptions (rest-hook) ─────────────────────────────────
+    fhir_subscription_workers: int = 4
+    fhir_subscription_queue_size: int = 10000
+    fhir_subscription_batch_size: int = 50
+    fhir_subscription_batch_wait_ms: int = 200
+    fhir_subscription_max_retries: int = 5
+    fhir_subscription_backoff_seconds: float = 1.0
+    fhir_subscription_rate_per_second: float = 5.0
+    fhir_subscription_burst: int = 10
+    fhir_subscription_timeout_seconds: float = 10.0
+    fhir_subscription_max_connections: int = 50
+    fhir_subscription_cache_ttl_seconds: int = 30
+
     # ── CORS ───────────────────────────────────────────────────────────
     allowed_origins: str = "http://localhost:3000,http://localhost:80"
 
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import io
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -68,13 +70,12 @@ def build_mwl_dataset(
     return ds
 
 
-def write_worklist_file(ds: Dataset, accession_number: str) -> str:
-    worklist_dir = Path(settings.worklist_dir)
-    worklist_dir.mkdir(parents=True, exist_ok=True)
+def worklist_file_path(accession_number: str) -> Path:
+    return Path(settings.worklist_dir) / f"{accession_number}.wl"
 
-    filename = f"{accession_number}.wl"
-    filepath = worklist_dir / filename
 
+def write_worklist_file(ds: Dataset, accession_number: str) -> str:
+    """Write the .wl file atomically (temp file + rename), so Orthanc never reads a partial file."""
     # Create file with proper DICOM meta
     file_meta = FileMetaDataset()
     file_meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.31"  # Modality Worklist
@@ -92,13 +93,32 @@ def write_worklist_file(ds: Dataset, accession_number: str) -> str:
     for elem in ds:
         file_ds.add(elem)
 
-    pydicom.dcmwrite(str(filepath), file_ds, write_like_original=False)
+    buf = io.BytesIO()
+    pydicom.dcmwrite(buf, file_ds, write_like_original=False)
+    return write_worklist_bytes(buf.getvalue(), accession_number)
+
+
+def write_worklist_bytes(data: bytes, accession_number: str) -> str:
+    """Atomically write an encoded .wl file (see ``app.core.mwl_encoder``)."""
+    filepath = worklist_file_path(accession_number)
+    # Not *.wl, so the worklist plugin ignores it until the rename
+    tmp = filepath.with_name(f".{filepath.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_bytes(data)
+    except FileNotFoundError:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_bytes(data)
+    try:
+        os.replace(tmp, filepath)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
     return str(filepath)
 
 
 def delete_worklist_file(accession_number: str) -> bool:
-    filepath = Path(settings.worklist_dir) / f"{accession_number}.wl"
-    if filepath.exists():
-        filepath.unlink()
+    try:
+        worklist_file_path(accession_number).unlink()
         return True
-    return False
+    except FileNotFoundError:
+        return False
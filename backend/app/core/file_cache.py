@@ -0,0 +1,92 @@
+"""
+Size-bounded on-disk file cache.
+
+Backs the DICOM preview cache and the draft report PDF cache.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FileCache:
+    """Content-addressed file cache with LRU eviction by total size.
+
+    Files live at ``<dir>/<key[:2]>/<key>.<ext>``; a hit refreshes the file's
+    mtime, and when the tracked size exceeds ``max_bytes`` the least recently
+    used files are removed until it is back under 90% of the limit.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def path(self, key: str, fmt: str) -> Path:
+        return self.root / key[:2] / f"{key}.{fmt}"
+
+    def get(self, key: str, fmt: str) -> Optional[Path]:
+        path = self.path(key, fmt)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, fmt: str, data: bytes) -> Path:
+        path = self.path(key, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    def evict(self) -> int:
+        """Drop least recently used files until the cache is under 90% of ``max_bytes``."""
+        with self._lock:
+            files = []
+            for entry in self._walk():
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            self._size = total
+        if removed:
+            logger.info(f"File cache {self.root}: evicted {removed} files ({total / 1e6:.1f} MB kept)")
+        return removed
+
+    def _scan_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._walk())
+
+    def _walk(self) -> Iterable[os.DirEntry]:
+        if not self.root.is_dir():
+            return
+        for shard in os.scandir(self.root):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        yield entry
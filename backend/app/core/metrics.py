@@ -0,0 +1,86 @@
+"""
+In-process latency histograms.
+
+Cumulative fixed-bucket histograms (Prometheus style) kept per ``(name, label)``.
+They are per process: with several uvicorn workers each exposes its own view.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any
+
+# Upper bounds in milliseconds; the last bucket is +Inf
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    __slots__ = ("buckets", "counts", "count", "total_ms", "max_ms", "errors")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound containing quantile ``q`` (coarse but allocation-free)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict[str, Any]:
+        cumulative, running = {}, 0
+        for bound, c in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            running += c
+            cumulative[bound] = running
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 2),
+            "buckets_ms": cumulative,
+        }
+
+
+_histograms: dict[tuple[str, str], LatencyHistogram] = {}
+_lock = threading.Lock()
+
+
+def observe(name: str, label: str, seconds: float, error: bool = False) -> None:
+    hist = _histograms.get((name, label))
+    if hist is None:
+        with _lock:
+            hist = _histograms.setdefault((name, label), LatencyHistogram())
+    hist.observe(seconds, error)
+
+
+def snapshot(name: str) -> dict[str, dict[str, Any]]:
+    """All histograms recorded under ``name``, keyed by label."""
+    return {label: h.snapshot() for (n, label), h in sorted(_histograms.items()) if n == name}
+
+
+def reset(name: str) -> None:
+    with _lock:
+        for key in [k for k in _histograms if k[0] == name]:
+            del _histograms[key]
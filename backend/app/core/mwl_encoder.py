@@ -0,0 +1,154 @@
+"""
+Fast encoder for Modality Worklist ``.wl`` files.
+
+Produces the same bytes as ``build_mwl_dataset`` + ``write_worklist_file``
+(Explicit VR Little Endian, defined-length sequence, pydicom's file meta and
+implementation UID) without building any pydicom ``Dataset``:
+
+  * the 128-byte preamble, ``DICM`` magic and every static file-meta element
+    are encoded once at import,
+  * element headers (tag + VR) are byte constants,
+  * the per-station parts of the Scheduled Procedure Step item (Modality,
+    Scheduled Station AE Title / Name, SPS Status) are encoded once per
+    ``(modality, station AE, station name)`` and cached,
+
+so per entry only the variable values are encoded and joined.
+"""
+from __future__ import annotations
+
+import struct
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from pydicom import __version__ as pydicom_version
+from pydicom.uid import PYDICOM_IMPLEMENTATION_UID, ExplicitVRLittleEndian, generate_uid
+
+from app.config import get_settings
+
+settings = get_settings()
+
+MWL_SOP_CLASS_UID = "1.2.840.10008.5.1.4.31"
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+
+def _tag(group: int, element: int, vr: str) -> bytes:
+    return struct.pack("<HH", group, element) + vr.encode()
+
+
+def _text(value: str) -> bytes:
+    # Same bytes pydicom writes when no Specific Character Set is declared
+    return value.encode("latin-1", errors="replace")
+
+
+def _el(header: bytes, value: bytes, pad: bytes = b" ") -> bytes:
+    if len(value) % 2:
+        value += pad
+    return header + _U16.pack(len(value)) + value
+
+
+def _ui(header: bytes, uid: str) -> bytes:
+    return _el(header, uid.encode(), b"\x00")
+
+
+# Element headers (group, element, VR), in tag order
+_META_LENGTH = _tag(0x0002, 0x0000, "UL") + _U16.pack(4)
+_META_VERSION = _tag(0x0002, 0x0001, "OB") + b"\x00\x00" + _U32.pack(2) + b"\x00\x01"
+_MEDIA_SOP_CLASS = _tag(0x0002, 0x0002, "UI")
+_MEDIA_SOP_INSTANCE = _tag(0x0002, 0x0003, "UI")
+_TRANSFER_SYNTAX = _tag(0x0002, 0x0010, "UI")
+_IMPL_CLASS = _tag(0x0002, 0x0012, "UI")
+_IMPL_VERSION = _tag(0x0002, 0x0013, "SH")
+
+_SOP_CLASS = _tag(0x0008, 0x0016, "UI")
+_SOP_INSTANCE = _tag(0x0008, 0x0018, "UI")
+_ACCESSION = _tag(0x0008, 0x0050, "SH")
+_MODALITY = _tag(0x0008, 0x0060, "CS")
+_REFERRING = _tag(0x0008, 0x0090, "PN")
+_PATIENT_NAME = _tag(0x0010, 0x0010, "PN")
+_PATIENT_ID = _tag(0x0010, 0x0020, "LO")
+_BIRTH_DATE = _tag(0x0010, 0x0030, "DA")
+_SEX = _tag(0x0010, 0x0040, "CS")
+_STUDY_UID = _tag(0x0020, 0x000D, "UI")
+_REQ_PROC_DESC = _tag(0x0032, 0x1060, "LO")
+_STATION_AE = _tag(0x0040, 0x0001, "AE")
+_SPS_DATE = _tag(0x0040, 0x0002, "DA")
+_SPS_TIME = _tag(0x0040, 0x0003, "TM")
+_SPS_DESC = _tag(0x0040, 0x0007, "LO")
+_SPS_ID = _tag(0x0040, 0x0009, "SH")
+_STATION_NAME = _tag(0x0040, 0x0010, "SH")
+_SPS_STATUS = _tag(0x0040, 0x0020, "CS")
+_SPS_SEQUENCE = _tag(0x0040, 0x0100, "SQ") + b"\x00\x00"
+_REQ_PROC_ID = _tag(0x0040, 0x1001, "SH")
+_ITEM = b"\xfe\xff\x00\xe0"
+
+# Preamble + magic, and the file-meta elements around MediaStorageSOPInstanceUID
+_PREFIX = b"\x00" * 128 + b"DICM"
+_META_HEAD = _META_VERSION + _ui(_MEDIA_SOP_CLASS, MWL_SOP_CLASS_UID)
+_META_TAIL = (
+    _ui(_TRANSFER_SYNTAX, ExplicitVRLittleEndian)
+    + _ui(_IMPL_CLASS, PYDICOM_IMPLEMENTATION_UID)
+    + _el(_IMPL_VERSION, f"PYDICOM {pydicom_version}".encode())
+)
+_SOP_CLASS_EL = _ui(_SOP_CLASS, MWL_SOP_CLASS_UID)
+
+
+@lru_cache(maxsize=1024)
+def _station_parts(modality: str, station_ae: str, station_name: Optional[str]) -> tuple[bytes, bytes]:
+    """Static SPS item bytes before the date and after the step ID for one station."""
+    head = _el(_MODALITY, _text(modality)) + _el(_STATION_AE, _text(station_ae))
+    tail = (_el(_STATION_NAME, _text(station_name)) if station_name else b"") + _el(_SPS_STATUS, b"SCHEDULED")
+    return head, tail
+
+
+def encode_mwl(
+    accession_number: str,
+    patient_id: str,
+    patient_name: str,
+    patient_dob: Optional[str],
+    patient_sex: Optional[str],
+    modality: str,
+    scheduled_datetime: datetime,
+    procedure_description: str,
+    scheduled_station_ae: Optional[str] = None,
+    scheduled_station_name: Optional[str] = None,
+    procedure_code: Optional[str] = None,
+    requested_procedure_id: Optional[str] = None,
+    referring_physician: Optional[str] = None,
+    sop_instance_uid: Optional[str] = None,
+    study_instance_uid: Optional[str] = None,
+) -> bytes:
+    """Complete ``.wl`` file bytes; takes the same arguments as ``build_mwl_dataset``."""
+    sop_instance_uid = sop_instance_uid or generate_uid()
+    description = _text(procedure_description)
+
+    head, tail = _station_parts(modality, scheduled_station_ae or settings.institution_ae_title, scheduled_station_name)
+    item = b"".join((
+        head,
+        _el(_SPS_DATE, scheduled_datetime.strftime("%Y%m%d").encode()),
+        _el(_SPS_TIME, scheduled_datetime.strftime("%H%M%S").encode()),
+        _el(_SPS_DESC, description),
+        _el(_SPS_ID, _text(procedure_code)) if procedure_code else b"",
+        tail,
+    ))
+    item = _ITEM + _U32.pack(len(item)) + item
+
+    meta = _META_HEAD + _ui(_MEDIA_SOP_INSTANCE, sop_instance_uid) + _META_TAIL
+    return b"".join((
+        _PREFIX,
+        _META_LENGTH, _U32.pack(len(meta)), meta,
+        _SOP_CLASS_EL,
+        _ui(_SOP_INSTANCE, sop_instance_uid),
+        _el(_ACCESSION, _text(accession_number)),
+        _el(_REFERRING, _text(referring_physician)) if referring_physician else b"",
+        _el(_PATIENT_NAME, _text(patient_name)),
+        _el(_PATIENT_ID, _text(patient_id)),
+        _el(_BIRTH_DATE, patient_dob.encode()) if patient_dob else b"",
+        _el(_SEX, _text(patient_sex)) if patient_sex else b"",
+        _ui(_STUDY_UID, study_instance_uid or generate_uid()),
+        _el(_REQ_PROC_DESC, description),
+        _SPS_SEQUENCE, _U32.pack(len(item)), item,
+        _el(_REQ_PROC_ID, _text(requested_procedure_id or accession_number)),
+    ))
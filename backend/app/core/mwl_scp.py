@@ -0,0 +1,163 @@
+"""
+DICOM Modality Worklist C-FIND SCP backed by ``dicom_worklist_entries``.
+
+Optional alternative to Orthanc's file-based worklist plugin
+(``MWL_SCP_ENABLED``): modalities query this AE directly and every C-FIND
+becomes one indexed SQL query on the active entries, filtered by modality,
+scheduled station AE title, scheduled date range, patient ID/name and
+accession number. No ``.wl`` files are scanned.
+
+pynetdicom runs each association in its own thread; the handler hands the
+query to the API event loop with ``run_coroutine_threadsafe`` so it shares the
+async engine and connection pool with the rest of the app.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Iterator, Optional
+
+from pydicom.dataset import Dataset
+from pydicom.uid import generate_uid
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.core.dicom_utils import build_mwl_dataset
+from app.models.worklist import DicomWorklistEntry, WorklistStatus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# C-FIND status codes (PS3.4 Annex K)
+STATUS_PENDING = 0xFF00
+STATUS_CANCEL = 0xFE00
+STATUS_UNABLE_TO_PROCESS = 0xC001
+
+
+def _text(ds: Dataset, keyword: str) -> str:
+    value = ds.get(keyword)
+    return str(value).strip() if value is not None else ""
+
+
+def _match(column, value: str):
+    """DICOM single value / wildcard matching; empty means universal match."""
+    if not value or value == "*":
+        return None
+    if "*" in value or "?" in value:
+        pattern = value.replace("%", r"\%").replace("_", r"\_").replace("*", "%").replace("?", "_")
+        return column.like(pattern, escape="\\")
+    return column == value
+
+
+def _parse_date(value: str) -> Optional[date]:
+    return datetime.strptime(value, "%Y%m%d").date() if value else None
+
+
+def _date_range(value: str) -> tuple[Optional[datetime], Optional[datetime]]:
+    """``YYYYMMDD``, ``YYYYMMDD-YYYYMMDD``, ``-YYYYMMDD`` or ``YYYYMMDD-`` → [start, end) in UTC."""
+    start_s, sep, end_s = value.partition("-")
+    start, end = _parse_date(start_s), _parse_date(end_s if sep else start_s)
+    return (
+        datetime.combine(start, time.min, tzinfo=timezone.utc) if start else None,
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc) if end else None,
+    )
+
+
+def worklist_filters(identifier: Dataset) -> list:
+    """SQL filters for a C-FIND identifier (only active entries are ever returned)."""
+    sps = identifier.ScheduledProcedureStepSequence[0] if identifier.get("ScheduledProcedureStepSequence") else Dataset()
+    filters = [DicomWorklistEntry.status == WorklistStatus.active]
+    for column, value in (
+        (DicomWorklistEntry.modality, _text(sps, "Modality")),
+        (DicomWorklistEntry.scheduled_station_ae_title, _text(sps, "ScheduledStationAETitle")),
+        (DicomWorklistEntry.patient_id_dicom, _text(identifier, "PatientID")),
+        (DicomWorklistEntry.patient_name_dicom, _text(identifier, "PatientName").upper()),
+        (DicomWorklistEntry.accession_number, _text(identifier, "AccessionNumber")),
+    ):
+        clause = _match(column, value)
+        if clause is not None:
+            filters.append(clause)
+    start, end = _date_range(_text(sps, "ScheduledProcedureStepStartDate"))
+    if start:
+        filters.append(DicomWorklistEntry.scheduled_datetime >= start)
+    if end:
+        filters.append(DicomWorklistEntry.scheduled_datetime < end)
+    return filters
+
+
+def entry_dataset(entry: DicomWorklistEntry) -> Dataset:
+    ds = build_mwl_dataset(
+        accession_number=entry.accession_number,
+        patient_id=entry.patient_id_dicom,
+        patient_name=entry.patient_name_dicom,
+        patient_dob=entry.patient_dob,
+        patient_sex=entry.patient_sex,
+        modality=entry.modality,
+        scheduled_datetime=entry.scheduled_datetime,
+        procedure_description=entry.procedure_description,
+        scheduled_station_ae=entry.scheduled_station_ae_title,
+        scheduled_station_name=entry.scheduled_station_name,
+        procedure_code=entry.procedure_code,
+        requested_procedure_id=entry.requested_procedure_id,
+        referring_physician=entry.referring_physician,
+    )
+    ds.SpecificCharacterSet = "ISO_IR 100"
+    # Stable across queries, so a modality re-querying the same order gets the same study
+    ds.StudyInstanceUID = generate_uid(entropy_srcs=[entry.accession_number])
+    return ds
+
+
+async def find_worklist(identifier: Dataset, db: AsyncSession) -> list[Dataset]:
+    result = await db.execute(
+        select(DicomWorklistEntry)
+        .where(*worklist_filters(identifier))
+        .order_by(DicomWorklistEntry.scheduled_datetime)
+        .limit(settings.mwl_scp_max_results)
+    )
+    return [entry_dataset(e) for e in result.scalars().all()]
+
+
+def _handle_find(event, loop: asyncio.AbstractEventLoop, session_factory) -> Iterator[tuple[int, Any]]:
+    """EVT_C_FIND handler (runs in the association thread)."""
+    async def query() -> list[Dataset]:
+        async with session_factory() as db:
+            return await find_worklist(event.identifier, db)
+
+    try:
+        future = asyncio.run_coroutine_threadsafe(query(), loop)
+        matches = future.result(timeout=settings.mwl_scp_query_timeout_seconds)
+    except Exception as e:
+        logger.error(f"MWL C-FIND from {event.assoc.requestor.ae_title} failed: {e}")
+        yield STATUS_UNABLE_TO_PROCESS, None
+        return
+
+    logger.info(f"MWL C-FIND from {event.assoc.requestor.ae_title}: {len(matches)} matches")
+    for ds in matches:
+        if event.is_cancelled:
+            yield STATUS_CANCEL, None
+            return
+        yield STATUS_PENDING, ds
+
+
+async def start_mwl_scp(host: str = "0.0.0.0", port: Optional[int] = None, session_factory=None):
+    """Start the MWL SCP in background threads. Call from FastAPI lifespan; stop with ``server.shutdown()``."""
+    from pynetdicom import AE, evt
+    from pynetdicom.sop_class import ModalityWorklistInformationFind, Verification
+
+    if session_factory is None:
+        from app.db.session import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+    logging.getLogger("pynetdicom").setLevel(logging.WARNING)
+
+    ae = AE(ae_title=settings.mwl_scp_ae_title)
+    ae.maximum_associations = settings.mwl_scp_max_associations
+    ae.add_supported_context(ModalityWorklistInformationFind)
+    ae.add_supported_context(Verification)
+
+    port = port or settings.mwl_scp_port
+    handlers = [(evt.EVT_C_FIND, _handle_find, [asyncio.get_running_loop(), session_factory])]
+    server = ae.start_server((host, port), block=False, evt_handlers=handlers)
+    logger.info(f"DICOM MWL SCP '{settings.mwl_scp_ae_title}' listening on {host}:{port}")
+    return server
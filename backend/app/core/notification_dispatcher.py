@@ -0,0 +1,138 @@
+"""
+Background delivery of in-app notifications.
+
+Request handlers hand notifications over with :func:`notify_role_after_commit`;
+they are queued once the producing transaction commits and written by a
+single worker task that drains the queue in batches, one session and one
+commit per batch. This keeps ``notify_role`` (an ``INSERT ... SELECT`` over the
+role's users) out of latency-sensitive paths such as order creation and the
+Orthanc webhook.
+
+The dispatcher lives in the API process (started from the FastAPI lifespan).
+Where it is not running (Celery tasks, scripts) notifications are written
+inline in the caller's transaction instead.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import UserRole
+
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "pending_notifications"
+_BATCH_SIZE = 100
+
+
+@dataclass(frozen=True)
+class RoleNotification:
+    role: UserRole
+    type: str
+    title: str
+    body: Optional[str] = None
+    link: Optional[str] = None
+
+
+class NotificationDispatcher:
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self.session_factory = None
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def start(self, session_factory=None) -> None:
+        if self.running:
+            return
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=10_000)
+        self._worker_task = asyncio.create_task(self._worker(), name="notification-dispatcher")
+        logger.info("Notification dispatcher started")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Flush queued notifications for up to ``timeout`` seconds, then shut down."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Notification dispatcher stopped with {self._queue.qsize()} unsent notifications")
+        self._worker_task.cancel()
+        await asyncio.gather(self._worker_task, return_exceptions=True)
+        self._queue = self._worker_task = None
+        logger.info("Notification dispatcher stopped")
+
+    def publish(self, notification: RoleNotification) -> None:
+        if not self.running:
+            return
+        try:
+            self._queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            logger.warning(f"Notification queue full, dropping {notification.type}: {notification.title}")
+
+    async def _worker(self) -> None:
+        from app.services.notification_service import NotificationService
+
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < _BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                async with self.session_factory() as db:
+                    svc = NotificationService(db)
+                    for n in batch:
+                        await svc.notify_role(n.role, n.type, n.title, body=n.body, link=n.link)
+                    await db.commit()
+            except Exception:
+                logger.exception(f"Could not write {len(batch)} notifications")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+dispatcher = NotificationDispatcher()
+
+
+async def notify_role_after_commit(
+    db: AsyncSession,
+    role: UserRole,
+    type: str,
+    title: str,
+    body: Optional[str] = None,
+    link: Optional[str] = None,
+) -> None:
+    """Notify every active user with ``role`` once ``db``'s transaction commits.
+
+    Nothing is sent if the transaction rolls back.
+    """
+    notification = RoleNotification(role, type, title, body, link)
+    if not dispatcher.running:
+        from app.services.notification_service import NotificationService
+        await NotificationService(db).notify_role(role, type, title, body=body, link=link)
+        return
+    pending = db.info.get(_SESSION_KEY)
+    if pending is None:
+        pending = db.info[_SESSION_KEY] = []
+        sa_event.listen(db.sync_session, "after_commit", _on_commit, once=True)
+        sa_event.listen(db.sync_session, "after_rollback", _on_rollback, once=True)
+    pending.append(notification)
+
+
+def _on_commit(session) -> None:
+    for notification in session.info.pop(_SESSION_KEY, None) or ():
+        dispatcher.publish(notification)
+
+
+def _on_rollback(session) -> None:
+    session.info.pop(_SESSION_KEY, None)
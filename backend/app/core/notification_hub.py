@@ -0,0 +1,226 @@
+"""
+Real-time push of in-app notifications.
+
+:class:`~app.services.notification_service.NotificationService` hands every
+new notification, and every read / read-all change, to
+:func:`publish_after_commit`. Once the transaction commits, the events are
+published on a Redis pub/sub channel (``notification_channel``). The hub of
+every API replica listens on that channel and forwards the events to the
+clients connected to it through ``GET /notifications/stream`` (server-sent
+events). Without Redis, the hub delivers to local clients only.
+
+While a user has an open stream, the hub keeps that user's unread count in
+memory. The count is seeded from the database on connect and moved by the
+events, so ``/notifications/unread-count`` does not query the database for
+that user. The count is re-seeded on every reconnect.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+import orjson
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_SESSION_KEY = "pending_notification_events"
+
+Event = dict[str, Any]
+
+
+def created_event(
+    id: int,
+    user_id: int,
+    type: str,
+    title: str,
+    body: Optional[str] = None,
+    link: Optional[str] = None,
+    created_at: Optional[datetime] = None,
+) -> Event:
+    return {
+        "type": "created",
+        "user_id": user_id,
+        "notification": {
+            "id": id,
+            "type": type,
+            "title": title,
+            "body": body,
+            "link": link,
+            "is_read": False,
+            "created_at": (created_at or datetime.now(timezone.utc)).isoformat(),
+        },
+    }
+
+
+def read_event(user_id: int, count: int = 1) -> Event:
+    return {"type": "read", "user_id": user_id, "count": count}
+
+
+def read_all_event(user_id: int) -> Event:
+    return {"type": "read_all", "user_id": user_id}
+
+
+class NotificationHub:
+    def __init__(self) -> None:
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._unread: dict[int, int] = {}
+        self._outbox: Optional[asyncio.Queue] = None
+        self._redis = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self._outbox is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._outbox = asyncio.Queue(maxsize=10_000)
+        try:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(settings.redis_url)
+            await self._redis.ping()
+            self._tasks.append(asyncio.create_task(self._listen(), name="notification-hub-listener"))
+        except Exception as e:
+            logger.warning(f"Notification hub without Redis fan-out, local clients only: {e}")
+            if self._redis is not None:
+                await self._redis.aclose()
+            self._redis = None
+        self._tasks.append(asyncio.create_task(self._publisher(), name="notification-hub-publisher"))
+        logger.info("Notification hub started")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._redis is not None:
+            await self._redis.aclose()
+        # End the open streams
+        for queues in self._subscribers.values():
+            for queue in queues:
+                queue.put_nowait(None)
+        self._outbox, self._redis, self._tasks = None, None, []
+        logger.info("Notification hub stopped")
+
+    # ── Publishing ──────────────────────────────────────────────────────
+
+    def publish(self, events: list[Event]) -> None:
+        if not self.running or not events:
+            return
+        try:
+            self._outbox.put_nowait(events)
+        except asyncio.QueueFull:
+            logger.warning(f"Notification hub outbox full, dropping {len(events)} events")
+
+    async def _publisher(self) -> None:
+        while True:
+            events = await self._outbox.get()
+            if self._redis is None:
+                self._deliver(events)
+                continue
+            try:
+                await self._redis.publish(settings.notification_channel, orjson.dumps(events))
+            except Exception as e:
+                logger.warning(f"Redis publish failed, delivering locally only: {e}")
+                self._deliver(events)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(settings.notification_channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._deliver(orjson.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification hub lost its Redis subscription, retrying: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def _deliver(self, events: Iterable[Event]) -> None:
+        for event in events:
+            user_id = event["user_id"]
+            queues = self._subscribers.get(user_id)
+            if not queues:
+                continue
+            if event["type"] == "created":
+                self._unread[user_id] = self._unread.get(user_id, 0) + 1
+            elif event["type"] == "read":
+                self._unread[user_id] = max(self._unread.get(user_id, 0) - event["count"], 0)
+            elif event["type"] == "read_all":
+                self._unread[user_id] = 0
+            messages = [("unread", {"count": self._unread[user_id]})]
+            if event["type"] == "created":
+                messages.insert(0, ("notification", event["notification"]))
+            for queue in queues:
+                for message in messages:
+                    try:
+                        queue.put_nowait(message)
+                    except asyncio.QueueFull:
+                        logger.warning(f"Notification stream of user {user_id} is not keeping up, dropping events")
+
+    # ── Subscribers ─────────────────────────────────────────────────────
+
+    async def subscribe(self, user_id: int, load_unread: Callable[[], Awaitable[int]]) -> asyncio.Queue:
+        """Register a stream for ``user_id``; ``load_unread`` seeds the unread count."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.notification_stream_queue_size)
+        first = user_id not in self._subscribers
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        if first:
+            # Events delivered while loading are deltas on top of the loaded count
+            self._unread[user_id] = 0
+            try:
+                count = await load_unread()
+            except BaseException:
+                self.unsubscribe(user_id, queue)
+                raise
+            self._unread[user_id] = max(self._unread[user_id] + count, 0)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+            self._unread.pop(user_id, None)
+
+    def unread_count(self, user_id: int) -> Optional[int]:
+        """In-memory unread count, if ``user_id`` has a stream open on this replica."""
+        return self._unread.get(user_id)
+
+
+hub = NotificationHub()
+
+
+def publish_after_commit(db: AsyncSession, events: list[Event]) -> None:
+    """Publish ``events`` once ``db``'s transaction commits; drop them on rollback."""
+    if not hub.running or not events:
+        return
+    pending = db.info.get(_SESSION_KEY)
+    if pending is None:
+        pending = db.info[_SESSION_KEY] = []
+        sa_event.listen(db.sync_session, "after_commit", _on_commit, once=True)
+        sa_event.listen(db.sync_session, "after_rollback", _on_rollback, once=True)
+    pending.extend(events)
+
+
+def _on_commit(session) -> None:
+    hub.publish(session.info.pop(_SESSION_KEY, None) or [])
+
+
+def _on_rollback(session) -> None:
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,33 @@
+"""
+orjson-backed responses.
+
+Routes that return a ``Response`` instance skip FastAPI's ``jsonable_encoder``
+and ``response_model`` re-validation entirely, so these classes are used for
+dicts the application builds itself (FHIR resources, enriched list views).
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=_OPTIONS)
+
+
+def dumps_line(content: Any) -> bytes:
+    """Serialize one NDJSON line (trailing newline included)."""
+    return orjson.dumps(content, option=_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class FHIRResponse(FastJSONResponse):
+    media_type = "application/fhir+json"
@@ -26,7 +26,7 @@ ROLE_PERMISSIONS: dict[UserRole, list[str]] = {
         "users:read", "users:write", "users:delete",
         "admin:access",
         "hl7:read", "hl7:write",
-        "fhir:read",
+        "fhir:read", "fhir:export", "fhir:subscribe",
         "audit:read",
     ],
     UserRole.receptionist: [
@@ -105,6 +105,15 @@ def create_refresh_token(data: dict[str, Any]) -> str:
     return jwt.encode(to_encode, key, algorithm=algorithm)
 
 
+def create_stream_token(user_id: int) -> str:
+    """Short-lived token that only opens the notification stream (sent as ``?token=``)."""
+    expire = datetime.now(timezone.utc) + timedelta(seconds=settings.notification_stream_token_seconds)
+    to_encode = {"sub": str(user_id), "exp": expire, "type": "stream", "jti": secrets.token_hex(8)}
+    algorithm = settings.jwt_algorithm if settings.get_private_key() else "HS256"
+    key = _get_key(private=True)
+    return jwt.encode(to_encode, key, algorithm=algorithm)
+
+
 def decode_token(token: str) -> dict[str, Any]:
     algorithm = settings.jwt_algorithm if settings.get_public_key() else "HS256"
     key = _get_key(private=False)
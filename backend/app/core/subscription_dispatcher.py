@@ -0,0 +1,359 @@
+"""
+Asynchronous rest-hook delivery for FHIR Subscriptions.
+
+Events are published once the producing transaction commits
+(:func:`publish_after_commit`), queued in memory and consumed by a small pool
+of worker tasks that:
+
+  * batch events for up to ``fhir_subscription_batch_wait_ms`` /
+    ``fhir_subscription_batch_size`` and group them per subscription,
+  * POST one ``history`` Bundle per subscription and batch (or an empty ping
+    when the subscription has no payload) over a shared, pooled httpx client,
+  * retry transient failures (network errors, 429, 5xx) with exponential
+    backoff, then flag the subscription ``error``,
+  * throttle each subscriber with a token bucket.
+
+Active subscriptions are cached in memory and reloaded every
+``fhir_subscription_cache_ttl_seconds`` or when the CRUD endpoints change one.
+The dispatcher lives in the API process (started from the FastAPI lifespan);
+events published where it is not running are dropped.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy import event as sa_event
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.core.responses import dumps
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "fhir_subscription_events"
+
+
+@dataclass(frozen=True, eq=False)
+class _Target:
+    id: int
+    resource_type: str
+    params: dict
+    endpoint: str
+    payload: Optional[str]
+    headers: tuple[tuple[str, str], ...]
+
+
+class _RetryableError(Exception):
+    pass
+
+
+class _PermanentError(Exception):
+    pass
+
+
+class _TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``burst`` stored."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = asyncio.get_running_loop().time()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SubscriptionDispatcher:
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._workers: list[asyncio.Task] = []
+        self._deliveries: set[asyncio.Task] = set()
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._targets: list[_Target] = []
+        self._targets_loaded_at = float("-inf")
+        self._targets_lock: Optional[asyncio.Lock] = None
+        self._buckets: dict[int, _TokenBucket] = {}
+        self._locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.session_factory = None
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    # ── Lifecycle ──────────────────────────────────────────────────────────────
+
+    async def start(self, session_factory=None) -> None:
+        if self.running:
+            return
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=settings.fhir_subscription_queue_size)
+        self._inflight = asyncio.Semaphore(settings.fhir_subscription_max_connections)
+        self._targets_lock = asyncio.Lock()
+        self._client = httpx.AsyncClient(
+            timeout=settings.fhir_subscription_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.fhir_subscription_max_connections,
+                max_keepalive_connections=settings.fhir_subscription_max_connections,
+            ),
+            headers={"Content-Type": "application/fhir+json"},
+        )
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"fhir-subscription-worker-{i}")
+            for i in range(settings.fhir_subscription_workers)
+        ]
+        logger.info(f"FHIR subscription dispatcher started ({len(self._workers)} workers)")
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Drain queued events for up to ``timeout`` seconds, then shut down."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            if self._deliveries:
+                await asyncio.wait(self._deliveries, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"FHIR subscription dispatcher stopped with {self._queue.qsize()} undelivered events")
+        for task in [*self._workers, *self._deliveries]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._deliveries, return_exceptions=True)
+        await self._client.aclose()
+        self._queue = self._client = None
+        self._workers, self._deliveries = [], set()
+        self._buckets.clear()
+        self._locks.clear()
+        logger.info("FHIR subscription dispatcher stopped")
+
+    # ── Producer side ──────────────────────────────────────────────────────────
+
+    def publish(self, resource_type: str, resource: dict[str, Any]) -> None:
+        if not self.running:
+            return
+        try:
+            self._queue.put_nowait((resource_type, resource))
+        except asyncio.QueueFull:
+            logger.warning(f"FHIR subscription queue full, dropping {resource_type}/{resource.get('id')}")
+
+    def invalidate(self) -> None:
+        """Force a reload of the subscription cache on the next batch."""
+        self._targets_loaded_at = float("-inf")
+
+    # ── Consumer side ──────────────────────────────────────────────────────────
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        wait = settings.fhir_subscription_batch_wait_ms / 1000
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + wait
+            try:
+                while len(batch) < settings.fhir_subscription_batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await self._route(batch)
+            except Exception:
+                logger.exception("FHIR subscription batch failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _route(self, batch: list[tuple[str, dict]]) -> None:
+        from app.services.fhir_subscription_service import matches
+
+        targets = await self._active_targets()
+        grouped: dict[_Target, list[dict]] = defaultdict(list)
+        for resource_type, resource in batch:
+            for t in targets:
+                if t.resource_type == resource_type and matches(t.params, resource):
+                    grouped[t].append(resource)
+        for target, resources in grouped.items():
+            task = asyncio.create_task(self._deliver(target, resources))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _active_targets(self) -> list[_Target]:
+        loop = asyncio.get_running_loop()
+        if loop.time() - self._targets_loaded_at < settings.fhir_subscription_cache_ttl_seconds:
+            return self._targets
+        async with self._targets_lock:
+            if loop.time() - self._targets_loaded_at < settings.fhir_subscription_cache_ttl_seconds:
+                return self._targets
+            from app.models.fhir_subscription import FHIRSubscription, SubscriptionStatus
+            from app.services.fhir_subscription_service import parse_criteria
+
+            now = datetime.now(timezone.utc)
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(FHIRSubscription).where(FHIRSubscription.status == SubscriptionStatus.active)
+                )
+                subs = result.scalars().all()
+                expired = [s.id for s in subs if s.end and s.end <= now]
+                if expired:
+                    await db.execute(
+                        update(FHIRSubscription).where(FHIRSubscription.id.in_(expired))
+                        .values(status=SubscriptionStatus.off)
+                    )
+                    await db.commit()
+            targets = []
+            for s in subs:
+                if s.id in expired:
+                    continue
+                resource_type, params = parse_criteria(s.criteria)
+                headers = tuple(
+                    (name.strip(), value.strip())
+                    for name, _, value in (h.partition(":") for h in s.headers or [])
+                )
+                targets.append(_Target(s.id, resource_type, params, s.endpoint, s.payload, headers))
+            self._targets = targets
+            self._targets_loaded_at = loop.time()
+            return targets
+
+    async def _deliver(self, target: _Target, resources: list[dict]) -> None:
+        body = self._notification(resources) if target.payload else None
+        bucket = self._buckets.get(target.id)
+        if bucket is None:
+            bucket = self._buckets[target.id] = _TokenBucket(
+                settings.fhir_subscription_rate_per_second, settings.fhir_subscription_burst
+            )
+        # One batch at a time per subscriber keeps notifications in order
+        async with self._locks[target.id]:
+            error = None
+            for attempt in range(settings.fhir_subscription_max_retries + 1):
+                if attempt:
+                    delay = settings.fhir_subscription_backoff_seconds * 2 ** (attempt - 1)
+                    await asyncio.sleep(delay * (0.5 + random.random()))
+                await bucket.acquire()
+                try:
+                    async with self._inflight:
+                        await self._post(target, body)
+                    logger.debug(f"Subscription {target.id}: delivered {len(resources)} resources")
+                    await self._mark_delivered(target)
+                    return
+                except _PermanentError as e:
+                    error = str(e)
+                    break
+                except _RetryableError as e:
+                    error = str(e)
+                    logger.info(f"Subscription {target.id}: attempt {attempt + 1} failed ({error})")
+                except httpx.HTTPError as e:
+                    error = f"{type(e).__name__}: {e}"
+                    logger.info(f"Subscription {target.id}: attempt {attempt + 1} failed ({error})")
+            await self._mark_error(target, error)
+
+    async def _post(self, target: _Target, body: Optional[bytes]) -> None:
+        response = await self._client.post(target.endpoint, content=body or b"", headers=dict(target.headers))
+        if response.is_success:
+            return
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                await asyncio.sleep(min(int(retry_after), 60))
+            raise _RetryableError(f"HTTP {response.status_code}")
+        raise _PermanentError(f"HTTP {response.status_code} from {target.endpoint}")
+
+    @staticmethod
+    def _notification(resources: list[dict]) -> bytes:
+        return dumps({
+            "resourceType": "Bundle",
+            "id": uuid.uuid4().hex,
+            "type": "history",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "entry": [
+                {
+                    "fullUrl": f"{r['resourceType']}/{r['id']}",
+                    "resource": r,
+                    "request": {"method": "PUT", "url": f"{r['resourceType']}/{r['id']}"},
+                }
+                for r in resources
+            ],
+        })
+
+    async def _mark_delivered(self, target: _Target) -> None:
+        from app.models.fhir_subscription import FHIRSubscription
+
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(FHIRSubscription).where(FHIRSubscription.id == target.id)
+                    .values(last_delivered_at=datetime.now(timezone.utc), error=None)
+                )
+                await db.commit()
+        except Exception:
+            logger.exception(f"Could not record delivery to subscription {target.id}")
+
+    async def _mark_error(self, target: _Target, error: Optional[str]) -> None:
+        from app.models.fhir_subscription import FHIRSubscription, SubscriptionStatus
+
+        logger.warning(f"Subscription {target.id} set to error: {error}")
+        self._targets = [t for t in self._targets if t.id != target.id]
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(FHIRSubscription).where(FHIRSubscription.id == target.id)
+                    .values(status=SubscriptionStatus.error, error=(error or "delivery failed")[:2000])
+                )
+                await db.commit()
+        except Exception:
+            logger.exception(f"Could not flag subscription {target.id} as error")
+
+
+dispatcher = SubscriptionDispatcher()
+
+
+# ── Publishing from a unit of work ────────────────────────────────────────────
+
+def publish_after_commit(db: AsyncSession, resource_type: str, resource: dict[str, Any]) -> None:
+    """Queue a FHIR resource for subscribers once ``db``'s transaction commits.
+
+    Nothing is sent if the transaction rolls back, so receivers never see
+    resources they cannot read back.
+    """
+    if not dispatcher.running:
+        return
+    pending = db.info.get(_SESSION_KEY)
+    if pending is None:
+        pending = db.info[_SESSION_KEY] = []
+        sa_event.listen(db.sync_session, "after_commit", _on_commit, once=True)
+        sa_event.listen(db.sync_session, "after_rollback", _on_rollback, once=True)
+    pending.append((resource_type, resource))
+
+
+def _on_commit(session) -> None:
+    for resource_type, resource in session.info.pop(_SESSION_KEY, None) or ():
+        dispatcher.publish(resource_type, resource)
+
+
+def _on_rollback(session) -> None:
+    session.info.pop(_SESSION_KEY, None)
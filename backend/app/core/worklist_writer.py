@@ -0,0 +1,140 @@
+"""
+Off-loop writer for Orthanc worklist (``.wl``) files.
+
+Services never touch the worklist directory themselves: they register file
+operations on the SQLAlchemy session (:func:`write_after_commit`,
+:func:`delete_after_commit`). When the transaction commits, all operations
+collected by that unit of work are submitted as one batch to a small thread
+pool, split into chunks of ``worklist_writer_batch_size`` files; a rollback
+discards them. Files are written atomically (temp file + rename, see
+:func:`app.core.dicom_utils.write_worklist_bytes`), so the worklist plugin
+never reads a partial file and an uncommitted order never appears in the
+worklist.
+
+``wl_file_path`` is deterministic (``<worklist_dir>/<accession>.wl``), so
+callers store it up front instead of waiting for the write.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.core.dicom_utils import delete_worklist_file, write_worklist_bytes
+from app.core.mwl_encoder import encode_mwl
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_SESSION_KEY = "worklist_file_ops"
+
+
+class WorklistFileWriter:
+    def __init__(self, max_workers: int, batch_size: int):
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="worklist-writer")
+        return self._executor
+
+    def submit(self, writes: dict[str, dict[str, Any]], deletes: Iterable[str] = ()) -> list[Future]:
+        """Queue one unit of work: ``writes`` maps accession number → ``encode_mwl`` kwargs."""
+        ops: list[tuple[str, Optional[dict[str, Any]]]] = [*writes.items(), *((a, None) for a in deletes)]
+        return [
+            self._pool().submit(self._run_batch, ops[i:i + self.batch_size])
+            for i in range(0, len(ops), self.batch_size)
+        ]
+
+    async def flush(self, writes: dict[str, dict[str, Any]], deletes: Iterable[str] = ()) -> int:
+        """Like :meth:`submit` but waits for the files; returns how many operations failed."""
+        futures = self.submit(writes, deletes)
+        return sum(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)))
+
+    @staticmethod
+    def _run_batch(ops: list[tuple[str, Optional[dict[str, Any]]]]) -> int:
+        failed = 0
+        for accession_number, kwargs in ops:
+            try:
+                if kwargs is None:
+                    delete_worklist_file(accession_number)
+                else:
+                    write_worklist_bytes(encode_mwl(**kwargs), accession_number)
+            except Exception as e:
+                failed += 1
+                logger.error(f"Worklist file {'delete' if kwargs is None else 'write'} failed for {accession_number}: {e}")
+        written = sum(1 for _, kwargs in ops if kwargs is not None)
+        logger.debug(f"Worklist writer: {written} written, {len(ops) - written} deleted, {failed} failed")
+        return failed
+
+    def shutdown(self) -> None:
+        """Wait for queued files, then stop the pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+writer = WorklistFileWriter(settings.worklist_writer_threads, settings.worklist_writer_batch_size)
+
+
+# ── Registering file operations on a unit of work ─────────────────────────────
+
+def _pending(db: AsyncSession) -> dict[str, Optional[dict[str, Any]]]:
+    pending = db.info.get(_SESSION_KEY)
+    if pending is None:
+        pending = db.info[_SESSION_KEY] = {}
+        sa_event.listen(db.sync_session, "after_commit", _on_commit, once=True)
+        sa_event.listen(db.sync_session, "after_rollback", _on_rollback, once=True)
+    return pending
+
+
+def write_after_commit(db: AsyncSession, entries: Iterable[Any]) -> None:
+    """Write the ``.wl`` file of each DicomWorklistEntry once ``db`` commits.
+
+    Entry values are captured now, so the ORM objects are never read from the
+    writer threads.
+    """
+    if not settings.worklist_files_enabled:
+        return
+    pending = _pending(db)
+    for entry in entries:
+        pending[entry.accession_number] = mwl_kwargs(entry)
+
+
+def delete_after_commit(db: AsyncSession, accession_numbers: Iterable[str]) -> None:
+    """Remove the ``.wl`` files of these accession numbers once ``db`` commits."""
+    pending = _pending(db)
+    for accession_number in accession_numbers:
+        pending[accession_number] = None
+
+
+def mwl_kwargs(entry: Any) -> dict[str, Any]:
+    return dict(
+        accession_number=entry.accession_number,
+        patient_id=entry.patient_id_dicom,
+        patient_name=entry.patient_name_dicom,
+        patient_dob=entry.patient_dob,
+        patient_sex=entry.patient_sex,
+        modality=entry.modality,
+        scheduled_datetime=entry.scheduled_datetime,
+        procedure_description=entry.procedure_description,
+        procedure_code=entry.procedure_code,
+    )
+
+
+def _on_commit(session) -> None:
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending:
+        writes = {a: kw for a, kw in pending.items() if kw is not None}
+        writer.submit(writes, [a for a, kw in pending.items() if kw is None])
+
+
+def _on_rollback(session) -> None:
+    session.info.pop(_SESSION_KEY, None)
@@ -14,4 +14,10 @@ from app.models.worklist import DicomWorklistEntry  # noqa: F401
 from app.models.hl7_message import HL7Message  # noqa: F401
 from app.models.audit import AuditLog  # noqa: F401
 from app.models.template import ReportTemplate  # noqa: F401
-from app.models.notification import Notification  # noqa: F401
+from app.models.notification import Notification, NotificationArchive, NotificationUnreadCount  # noqa: F401
+from app.models.fhir_export import FHIRExportJob  # noqa: F401
+from app.models.report_packet import ReportPacketJob  # noqa: F401
+from app.models.fhir_subscription import FHIRSubscription  # noqa: F401
+from app.models.orthanc_sync import OrthancSyncState  # noqa: F401
+from app.models.study_metadata import StudyMetadata  # noqa: F401
+from app.models.utilization import ResourceUtilizationDay  # noqa: F401
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Annotated, Optional
 
-from fastapi import Depends, Header, Request
+from fastapi import Depends, Header, Query, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError
 from sqlalchemy import select
@@ -20,20 +20,13 @@ DBSession = Annotated[AsyncSession, Depends(get_async_session)]
 
 
 # ── Auth Dependency ────────────────────────────────────────────────────────────
-async def get_current_user(
-    db: DBSession,
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-) -> User:
-    if not credentials:
-        raise UnauthorizedError("No authentication token provided")
-
-    token = credentials.credentials
+async def _user_from_token(db: AsyncSession, token: str, token_type: str) -> User:
     try:
         payload = decode_token(token)
     except JWTError:
         raise UnauthorizedError("Invalid or expired token")
 
-    if payload.get("type") != "access":
+    if payload.get("type") != token_type:
         raise UnauthorizedError("Invalid token type")
 
     user_id = payload.get("sub")
@@ -51,6 +44,15 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    db: DBSession,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+) -> User:
+    if not credentials:
+        raise UnauthorizedError("No authentication token provided")
+    return await _user_from_token(db, credentials.credentials, "access")
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
@@ -82,3 +84,24 @@ async def get_current_user_optional(
         return await get_current_user(db, credentials)
     except Exception:
         return None
+
+
+# ── Current user from ?token= (EventSource cannot send headers) ────────────────
+async def get_current_user_from_query(
+    db: DBSession,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    token: Optional[str] = Query(None, description="Stream token from POST /notifications/stream-token"),
+) -> User:
+    """Bearer access token, or a short-lived stream token in the query string.
+
+    Access tokens are never accepted as ``?token=``: query strings end up in
+    access logs and browser history.
+    """
+    if credentials:
+        return await _user_from_token(db, credentials.credentials, "access")
+    if not token:
+        raise UnauthorizedError("No authentication token provided")
+    return await _user_from_token(db, token, "stream")
+
+
+StreamUser = Annotated[User, Depends(get_current_user_from_query)]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
@@ -9,6 +10,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.config import get_settings
+from app.core.responses import FastJSONResponse
 from app.core.middleware import AuditLogMiddleware, RequestIDMiddleware, SecurityHeadersMiddleware, TimingMiddleware
 import app.db.base  # noqa: F401 — registers all ORM models with SQLAlchemy mapper
 from app.db.session import engine
@@ -32,8 +34,57 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     except Exception as e:
         logger.warning(f"MLLP server could not start: {e}")
 
+    # Optional DICOM MWL C-FIND SCP served from dicom_worklist_entries
+    mwl_scp = None
+    if settings.mwl_scp_enabled:
+        try:
+            from app.core.mwl_scp import start_mwl_scp
+            mwl_scp = await start_mwl_scp()
+        except Exception as e:
+            logger.warning(f"MWL SCP could not start: {e}")
+
+    # Shared keep-alive pool for Orthanc REST calls
+    from app.services.orthanc_service import close_client as close_orthanc_client, start_client as start_orthanc_client
+    await start_orthanc_client()
+
+    # ReportLab process pool for report PDFs
+    from app.services.report_pdf_service import shutdown_pool as shutdown_pdf_pool, start_pool as start_pdf_pool
+    start_pdf_pool()
+
+    # FHIR Subscription rest-hook delivery
+    from app.core.subscription_dispatcher import dispatcher as subscription_dispatcher
+    await subscription_dispatcher.start()
+
+    # In-app notifications written off the request path
+    from app.core.notification_dispatcher import dispatcher as notification_dispatcher
+    await notification_dispatcher.start()
+
+    # Push of new notifications to connected clients (SSE), fanned out over Redis
+    from app.core.notification_hub import hub as notification_hub
+    await notification_hub.start()
+
+    # Orthanc /changes consumer (alternative to the per-study webhook)
+    changes_poller = None
+    if settings.orthanc_changes_poller_enabled:
+        from app.services.orthanc_sync_service import run_changes_poller
+        changes_poller = asyncio.create_task(run_changes_poller(), name="orthanc-changes-poller")
+
     yield
 
+    if changes_poller:
+        changes_poller.cancel()
+        await asyncio.gather(changes_poller, return_exceptions=True)
+    await notification_dispatcher.stop()
+    await notification_hub.stop()
+    from app.core.worklist_writer import writer as worklist_writer
+    await asyncio.to_thread(worklist_writer.shutdown)
+    await subscription_dispatcher.stop()
+    await close_orthanc_client()
+    await asyncio.to_thread(shutdown_pdf_pool)
+
+    if mwl_scp:
+        await asyncio.to_thread(mwl_scp.shutdown)
+        logger.info("MWL SCP stopped")
     if mllp_server:
         mllp_server.close()
         await mllp_server.wait_closed()
@@ -50,6 +101,7 @@ app = FastAPI(
     redoc_url="/redoc" if settings.is_development else None,
     openapi_url="/openapi.json" if settings.is_development else None,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # ── Middleware ─────────────────────────────────────────────────────────────────
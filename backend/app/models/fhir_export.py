@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import enum
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Enum, ForeignKey, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base, enum_values
+
+
+class ExportStatus(str, enum.Enum):
+    accepted = "accepted"
+    in_progress = "in-progress"
+    completed = "completed"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+def generate_export_id() -> str:
+    return uuid.uuid4().hex
+
+
+class FHIRExportJob(Base):
+    """FHIR Bulk Data ($export) job — one row per kick-off request."""
+
+    __tablename__ = "fhir_export_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True, default=generate_export_id)
+    status: Mapped[ExportStatus] = mapped_column(
+        Enum(ExportStatus, values_callable=enum_values), nullable=False, default=ExportStatus.accepted, index=True
+    )
+    resource_types: Mapped[str] = mapped_column(String(255), nullable=False, comment="Comma separated _type list")
+    since: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, comment="_since filter")
+    request_url: Mapped[str] = mapped_column(String(1000), nullable=False)
+    requested_by_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
+    output: Mapped[Optional[list]] = mapped_column(JSON, nullable=True, comment="Manifest output entries")
+    resources_exported: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    transaction_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<FHIRExportJob id={self.id} status={self.status} types={self.resource_types}>"
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import enum
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Enum, ForeignKey, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base, enum_values
+
+
+class SubscriptionStatus(str, enum.Enum):
+    requested = "requested"
+    active = "active"
+    error = "error"
+    off = "off"
+
+
+class FHIRSubscription(Base):
+    """FHIR R4 Subscription with a rest-hook channel."""
+
+    __tablename__ = "fhir_subscriptions"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    status: Mapped[SubscriptionStatus] = mapped_column(
+        Enum(SubscriptionStatus, values_callable=enum_values), nullable=False,
+        default=SubscriptionStatus.requested, index=True,
+    )
+    criteria: Mapped[str] = mapped_column(String(500), nullable=False, comment="e.g. DiagnosticReport?status=final")
+    resource_type: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
+    reason: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    endpoint: Mapped[str] = mapped_column(String(1000), nullable=False)
+    payload: Mapped[Optional[str]] = mapped_column(
+        String(50), nullable=True, comment="MIME type of the notification body; empty = ping only"
+    )
+    headers: Mapped[Optional[list]] = mapped_column(JSON, nullable=True, comment='["Name: value", ...]')
+    end: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_by_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
+    last_delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<FHIRSubscription id={self.id} status={self.status} criteria={self.criteria}>"
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class OrthancSyncState(Base):
+    """Durable cursor of an Orthanc feed consumer (one row per feed, e.g. ``changes``)."""
+
+    __tablename__ = "orthanc_sync_state"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    last_seq: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, comment="Last processed /changes Seq")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<OrthancSyncState name={self.name} last_seq={self.last_seq}>"
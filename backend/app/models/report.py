@@ -38,7 +38,7 @@ class RadiologyReport(Base):
     clinical_info: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     # Digital signature
     signature_hash: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    signed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    signed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
     signed_by: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     # PDF storage
     pdf_path: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
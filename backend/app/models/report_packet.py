@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import enum
+import uuid
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, Enum, ForeignKey, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base, enum_values
+
+
+class PacketStatus(str, enum.Enum):
+    accepted = "accepted"
+    in_progress = "in-progress"
+    completed = "completed"
+    failed = "failed"
+    cancelled = "cancelled"
+
+
+class PacketFormat(str, enum.Enum):
+    pdf = "pdf"
+    zip = "zip"
+
+
+def generate_packet_id() -> str:
+    return uuid.uuid4().hex
+
+
+class ReportPacketJob(Base):
+    """Batch download of signed report PDFs (one merged PDF or a ZIP) — one row per request."""
+
+    __tablename__ = "report_packet_jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True, default=generate_packet_id)
+    status: Mapped[PacketStatus] = mapped_column(
+        Enum(PacketStatus, values_callable=enum_values), nullable=False, default=PacketStatus.accepted, index=True
+    )
+    format: Mapped[PacketFormat] = mapped_column(
+        Enum(PacketFormat, values_callable=enum_values), nullable=False, default=PacketFormat.pdf
+    )
+    # Filter: reports signed in [date_from, date_to] and/or of one patient
+    patient_id: Mapped[Optional[int]] = mapped_column(ForeignKey("patients.id"), nullable=True)
+    date_from: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    date_to: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    requested_by_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment="Matching reports")
+    done: Mapped[int] = mapped_column(Integer, default=0, nullable=False, comment="Reports added so far")
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<ReportPacketJob id={self.id} status={self.status} format={self.format}>"
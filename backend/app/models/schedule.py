@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import enum
 from datetime import datetime
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Any, List, Optional
 
-from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Integer, String, Text, func
+from sqlalchemy import Boolean, Computed, DateTime, Enum, ForeignKey, Index, Integer, SmallInteger, String, Text, func
+from sqlalchemy.dialects.postgresql import TSTZRANGE, ExcludeConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base_class import Base, enum_values
@@ -53,8 +54,27 @@ class Resource(Base):
         return f"<Resource id={self.id} name={self.name} type={self.resource_type}>"
 
 
+# Appointments in these states do not hold their slot
+INACTIVE_APPOINTMENT_STATUSES = (AppointmentStatus.cancelled, AppointmentStatus.noshow)
+_HOLDS_SLOT = "status NOT IN ('cancelled', 'noshow')"
+
+
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Postgres itself rejects double-booking (SQLSTATE 23P01); needs btree_gist
+        # A resource with capacity N has lanes 0..N-1, each booked at most once at a time
+        ExcludeConstraint(
+            ("resource_id", "="), ("lane", "="), ("during", "&&"),
+            name="appointments_resource_no_overlap", using="gist", where=_HOLDS_SLOT,
+        ),
+        ExcludeConstraint(
+            ("patient_id", "="), ("during", "&&"),
+            name="appointments_patient_no_overlap", using="gist", where=_HOLDS_SLOT,
+        ),
+        # Reminder dispatcher: unsent appointments by start time
+        Index("ix_appointments_reminder_sent_start", "reminder_sent", "start_datetime"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     patient_id: Mapped[int] = mapped_column(ForeignKey("patients.id"), nullable=False, index=True)
@@ -65,7 +85,12 @@ class Appointment(Base):
     )
     start_datetime: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     end_datetime: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # [start, end) as a range, maintained by Postgres for the exclusion constraints
+    during: Mapped[Any] = mapped_column(
+        TSTZRANGE, Computed("tstzrange(start_datetime, end_datetime, '[)')", persisted=True)
+    )
     duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=30)
+    lane: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     reminder_sent: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
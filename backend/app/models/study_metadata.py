@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import JSON, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class StudyMetadata(Base):
+    """Local copy of a study's Orthanc metadata (study, series and instance tag summaries).
+
+    Keyed by Orthanc study ID; filled when the study arrives and read-through on
+    miss, so study browsing does not hit Orthanc on every view.
+    """
+
+    __tablename__ = "study_metadata_cache"
+
+    orthanc_study_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    study_instance_uid: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    study: Mapped[dict] = mapped_column(JSON, nullable=False, comment="GET /studies/{id} response")
+    series: Mapped[list] = mapped_column(
+        JSON, nullable=False, comment="[{ID, MainDicomTags, Instances: [{ID, IndexInSeries, MainDicomTags}]}]"
+    )
+    series_count: Mapped[int] = mapped_column(Integer, default=0)
+    instances_count: Mapped[int] = mapped_column(Integer, default=0)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<StudyMetadata orthanc_id={self.orthanc_study_id} series={self.series_count}>"
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import JSON, Date, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base_class import Base
+
+
+class ResourceUtilizationDay(Base):
+    """Booked and available minutes of one resource for one closed day, per hour of day.
+
+    Only days older than ``utilization_cache_after_days`` are stored, so late
+    status changes (no-shows, cancellations) are in before a day is frozen.
+    """
+
+    __tablename__ = "resource_utilization_daily"
+
+    resource_id: Mapped[int] = mapped_column(ForeignKey("resources.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    booked: Mapped[list] = mapped_column(JSON, nullable=False, comment="24 ints, minutes per hour")
+    available: Mapped[list] = mapped_column(JSON, nullable=False, comment="24 ints, minutes per hour")
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<ResourceUtilizationDay resource_id={self.resource_id} day={self.day}>"
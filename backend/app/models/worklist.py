@@ -4,7 +4,7 @@ import enum
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, String, func
+from sqlalchemy import Boolean, DateTime, Enum, ForeignKey, Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base_class import Base, enum_values
@@ -21,6 +21,11 @@ class WorklistStatus(str, enum.Enum):
 
 class DicomWorklistEntry(Base):
     __tablename__ = "dicom_worklist_entries"
+    __table_args__ = (
+        # MWL C-FIND: active entries by modality / station AE, scheduled date range
+        Index("ix_dicom_worklist_entries_status_modality_scheduled", "status", "modality", "scheduled_datetime"),
+        Index("ix_dicom_worklist_entries_status_ae_scheduled", "status", "scheduled_station_ae_title", "scheduled_datetime"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     order_id: Mapped[int] = mapped_column(ForeignKey("imaging_orders.id"), unique=True, nullable=False, index=True)
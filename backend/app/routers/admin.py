@@ -107,3 +107,12 @@ async def list_audit_logs(
         }
         for log in logs
     ]
+
+
+@router.post("/worklist/reconcile", dependencies=[require_role(UserRole.admin)])
+async def reconcile_worklist(db: DBSession, dry_run: bool = Query(False)):
+    """Diff the worklist directory against the database and repair it (drift metrics)."""
+    from app.services.worklist_reconcile_service import WorklistReconcileService
+
+    report = await WorklistReconcileService(db).reconcile(dry_run=dry_run)
+    return report.as_dict()
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy import select
 
+from app.config import get_settings
+
 from app.dependencies import CurrentUser, DBSession, require_permission
 from app.models.study import ImagingStudy
 from app.services.orthanc_service import OrthancService
+from app.services.preview_service import PreviewService
+from app.services.study_metadata_service import StudyMetadataService, middle_instance
 
+settings = get_settings()
 router = APIRouter(prefix="/dicom", tags=["DICOM Studies"])
 
 
@@ -44,3 +52,59 @@ async def proxy_study(study_id: int, db: DBSession, current_user: CurrentUser):
     svc = OrthancService()
     url = await svc.get_study_preview_url(study.orthanc_study_id)
     return {"viewer_url": url, "orthanc_id": study.orthanc_study_id}
+
+
+@router.get("/studies/{study_id}/metadata", summary="Series and instance tag summaries (local cache)",
+            dependencies=[require_permission("studies:read")])
+async def get_study_metadata(study_id: int, db: DBSession):
+    return await StudyMetadataService(db).get_metadata(await _orthanc_study_id(db, study_id))
+
+
+async def _orthanc_study_id(db, study_id: int) -> str:
+    result = await db.execute(select(ImagingStudy.orthanc_study_id).where(ImagingStudy.id == study_id))
+    orthanc_id = result.scalar_one_or_none()
+    if not orthanc_id:
+        from app.core.exceptions import NotFoundError
+        raise NotFoundError("Study not available in Orthanc")
+    return orthanc_id
+
+
+@router.get("/studies/{study_id}/previews", summary="Series of a study with their preview thumbnail URLs",
+            dependencies=[require_permission("studies:read")])
+async def list_study_previews(study_id: int, db: DBSession):
+    svc = PreviewService(db)
+    metadata = await StudyMetadataService(db).get_metadata(await _orthanc_study_id(db, study_id))
+    previews = []
+    for s in metadata["Series"]:
+        url = f"/api/v1/dicom/studies/{study_id}/series/{s['ID']}/preview"
+        if s["Instances"]:
+            # Versioned by content: the URL changes with the instance it is rendered from
+            url += f"?v={await svc.preview_key(middle_instance(s))}"
+        previews.append({
+            "series_id": s["ID"],
+            "modality": s["MainDicomTags"].get("Modality"),
+            "description": s["MainDicomTags"].get("SeriesDescription"),
+            "series_number": s["MainDicomTags"].get("SeriesNumber"),
+            "instances": len(s["Instances"]),
+            "preview_url": url,
+        })
+    return previews
+
+
+@router.get("/studies/{study_id}/series/{series_id}/preview", summary="Series preview thumbnail (cached)",
+            dependencies=[require_permission("studies:read")])
+async def get_series_preview(study_id: int, series_id: str, request: Request, db: DBSession, v: Optional[str] = None):
+    svc = PreviewService(db)
+    instance = await svc.series_instance(await _orthanc_study_id(db, study_id), series_id)
+    key = await svc.preview_key(instance)
+    headers = {
+        # Only a URL carrying the current key is immutable; the plain URL follows the series, so revalidate
+        "Cache-Control": (
+            f"private, max-age={settings.preview_max_age_seconds}, immutable" if v == key else "private, no-cache"
+        ),
+        "ETag": f'"{key}"',
+    }
+    # Answered before anything is rendered or read from disk
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(await svc.preview_file(instance, key), media_type=svc.media_type, headers=headers)
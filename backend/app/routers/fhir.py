@@ -1,21 +1,169 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Query, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
-from app.core.exceptions import NotFoundError
+from app.core.exceptions import BadRequestError, ForbiddenError, NotFoundError
+from app.core.responses import FHIRResponse
+from app.core.security import has_permission
 from app.dependencies import CurrentUser, DBSession, require_permission
+from app.models.fhir_export import ExportStatus
 from app.models.order import ImagingOrder
 from app.models.patient import Patient
 from app.models.report import RadiologyReport
 from app.models.study import ImagingStudy
+from app.services.fhir_bundle_service import FHIRBundleService, fan_out_order_side_effects
+from app.services.fhir_export_service import FHIRExportService
+from app.services.fhir_search_service import FHIRSearchService
+from app.services.fhir_subscription_service import FHIRSubscriptionService
 from app.services.fhir_service import FHIRService
 
-router = APIRouter(prefix="/fhir/r4", tags=["FHIR R4"])
+router = APIRouter(prefix="/fhir/r4", tags=["FHIR R4"], default_response_class=FHIRResponse)
 fhir_svc = FHIRService()
 
 
+def _search_params(request: Request) -> dict[str, list[str]]:
+    return {k: request.query_params.getlist(k) for k in request.query_params.keys()}
+
+
+def _base_url(request: Request) -> str:
+    return f"{str(request.base_url).rstrip('/')}{router.prefix}"
+
+
+async def _json_body(request: Request):
+    try:
+        return orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise BadRequestError("Request body is not valid JSON")
+
+
+async def _search(resource_type: str, request: Request, db) -> FHIRResponse:
+    svc = FHIRSearchService(db)
+    return FHIRResponse(await svc.search(resource_type, _search_params(request), _base_url(request)))
+
+
+# ── batch / transaction Bundles ───────────────────────────────────────────────
+
+@router.post("", summary="Process a FHIR batch or transaction Bundle (Patient, ServiceRequest)",
+             dependencies=[require_permission("orders:write")])
+async def fhir_bundle(request: Request, background_tasks: BackgroundTasks, db: DBSession, current_user: CurrentUser):
+    bundle = await _json_body(request)
+    if isinstance(bundle, dict) and not has_permission(current_user.role, "patients:write") and any(
+        (e.get("resource") or {}).get("resourceType") == "Patient" for e in bundle.get("entry") or []
+    ):
+        raise ForbiddenError("Permission 'patients:write' required to create Patient entries")
+
+    svc = FHIRBundleService(db)
+    result = await svc.process(bundle, current_user.id)
+    if result.order_ids:
+        # Commit before the post-response fan-out opens its own session
+        await db.commit()
+        background_tasks.add_task(fan_out_order_side_effects, result.order_ids)
+    return FHIRResponse(result.body, status_code=result.status_code)
+
+
+# ── Bulk Data $export ──────────────────────────────────────────────────────────
+# Declared before /Patient/{patient_id} so "$export" is not parsed as an id.
+
+_NDJSON_FORMATS = {"application/fhir+ndjson", "application/ndjson", "ndjson"}
+
+
+async def _kick_off_export(request: Request, db, current_user, _type, _since, _outputFormat) -> Response:
+    if _outputFormat and _outputFormat not in _NDJSON_FORMATS:
+        raise BadRequestError(f"Unsupported _outputFormat '{_outputFormat}'")
+    svc = FHIRExportService(db)
+    job = await svc.create_job(str(request.url), _type, _since, current_user.id)
+    # Commit before dispatching so the worker always sees the job row
+    await db.commit()
+
+    from app.workers.fhir_tasks import run_bulk_export
+    run_bulk_export.delay(job.id)
+
+    return Response(
+        status_code=202,
+        headers={"Content-Location": f"{_base_url(request)}/$export-status/{job.id}"},
+    )
+
+
+@router.get("/$export", summary="FHIR Bulk Data system-level export (kick-off)", status_code=202,
+            dependencies=[require_permission("fhir:export")])
+async def fhir_system_export(
+    request: Request,
+    db: DBSession,
+    current_user: CurrentUser,
+    _type: Optional[str] = Query(None),
+    _since: Optional[str] = Query(None),
+    _outputFormat: Optional[str] = Query(None),
+):
+    return await _kick_off_export(request, db, current_user, _type, _since, _outputFormat)
+
+
+@router.get("/Patient/$export", summary="FHIR Bulk Data patient-level export (kick-off)", status_code=202,
+            dependencies=[require_permission("fhir:export")])
+async def fhir_patient_export(
+    request: Request,
+    db: DBSession,
+    current_user: CurrentUser,
+    _type: Optional[str] = Query(None),
+    _since: Optional[str] = Query(None),
+    _outputFormat: Optional[str] = Query(None),
+):
+    # Every exported resource type belongs to the patient compartment
+    return await _kick_off_export(request, db, current_user, _type, _since, _outputFormat)
+
+
+@router.get("/$export-status/{job_id}", summary="FHIR Bulk Data export status",
+            dependencies=[require_permission("fhir:export")])
+async def fhir_export_status(job_id: str, request: Request, db: DBSession):
+    svc = FHIRExportService(db)
+    job = await svc.get_job(job_id)
+    if job.status in (ExportStatus.accepted, ExportStatus.in_progress):
+        return Response(
+            status_code=202,
+            headers={"X-Progress": f"{job.status.value}: {job.resources_exported} resources", "Retry-After": "5"},
+        )
+    if job.status == ExportStatus.completed:
+        return FHIRResponse(svc.manifest(job, _base_url(request)))
+    return FHIRResponse(
+        status_code=500,
+        content={
+            "resourceType": "OperationOutcome",
+            "issue": [{
+                "severity": "error",
+                "code": "exception",
+                "diagnostics": job.error or f"Export {job.status.value}",
+            }],
+        },
+    )
+
+
+@router.delete("/$export-status/{job_id}", summary="Cancel or delete a FHIR Bulk Data export", status_code=202,
+               dependencies=[require_permission("fhir:export")])
+async def fhir_export_cancel(job_id: str, db: DBSession):
+    svc = FHIRExportService(db)
+    await svc.cancel_job(job_id)
+    return Response(status_code=202)
+
+
+@router.get("/$export-file/{job_id}/{filename}", summary="Download a FHIR Bulk Data NDJSON file",
+            dependencies=[require_permission("fhir:export")])
+async def fhir_export_file(job_id: str, filename: str, db: DBSession):
+    svc = FHIRExportService(db)
+    job = await svc.get_job(job_id)
+    if job.status != ExportStatus.completed:
+        raise NotFoundError(f"Export {job_id} is not complete")
+    return FileResponse(
+        svc.output_file(job_id, filename),
+        media_type="application/fhir+ndjson",
+        headers={"Content-Encoding": "gzip"},
+    )
+
+
 @router.get("/Patient/{patient_id}", summary="Get Patient as FHIR R4 resource",
             dependencies=[require_permission("fhir:read")])
 async def fhir_patient(patient_id: int, db: DBSession):
@@ -27,38 +175,49 @@ async def fhir_patient(patient_id: int, db: DBSession):
     patient = result.scalar_one_or_none()
     if not patient:
         raise NotFoundError(f"Patient {patient_id} not found")
-    return fhir_svc.patient_to_fhir(patient)
+    return FHIRResponse(fhir_svc.patient_to_fhir(patient))
 
 
 @router.get("/Patient", summary="Search Patients (FHIR Bundle)",
             dependencies=[require_permission("fhir:read")])
-async def fhir_patient_search(db: DBSession, identifier: str = None):
-    stmt = select(Patient).options(selectinload(Patient.contacts))
-    if identifier:
-        stmt = stmt.where(Patient.mrn == identifier)
-    result = await db.execute(stmt.limit(50))
-    patients = result.scalars().all()
-    entries = [{"resource": fhir_svc.patient_to_fhir(p)} for p in patients]
-    return {
-        "resourceType": "Bundle",
-        "type": "searchset",
-        "total": len(entries),
-        "entry": entries,
-    }
+async def fhir_patient_search(request: Request, db: DBSession):
+    """identifier, name, family, given, birthdate, gender, active · _count, _offset/_cursor,
+    _revinclude=ServiceRequest:patient|ImagingStudy:patient|DiagnosticReport:patient"""
+    return await _search("Patient", request, db)
+
+
+@router.get("/ServiceRequest", summary="Search ServiceRequests (FHIR Bundle)",
+            dependencies=[require_permission("fhir:read")])
+async def fhir_service_request_search(request: Request, db: DBSession):
+    """identifier, patient, status, modality, priority, authored, occurrence ·
+    _include=ServiceRequest:patient, _revinclude=ImagingStudy:basedon"""
+    return await _search("ServiceRequest", request, db)
+
+
+@router.get("/ImagingStudy", summary="Search ImagingStudies (FHIR Bundle)",
+            dependencies=[require_permission("fhir:read")])
+async def fhir_imaging_study_search(request: Request, db: DBSession):
+    """identifier, patient, basedon, started, modality, status ·
+    _include=ImagingStudy:patient|ImagingStudy:basedon, _revinclude=DiagnosticReport:imaging-study"""
+    return await _search("ImagingStudy", request, db)
+
+
+@router.get("/DiagnosticReport", summary="Search DiagnosticReports (FHIR Bundle)",
+            dependencies=[require_permission("fhir:read")])
+async def fhir_diagnostic_report_search(request: Request, db: DBSession):
+    """patient, status, issued/date, imaging-study, modality ·
+    _include=DiagnosticReport:patient|DiagnosticReport:imaging-study"""
+    return await _search("DiagnosticReport", request, db)
 
 
 @router.get("/ServiceRequest/{order_id}", summary="Get Order as FHIR ServiceRequest",
             dependencies=[require_permission("fhir:read")])
 async def fhir_service_request(order_id: int, db: DBSession):
-    result = await db.execute(
-        select(ImagingOrder)
-        .options(selectinload(ImagingOrder.patient))
-        .where(ImagingOrder.id == order_id)
-    )
+    result = await db.execute(select(ImagingOrder).where(ImagingOrder.id == order_id))
     order = result.scalar_one_or_none()
     if not order:
         raise NotFoundError(f"Order {order_id} not found")
-    return fhir_svc.order_to_fhir(order, order.patient)
+    return FHIRResponse(fhir_svc.order_to_fhir(order))
 
 
 @router.get("/ImagingStudy/{study_id}", summary="Get Study as FHIR ImagingStudy",
@@ -72,7 +231,7 @@ async def fhir_imaging_study(study_id: int, db: DBSession):
     study = result.scalar_one_or_none()
     if not study:
         raise NotFoundError(f"Study {study_id} not found")
-    return fhir_svc.study_to_fhir(study, study.order, study.order.patient)
+    return FHIRResponse(fhir_svc.study_to_fhir(study, study.order, study.order.patient if study.order else None))
 
 
 @router.get("/DiagnosticReport/{report_id}", summary="Get Report as FHIR DiagnosticReport",
@@ -91,4 +250,56 @@ async def fhir_diagnostic_report(report_id: int, db: DBSession):
     if not report:
         raise NotFoundError(f"Report {report_id} not found")
     study = report.study
-    return fhir_svc.report_to_fhir(report, study, study.order.patient)
+    return FHIRResponse(fhir_svc.report_to_fhir(report, study, study.order.patient if study.order else None))
+
+
+# ── Subscriptions (rest-hook) ─────────────────────────────────────────────────
+
+@router.post("/Subscription", summary="Create a rest-hook Subscription", status_code=201,
+             dependencies=[require_permission("fhir:subscribe")])
+async def fhir_subscription_create(request: Request, db: DBSession, current_user: CurrentUser):
+    svc = FHIRSubscriptionService(db)
+    sub = await svc.create(await _json_body(request), current_user.id)
+    return FHIRResponse(
+        svc.to_fhir(sub), status_code=201,
+        headers={"Location": f"{_base_url(request)}/Subscription/{sub.id}"},
+    )
+
+
+@router.get("/Subscription", summary="List Subscriptions (FHIR Bundle)",
+            dependencies=[require_permission("fhir:subscribe")])
+async def fhir_subscription_list(request: Request, db: DBSession, status: Optional[str] = None):
+    svc = FHIRSubscriptionService(db)
+    subs = await svc.list_subscriptions(status)
+    base = _base_url(request)
+    return FHIRResponse({
+        "resourceType": "Bundle",
+        "type": "searchset",
+        "total": len(subs),
+        "entry": [
+            {"fullUrl": f"{base}/Subscription/{s.id}", "resource": svc.to_fhir(s), "search": {"mode": "match"}}
+            for s in subs
+        ],
+    })
+
+
+@router.get("/Subscription/{subscription_id}", summary="Get a Subscription",
+            dependencies=[require_permission("fhir:subscribe")])
+async def fhir_subscription_get(subscription_id: int, db: DBSession):
+    svc = FHIRSubscriptionService(db)
+    return FHIRResponse(svc.to_fhir(await svc.get(subscription_id)))
+
+
+@router.put("/Subscription/{subscription_id}", summary="Update a Subscription",
+            dependencies=[require_permission("fhir:subscribe")])
+async def fhir_subscription_update(subscription_id: int, request: Request, db: DBSession):
+    svc = FHIRSubscriptionService(db)
+    return FHIRResponse(svc.to_fhir(await svc.update(subscription_id, await _json_body(request))))
+
+
+@router.delete("/Subscription/{subscription_id}", summary="Delete a Subscription", status_code=204,
+               dependencies=[require_permission("fhir:subscribe")])
+async def fhir_subscription_delete(subscription_id: int, db: DBSession):
+    svc = FHIRSubscriptionService(db)
+    await svc.delete(subscription_id)
+    return Response(status_code=204)
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 from typing import List
 
+import orjson
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 
-from app.dependencies import CurrentUser, DBSession
+from app.config import get_settings
+from app.core.notification_hub import hub
+from app.core.security import create_stream_token
+from app.dependencies import CurrentUser, DBSession, StreamUser
 from app.services.notification_service import NotificationService
 
+settings = get_settings()
+
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
 
@@ -30,11 +38,59 @@ async def list_notifications(db: DBSession, current_user: CurrentUser):
 
 @router.get("/unread-count", summary="Unread notification count")
 async def unread_count(db: DBSession, current_user: CurrentUser):
-    svc = NotificationService(db)
-    count = await svc.unread_count(current_user.id)
+    count = hub.unread_count(current_user.id)
+    if count is None:
+        count = await NotificationService(db).unread_count(current_user.id)
     return {"count": count}
 
 
+@router.post("/stream-token", summary="Short-lived token for opening the notification stream")
+async def stream_token(current_user: CurrentUser):
+    """EventSource cannot send headers, so the stream is opened with ``?token=``;
+    this token only opens the stream and expires after NOTIFICATION_STREAM_TOKEN_SECONDS."""
+    return {
+        "token": create_stream_token(current_user.id),
+        "expires_in": settings.notification_stream_token_seconds,
+    }
+
+
+@router.get(
+    "/stream",
+    summary="Push stream of new notifications and unread counts (server-sent events)",
+    response_class=StreamingResponse,
+)
+async def stream_notifications(db: DBSession, current_user: StreamUser):
+    """``event: notification`` for each new notification, ``event: unread`` with the
+    current unread count (sent on connect and on every change)."""
+    user_id = current_user.id
+    queue = await hub.subscribe(user_id, lambda: NotificationService(db).unread_count(user_id))
+
+    async def events():
+        try:
+            yield _sse("unread", {"count": hub.unread_count(user_id) or 0})
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), settings.notification_stream_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield _sse(*message)
+        finally:
+            hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
 @router.put("/{notification_id}/read", summary="Mark notification as read")
 async def mark_read(notification_id: int, db: DBSession, current_user: CurrentUser):
     svc = NotificationService(db)
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import Any, Optional
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Body, HTTPException
 from sqlalchemy import select
 
-from app.dependencies import CurrentUser, DBSession
+from app.core.notification_dispatcher import notify_role_after_commit
+from app.core.subscription_dispatcher import publish_after_commit
+from app.core import metrics
+from app.dependencies import CurrentUser, DBSession, require_permission
 from app.models.order import ImagingOrder, OrderStatus
 from app.models.study import ImagingStudy, StudyStatus
-from app.services.orthanc_service import OrthancService
+from app.models.user import UserRole
+from app.services.fhir_service import FHIRService, Ref
+from app.services.orthanc_service import METRIC as ORTHANC_METRIC, OrthancService, breaker
+from app.services.preview_service import warm_study_previews
+from app.services.study_metadata_service import StudyMetadataService, warm_study_metadata
 from app.services.worklist_service import WorklistService
 
 router = APIRouter(prefix="/orthanc", tags=["Orthanc / DICOM"])
@@ -20,6 +28,7 @@ logger = logging.getLogger(__name__)
 @router.post("/webhook", summary="Orthanc study received webhook")
 async def orthanc_study_webhook(
     db: DBSession,
+    background_tasks: BackgroundTasks,
     payload: dict[str, Any] = Body(...),
 ):
     """
@@ -36,38 +45,41 @@ async def orthanc_study_webhook(
         return {"status": "ignored"}
 
     # If the payload already includes MainDicomTags (sent by DIMED_PACS or external Orthanc),
-    # use them directly without querying our local Orthanc instance.
+    # use them directly without querying our local Orthanc instance. Otherwise fetch the
+    # study and its statistics from our own Orthanc concurrently.
+    stats: dict[str, Any] = {}
     if "MainDicomTags" in payload:
         main_tags = payload["MainDicomTags"]
         logger.info(f"Webhook with embedded DICOM tags from source: {payload.get('source', 'unknown')}")
     else:
-        # Default: query our own Orthanc instance for the study details
         orthanc_svc = OrthancService()
-        try:
-            study_data = await orthanc_svc.get_study(orthanc_id)
-        except Exception as e:
-            logger.error(f"Failed to get study from Orthanc: {e}")
+        study_data, stats = await asyncio.gather(
+            orthanc_svc.get_study(orthanc_id),
+            orthanc_svc.get_study_metadata(orthanc_id),
+            return_exceptions=True,
+        )
+        if isinstance(study_data, BaseException):
+            logger.error(f"Failed to get study from Orthanc: {study_data}")
             raise HTTPException(status_code=502, detail="Failed to contact Orthanc")
+        if isinstance(stats, BaseException):
+            stats = {}  # statistics are optional
         main_tags = study_data.get("MainDicomTags", {})
+        # Series/instance summaries and thumbnails for study browsing, cached off the request path
+        background_tasks.add_task(warm_study_metadata, [orthanc_id])
+        background_tasks.add_task(warm_study_previews, [orthanc_id])
     study_uid = main_tags.get("StudyInstanceUID", "")
     accession_number = main_tags.get("AccessionNumber", "")
 
     if not study_uid:
         return {"status": "error", "reason": "No StudyInstanceUID"}
 
-    # Find order by accession number
-    order = None
-    if accession_number:
-        result = await db.execute(
-            select(ImagingOrder).where(ImagingOrder.accession_number == accession_number)
-        )
-        order = result.scalar_one_or_none()
-
-    # Check if study already linked
-    existing_study = await db.execute(
-        select(ImagingStudy).where(ImagingStudy.study_instance_uid == study_uid)
+    # Indexed point lookups: the study by UID (with its order), the order by accession
+    result = await db.execute(
+        select(ImagingStudy, ImagingOrder)
+        .outerjoin(ImagingOrder, ImagingStudy.order_id == ImagingOrder.id)
+        .where(ImagingStudy.study_instance_uid == study_uid)
     )
-    existing = existing_study.scalar_one_or_none()
+    existing, existing_order = result.first() or (None, None)
 
     if existing:
         # Update orthanc_id if not set
@@ -75,70 +87,87 @@ async def orthanc_study_webhook(
             existing.orthanc_study_id = orthanc_id
         existing.status = StudyStatus.available
         await db.flush()
+        _publish_study(db, existing, existing_order)
         return {"status": "updated", "study_id": existing.id}
 
-    # Get stats (only from local Orthanc; skip if study came from external source)
-    series_count = 0
-    instances_count = 0
-    if "MainDicomTags" not in payload:
-        try:
-            stats = await orthanc_svc.get_study_metadata(orthanc_id)
-            series_count = stats.get("CountSeries", 0)
-            instances_count = stats.get("CountInstances", 0)
-        except Exception:
-            pass
+    order = None
+    if accession_number:
+        result = await db.execute(select(ImagingOrder).where(ImagingOrder.accession_number == accession_number))
+        order = result.scalar_one_or_none()
 
     # Create ImagingStudy record
+    now = datetime.now(timezone.utc)
     study = ImagingStudy(
         order_id=order.id if order else None,
         study_instance_uid=study_uid,
         orthanc_study_id=orthanc_id,
-        series_count=series_count,
-        instances_count=instances_count,
+        series_count=stats.get("CountSeries", 0),
+        instances_count=stats.get("CountInstances", 0),
         modality=main_tags.get("Modality"),
         study_description=main_tags.get("StudyDescription"),
         status=StudyStatus.available,
-        received_at=datetime.now(timezone.utc),
+        received_at=now,
     )
     db.add(study)
-    await db.flush()
 
     if order:
         order.status = OrderStatus.completed
-        order.completed_at = datetime.now(timezone.utc)
+        order.completed_at = now
         # Complete worklist entry
         wl_svc = WorklistService(db)
         await wl_svc.complete_worklist_entry(accession_number)
 
     await db.flush()
-
-    # Notify radiologists about new study
-    try:
-        from app.services.notification_service import NotificationService
-        from app.models.user import UserRole
-        n_svc = NotificationService(db)
-        desc = main_tags.get("StudyDescription", "Sin descripción")
-        await n_svc.notify_role(
-            UserRole.radiologist, "study_received",
-            f"Estudio recibido: {desc}",
-            body=f"Modalidad: {main_tags.get('Modality', 'N/A')} · Accession: {accession_number or 'N/A'}",
-            link=f"/worklist",
-        )
-    except Exception:
-        pass
+    _publish_study(db, study, order)
+
+    # Notify radiologists once the transaction commits (written in the background)
+    desc = main_tags.get("StudyDescription", "Sin descripción")
+    await notify_role_after_commit(
+        db, UserRole.radiologist, "study_received",
+        f"Estudio recibido: {desc}",
+        body=f"Modalidad: {main_tags.get('Modality', 'N/A')} · Accession: {accession_number or 'N/A'}",
+        link="/worklist",
+    )
 
     logger.info(f"Study {study_uid} linked to order {order.id if order else 'N/A'}")
     return {"status": "created", "study_id": study.id}
 
 
-@router.get("/studies/{orthanc_id}", summary="Get study from Orthanc")
-async def get_orthanc_study(orthanc_id: str, current_user: CurrentUser):
-    svc = OrthancService()
-    return await svc.get_study(orthanc_id)
+def _publish_study(db, study: ImagingStudy, order: Optional[ImagingOrder]) -> None:
+    """Notify FHIR ImagingStudy subscribers once the webhook transaction commits."""
+    resource = FHIRService().study_to_fhir(study, order, Ref(order.patient_id) if order else None)
+    publish_after_commit(db, "ImagingStudy", resource)
+
+
+@router.get("/studies/{orthanc_id}", summary="Get study from Orthanc (served from the local metadata cache)")
+async def get_orthanc_study(orthanc_id: str, db: DBSession, current_user: CurrentUser):
+    return await StudyMetadataService(db).get_study(orthanc_id)
+
+
+@router.get("/studies/{orthanc_id}/metadata", summary="Study, series and instance tag summaries",
+            dependencies=[require_permission("studies:read")])
+async def get_orthanc_study_metadata(orthanc_id: str, db: DBSession):
+    return await StudyMetadataService(db).get_metadata(orthanc_id)
+
+
+@router.delete("/studies/{orthanc_id}", status_code=204, summary="Delete study from Orthanc",
+               dependencies=[require_permission("admin:access")])
+async def delete_orthanc_study(orthanc_id: str, db: DBSession):
+    await StudyMetadataService(db).delete_study(orthanc_id)
 
 
 @router.get("/health", summary="Orthanc health check")
 async def orthanc_health():
     svc = OrthancService()
     healthy = await svc.is_healthy()
-    return {"orthanc_available": healthy}
+    return {"orthanc_available": healthy, "circuit": breaker.state}
+
+
+@router.get("/metrics", summary="Orthanc client latency histograms (per endpoint, this process)",
+            dependencies=[require_permission("admin:access")])
+async def orthanc_metrics():
+    return {
+        "circuit": breaker.state,
+        "consecutive_failures": breaker.failures,
+        "endpoints": metrics.snapshot(ORTHANC_METRIC),
+    }
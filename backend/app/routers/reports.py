@@ -1,22 +1,44 @@
 from __future__ import annotations
 
+from pathlib import Path
 from typing import List
 
-from fastapi import APIRouter, Query
-from fastapi.responses import Response
+from fastapi import APIRouter, BackgroundTasks, Query, Request
+from fastapi.responses import FileResponse, Response
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+from app.config import get_settings
+from app.core.notification_dispatcher import notify_role_after_commit
+from app.core.responses import FastJSONResponse
 from app.dependencies import CurrentUser, DBSession, require_permission
 from app.models.order import ImagingOrder
 from app.models.report import RadiologyReport
+from app.models.report_packet import PacketFormat, PacketStatus
 from app.models.study import ImagingStudy
-from app.schemas.report import ReportCreate, ReportListResponse, ReportResponse, ReportSignRequest, ReportUpdate
+from app.models.user import UserRole
+from app.schemas.report import (
+    ReportCreate, ReportListResponse, ReportPacketRequest, ReportPacketResponse, ReportResponse, ReportSignRequest,
+    ReportUpdate,
+)
+from app.services.report_packet_service import ReportPacketService
+from app.services.report_pdf_service import ReportPDFService, prerender_report_pdf
 from app.services.report_service import ReportService
 
+settings = get_settings()
+
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
 
+def _file_response(path: Path, media_type: str, headers: dict[str, str]) -> Response:
+    """Serve a file under ``report_pdf_dir``; nginx sends it itself when X-Accel-Redirect is configured."""
+    if settings.report_pdf_accel_redirect:
+        relative = path.relative_to(settings.report_pdf_dir).as_posix()
+        headers["X-Accel-Redirect"] = f"{settings.report_pdf_accel_redirect.rstrip('/')}/{relative}"
+        return Response(media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
 @router.get("", response_model=List[ReportListResponse],
             dependencies=[require_permission("reports:read")])
 async def list_reports(db: DBSession, status: str = Query(None)):
@@ -35,25 +57,26 @@ async def list_reports(db: DBSession, status: str = Query(None)):
     result = await db.execute(stmt)
     reports = result.scalars().all()
 
-    items: List[ReportListResponse] = []
+    # Trusted dicts rendered straight to JSON bytes (no response_model re-validation)
+    items = []
     for r in reports:
         study = r.study
         order = study.order if study else None
         patient = order.patient if order else None
-        items.append(ReportListResponse(
-            id=r.id,
-            study_id=r.study_id,
-            status=r.status,
-            signed_by=r.signed_by,
-            signed_at=r.signed_at,
-            created_at=r.created_at,
-            updated_at=r.updated_at,
-            accession_number=order.accession_number if order else None,
-            modality=(order.modality.value if order else None) or (study.modality if study else None),
-            patient_name=patient.full_name if patient else None,
-            patient_mrn=patient.mrn if patient else None,
-        ))
-    return items
+        items.append({
+            "id": r.id,
+            "study_id": r.study_id,
+            "status": r.status.value,
+            "signed_by": r.signed_by,
+            "signed_at": r.signed_at,
+            "created_at": r.created_at,
+            "updated_at": r.updated_at,
+            "accession_number": order.accession_number if order else None,
+            "modality": (order.modality.value if order else None) or (study.modality if study else None),
+            "patient_name": patient.full_name if patient else None,
+            "patient_mrn": patient.mrn if patient else None,
+        })
+    return FastJSONResponse(items)
 
 
 @router.post("", response_model=ReportResponse, status_code=201,
@@ -63,6 +86,58 @@ async def create_report(data: ReportCreate, db: DBSession, current_user: Current
     return await svc.create_report(data, current_user)
 
 
+# ── Report packets (batch downloads) ───────────────────────────────────────────
+# Declared before /{report_id} so "packets" is not parsed as an id.
+
+_PACKET_MEDIA_TYPES = {PacketFormat.pdf: "application/pdf", PacketFormat.zip: "application/zip"}
+
+
+@router.post("/packets", response_model=ReportPacketResponse, status_code=202,
+             summary="Request the signed reports of a patient / date range as one PDF or ZIP",
+             dependencies=[require_permission("reports:read")])
+async def create_report_packet(data: ReportPacketRequest, request: Request, response: Response,
+                               db: DBSession, current_user: CurrentUser):
+    svc = ReportPacketService(db)
+    job = await svc.create_job(data.format, data.patient_id, data.date_from, data.date_to, current_user.id)
+    # Commit before dispatching so the worker always sees the job row
+    await db.commit()
+
+    from app.workers.report_tasks import build_report_packet
+    build_report_packet.delay(job.id)
+
+    response.headers["Content-Location"] = str(request.url_for("get_report_packet", job_id=job.id))
+    return job
+
+
+@router.get("/packets/{job_id}", response_model=ReportPacketResponse,
+            summary="Report packet status and progress",
+            dependencies=[require_permission("reports:read")])
+async def get_report_packet(job_id: str, response: Response, db: DBSession):
+    job = await ReportPacketService(db).get_job(job_id)
+    if job.status in (PacketStatus.accepted, PacketStatus.in_progress):
+        response.status_code = 202
+        response.headers["X-Progress"] = f"{job.status.value}: {job.done}/{job.total} reports"
+        response.headers["Retry-After"] = "5"
+    return job
+
+
+@router.get("/packets/{job_id}/download", summary="Download a completed report packet",
+            dependencies=[require_permission("reports:read")])
+async def download_report_packet(job_id: str, db: DBSession):
+    svc = ReportPacketService(db)
+    job = await svc.get_job(job_id)
+    path = svc.output_file(job)
+    headers = {"Content-Disposition": f"attachment; filename=report_packet_{job_id}.{job.format.value}"}
+    return _file_response(path, _PACKET_MEDIA_TYPES[job.format], headers)
+
+
+@router.delete("/packets/{job_id}", status_code=202, summary="Cancel or delete a report packet",
+               dependencies=[require_permission("reports:read")])
+async def delete_report_packet(job_id: str, db: DBSession):
+    await ReportPacketService(db).cancel_job(job_id)
+    return Response(status_code=202)
+
+
 @router.get("/{report_id}", response_model=ReportResponse,
             dependencies=[require_permission("reports:read")])
 async def get_report(report_id: int, db: DBSession):
@@ -79,23 +154,21 @@ async def update_report(report_id: int, data: ReportUpdate, db: DBSession, curre
 
 @router.post("/{report_id}/sign", response_model=ReportResponse,
              dependencies=[require_permission("reports:sign")])
-async def sign_report(report_id: int, data: ReportSignRequest, db: DBSession, current_user: CurrentUser):
+async def sign_report(
+    report_id: int, data: ReportSignRequest, db: DBSession, current_user: CurrentUser, background_tasks: BackgroundTasks,
+):
     svc = ReportService(db)
     report = await svc.sign_report(report_id, data.password, current_user)
-
-    # Notify physicians about signed report
-    try:
-        from app.services.notification_service import NotificationService
-        from app.models.user import UserRole
-        n_svc = NotificationService(db)
-        await n_svc.notify_role(
-            UserRole.physician, "report_signed",
-            f"Informe firmado por {current_user.full_name}",
-            body=f"Informe #{report.id} firmado digitalmente",
-            link=f"/reports/{report.id}",
-        )
-    except Exception:
-        pass
+    # The signed PDF is rendered once, after the signature is committed
+    background_tasks.add_task(prerender_report_pdf, report.id)
+
+    # Notify physicians once the transaction commits (written in the background)
+    await notify_role_after_commit(
+        db, UserRole.physician, "report_signed",
+        f"Informe firmado por {current_user.full_name}",
+        body=f"Informe #{report.id} firmado digitalmente",
+        link=f"/reports/{report.id}",
+    )
 
     # Send HL7 ORU R01 after signing
     from app.services.hl7_service import HL7Service
@@ -123,11 +196,13 @@ async def sign_report(report_id: int, data: ReportSignRequest, db: DBSession, cu
 
 
 @router.get("/{report_id}/pdf", summary="Download report PDF")
-async def download_pdf(report_id: int, db: DBSession, current_user: CurrentUser):
-    svc = ReportService(db)
-    pdf_bytes = await svc.generate_pdf(report_id)
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=report_{report_id}.pdf"},
-    )
+async def download_pdf(report_id: int, request: Request, db: DBSession, current_user: CurrentUser):
+    path, key = await ReportPDFService(db).pdf_file(report_id)
+    headers = {
+        "Content-Disposition": f"attachment; filename=report_{report_id}.pdf",
+        "Cache-Control": "private, no-cache",
+        "ETag": f'"{key}"',
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return _file_response(path, "application/pdf", headers)
@@ -3,22 +3,29 @@ from __future__ import annotations
 import math
 from typing import List, Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, BackgroundTasks, Query
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+from app.config import get_settings
+from app.core.exceptions import BadRequestError
+from app.core.notification_dispatcher import notify_role_after_commit
+from app.core.responses import FastJSONResponse
 from app.dependencies import CurrentUser, DBSession, require_permission
 from app.models.order import ImagingOrder
 from app.models.report import RadiologyReport
 from app.models.study import ImagingStudy, StudyStatus
+from app.models.user import UserRole
 from app.schemas.order import (
-    ImagingOrderCreate, ImagingOrderEdit, ImagingOrderResponse, ImagingOrderUpdate,
-    PaginatedOrders, WorklistEntryResponse,
+    BulkOrderResponse, ImagingOrderBulkCreate, ImagingOrderCreate, ImagingOrderEdit,
+    ImagingOrderResponse, ImagingOrderUpdate, PaginatedOrders, WorklistEntryResponse,
 )
 from app.schemas.study import ImagingStudyResponse
+from app.services.fhir_bundle_service import fan_out_order_side_effects
 from app.services.order_service import OrderService
 from app.services.worklist_service import WorklistService
 
+settings = get_settings()
 router = APIRouter(tags=["RIS - Orders & Worklist"])
 
 
@@ -28,19 +35,13 @@ async def create_order(data: ImagingOrderCreate, db: DBSession, current_user: Cu
     svc = OrderService(db)
     order = await svc.create_order(data, current_user.id)
 
-    # Notify technicians about new order
-    try:
-        from app.services.notification_service import NotificationService
-        from app.models.user import UserRole
-        n_svc = NotificationService(db)
-        await n_svc.notify_role(
-            UserRole.technician, "order_created",
-            f"Nueva orden: {order.procedure_description}",
-            body=f"Modalidad: {order.modality.value} · Accession: {order.accession_number}",
-            link=f"/worklist",
-        )
-    except Exception:
-        pass
+    # Notify technicians once the transaction commits (written in the background)
+    await notify_role_after_commit(
+        db, UserRole.technician, "order_created",
+        f"Nueva orden: {order.procedure_description}",
+        body=f"Modalidad: {order.modality.value} · Accession: {order.accession_number}",
+        link="/worklist",
+    )
 
     # Send HL7 ORM O01
     from app.services.hl7_service import HL7Service
@@ -53,6 +54,32 @@ async def create_order(data: ImagingOrderCreate, db: DBSession, current_user: Cu
     return order
 
 
+@router.post("/orders/bulk", response_model=BulkOrderResponse,
+             dependencies=[require_permission("orders:write")])
+async def create_orders_bulk(
+    data: ImagingOrderBulkCreate, background_tasks: BackgroundTasks, db: DBSession, current_user: CurrentUser,
+):
+    """Create many orders at once; returns one result per item (201, or the error status and message).
+
+    Worklist files, ORM^O01 messages and the technician notification are
+    produced after the response for all created orders together.
+    """
+    if len(data.orders) > settings.orders_bulk_max_items:
+        raise BadRequestError(f"Máximo {settings.orders_bulk_max_items} órdenes por solicitud")
+    svc = OrderService(db)
+    items = await svc.create_orders_bulk(data.orders, current_user.id)
+    order_ids = [item.order_id for item in items if item.order_id]
+    if order_ids:
+        # Commit before the post-response fan-out opens its own session
+        await db.commit()
+        background_tasks.add_task(fan_out_order_side_effects, order_ids)
+    return BulkOrderResponse(
+        created=len(order_ids),
+        failed=len(items) - len(order_ids),
+        items=items,
+    )
+
+
 @router.get("/orders", response_model=PaginatedOrders,
             dependencies=[require_permission("orders:read")])
 async def list_orders(
@@ -134,28 +161,29 @@ async def list_studies(db: DBSession, status: Optional[str] = None):
     result = await db.execute(stmt)
     studies = result.scalars().all()
 
-    items: List[ImagingStudyResponse] = []
+    # Trusted dicts rendered straight to JSON bytes (no response_model re-validation)
+    items = []
     for s in studies:
         order = s.order
         patient = order.patient if order else None
         report = s.report
-        items.append(ImagingStudyResponse(
-            id=s.id,
-            order_id=s.order_id,
-            study_instance_uid=s.study_instance_uid,
-            orthanc_study_id=s.orthanc_study_id,
-            series_count=s.series_count,
-            instances_count=s.instances_count,
-            modality=s.modality or (order.modality.value if order else None),
-            study_description=s.study_description,
-            status=s.status,
-            received_at=s.received_at,
-            created_at=s.created_at,
-            accession_number=order.accession_number if order else None,
-            patient_id=patient.id if patient else None,
-            patient_name=patient.full_name if patient else None,
-            patient_mrn=patient.mrn if patient else None,
-            report_id=report.id if report else None,
-            report_status=report.status.value if report else None,
-        ))
-    return items
+        items.append({
+            "id": s.id,
+            "order_id": s.order_id,
+            "study_instance_uid": s.study_instance_uid,
+            "orthanc_study_id": s.orthanc_study_id,
+            "series_count": s.series_count,
+            "instances_count": s.instances_count,
+            "modality": s.modality or (order.modality.value if order else None),
+            "study_description": s.study_description,
+            "status": s.status.value,
+            "received_at": s.received_at,
+            "created_at": s.created_at,
+            "accession_number": order.accession_number if order else None,
+            "patient_id": patient.id if patient else None,
+            "patient_name": patient.full_name if patient else None,
+            "patient_mrn": patient.mrn if patient else None,
+            "report_id": report.id if report else None,
+            "report_status": report.status.value if report else None,
+        })
+    return FastJSONResponse(items)
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import APIRouter, Query
 
+from app.config import get_settings
 from app.dependencies import CurrentUser, DBSession, require_permission
 from app.schemas.schedule import (
-    AppointmentCreate, AppointmentResponse, AppointmentUpdate,
-    ResourceCreate, ResourceResponse, ResourceUpdate, SlotResponse,
+    AppointmentCreate, AppointmentResponse, AppointmentUpdate, FreeSlotResponse,
+    ResourceCreate, ResourceResponse, ResourceUpdate, ScheduleOptimizeRequest, ScheduleOptimizeResponse,
+    SlotResponse,
 )
+from app.services.availability_service import AvailabilityService
+from app.services.schedule_optimizer import ScheduleOptimizerService
 from app.services.schedule_service import ScheduleService
 from app.models.schedule import Appointment, Resource
 from app.models.patient import Patient
@@ -17,6 +21,7 @@ from app.models.order import ImagingOrder
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
+settings = get_settings()
 router = APIRouter(tags=["Scheduling"])
 
 
@@ -79,6 +84,69 @@ async def get_slots(
     return await svc.get_available_slots(resource_id, date, duration_minutes)
 
 
+@router.get("/slots/search", response_model=list[FreeSlotResponse],
+            dependencies=[require_permission("appointments:read")])
+async def search_slots(
+    db: DBSession,
+    modality: Optional[str] = None,
+    resource_id: Optional[List[int]] = Query(None),
+    duration_minutes: int = Query(30, ge=5, le=480),
+    limit: int = Query(10, ge=1, le=200),
+    days: int = Query(14, ge=1, le=settings.slot_search_max_days),
+    start: Optional[datetime] = Query(None, description="Earliest start (default: now)"),
+    step_minutes: Optional[int] = Query(None, ge=5, le=240),
+):
+    """First free slots across all rooms of a modality (or the given resources), earliest first.
+
+    Honors operating hours, always read in SCHEDULE_TIMEZONE, and resource
+    capacity. ``start`` may carry any offset; a naive ``start`` is taken as UTC,
+    as are naive datetimes when booking.
+    """
+    svc = AvailabilityService(db)
+    found = await svc.search(
+        duration_minutes, modality=modality, resource_ids=resource_id,
+        start=start, days=days, limit=limit, step_minutes=step_minutes,
+    )
+    return [
+        FreeSlotResponse(
+            resource_id=r.id, resource_name=r.name, modality=r.modality,
+            start_datetime=slot.start, end_datetime=slot.end, duration_minutes=duration_minutes,
+        )
+        for slot, r in found
+    ]
+
+
+@router.post("/schedule/optimize", response_model=ScheduleOptimizeResponse,
+             dependencies=[require_permission("appointments:write")])
+async def optimize_schedule(data: ScheduleOptimizeRequest, db: DBSession, current_user: CurrentUser):
+    """Assign rooms and start times to pending orders for one day.
+
+    Without ``apply`` this is a dry run returning the proposed plan and the
+    resulting utilization; with ``apply`` the appointments are booked and the
+    orders and worklist entries updated.
+    """
+    svc = ScheduleOptimizerService(db)
+    result = await svc.optimize(
+        data.day, order_ids=data.order_ids, modality=data.modality, durations=data.durations,
+        default_duration_minutes=data.default_duration_minutes, apply=data.apply,
+    )
+    available = sum(r["available_minutes"] for r in result.utilization)
+    used = sum(r["booked_minutes"] + r["planned_minutes"] for r in result.utilization)
+    return ScheduleOptimizeResponse(
+        applied=data.apply and bool(result.assignments),
+        scheduled=len(result.assignments),
+        unscheduled=len(result.unscheduled),
+        utilization=round(used / available, 3) if available else 0.0,
+        duration_ms=result.duration_ms,
+        assignments=[
+            {"order_id": a.order_id, "resource_id": a.resource_id, "start_datetime": a.start, "end_datetime": a.end}
+            for a in result.assignments
+        ],
+        unscheduled_orders=[{"order_id": o, "reason": reason} for o, reason in result.unscheduled],
+        resources=result.utilization,
+    )
+
+
 # ── Appointments ───────────────────────────────────────────────────────────────
 
 @router.post("/appointments", response_model=AppointmentResponse, status_code=201,
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
 
 from fastapi import APIRouter, Query
 from sqlalchemy import extract, func, select, and_
 
+from app.config import get_settings
+from app.core.exceptions import BadRequestError
 from app.dependencies import CurrentUser, DBSession
 from app.models.order import ImagingOrder, OrderStatus
 from app.models.report import RadiologyReport
 from app.models.user import User
+from app.services.utilization_service import UtilizationService
 
+settings = get_settings()
 router = APIRouter(prefix="/statistics", tags=["Statistics"])
 
 
@@ -87,3 +92,20 @@ async def radiologist_productivity(
     )
     rows = result.all()
     return [{"month": r.month, "radiologist": r.radiologist, "count": r.count} for r in rows]
+
+
+@router.get("/utilization", summary="Booked vs available minutes per resource, weekday and hour")
+async def resource_utilization(
+    db: DBSession,
+    current_user: CurrentUser,
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    resource_id: Optional[List[int]] = Query(None),
+    modality: Optional[str] = None,
+):
+    if date_to < date_from:
+        raise BadRequestError("date_to must not be before date_from")
+    if (date_to - date_from).days >= settings.utilization_max_days:
+        raise BadRequestError(f"Range exceeds {settings.utilization_max_days} days")
+    svc = UtilizationService(db)
+    return await svc.heatmap(date_from, date_to, resource_ids=resource_id, modality=modality)
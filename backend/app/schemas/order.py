@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from pydantic import BaseModel, Field, model_validator
 
@@ -35,6 +35,25 @@ class ImagingOrderCreate(BaseModel):
         return self
 
 
+class ImagingOrderBulkCreate(BaseModel):
+    """Items are validated one by one as ImagingOrderCreate, so one bad item does not reject the batch."""
+    orders: List[dict[str, Any]] = Field(..., min_length=1)
+
+
+class BulkOrderItemResult(BaseModel):
+    index: int
+    status: int
+    order_id: Optional[int] = None
+    accession_number: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkOrderResponse(BaseModel):
+    created: int
+    failed: int
+    items: List[BulkOrderItemResult]
+
+
 class ImagingOrderUpdate(BaseModel):
     status: Optional[OrderStatus] = None
     priority: Optional[OrderPriority] = None
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 
 from pydantic import BaseModel
 
 from app.models.report import ReportStatus
+from app.models.report_packet import PacketFormat, PacketStatus
 
 
 class ReportCreate(BaseModel):
@@ -75,3 +76,28 @@ class ReportResponse(BaseModel):
     versions: List[ReportVersionResponse] = []
 
     model_config = {"from_attributes": True}
+
+
+class ReportPacketRequest(BaseModel):
+    """Signed reports of a patient and/or signed within [date_from, date_to]."""
+
+    format: PacketFormat = PacketFormat.pdf
+    patient_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
+class ReportPacketResponse(BaseModel):
+    id: str
+    status: PacketStatus
+    format: PacketFormat
+    patient_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    total: int
+    done: int
+    error: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Annotated, List, Optional
 
 from pydantic import BaseModel, Field, model_validator
 
@@ -100,3 +100,56 @@ class SlotResponse(BaseModel):
     end_datetime: datetime
     duration_minutes: int
     available: bool
+
+
+class FreeSlotResponse(BaseModel):
+    resource_id: int
+    resource_name: str
+    modality: Optional[str] = None
+    start_datetime: datetime
+    end_datetime: datetime
+    duration_minutes: int
+
+
+class ScheduleOptimizeRequest(BaseModel):
+    day: date
+    order_ids: Optional[List[int]] = None  # default: every REQUESTED order without appointment
+    modality: Optional[str] = Field(None, max_length=10)
+    durations: dict[str, Annotated[int, Field(ge=5, le=480)]] = Field(
+        default_factory=dict, description="Minutes per modality, e.g. {\"MR\": 45}"
+    )
+    default_duration_minutes: int = Field(30, ge=5, le=480)
+    apply: bool = False
+
+
+class ScheduleAssignment(BaseModel):
+    order_id: int
+    resource_id: int
+    start_datetime: datetime
+    end_datetime: datetime
+
+
+class UnscheduledOrder(BaseModel):
+    order_id: int
+    reason: str
+
+
+class ResourceUtilization(BaseModel):
+    resource_id: int
+    resource_name: str
+    modality: Optional[str] = None
+    available_minutes: int
+    booked_minutes: int
+    planned_minutes: int
+    utilization: float
+
+
+class ScheduleOptimizeResponse(BaseModel):
+    applied: bool
+    scheduled: int
+    unscheduled: int
+    utilization: float
+    duration_ms: float
+    assignments: List[ScheduleAssignment]
+    unscheduled_orders: List[UnscheduledOrder]
+    resources: List[ResourceUtilization]
@@ -0,0 +1,203 @@
+"""
+Free-slot search across resources and days.
+
+Bookings of one resource are loaded once, sorted by lane and start. Within a
+lane bookings never overlap (exclusion constraint), so a single merge pass of
+the lane's sorted bookings against the resource's sorted operating windows
+yields its free gaps. Gaps are cut into slots aligned to the window start,
+and the per-lane and per-resource slot streams are combined with
+``heapq.merge``; everything is lazy, so "first N" stops as soon as N slots
+are found. A slot is free when any of the resource's ``capacity`` lanes is.
+"""
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Iterable, Iterator, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import TSTZRANGE
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.schedule import INACTIVE_APPOINTMENT_STATUSES, Appointment, Resource
+
+settings = get_settings()
+
+Interval = tuple[datetime, datetime]
+
+
+@dataclass(frozen=True, order=True)
+class FreeSlot:
+    start: datetime
+    end: datetime
+    resource_id: int
+    lane: int
+
+
+def schedule_tz() -> tzinfo:
+    return ZoneInfo(settings.schedule_timezone)
+
+
+def operating_windows(resource: Resource, first_day: date, days: int, tz: tzinfo) -> list[Interval]:
+    """Operating hours of ``resource`` for each day, as aware intervals in ``tz``."""
+    windows = []
+    for n in range(days):
+        day = first_day + timedelta(days=n)
+        start = datetime.combine(day, time(resource.operating_start_hour), tz)
+        end = datetime.combine(day, time(), tz) + timedelta(hours=resource.operating_end_hour)
+        if end > start:
+            windows.append((start, end))
+    return windows
+
+
+def _utc(dt: datetime) -> datetime:
+    """Naive datetimes are UTC, as they are stored."""
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def within_operating_hours(resource: Resource, start: datetime, end: datetime) -> bool:
+    """Whether ``[start, end)`` lies within the resource's operating hours in SCHEDULE_TIMEZONE.
+
+    The windows are the ones the slot search offers, whatever offset the
+    client sent; naive datetimes are taken as UTC.
+    """
+    tz = schedule_tz()
+    start = _utc(start).astimezone(tz)
+    end = _utc(end).astimezone(tz)
+    return any(w_start <= start and end <= w_end for w_start, w_end in operating_windows(resource, start.date(), 1, tz))
+
+
+def free_gaps(windows: list[Interval], busy: Iterable[Interval]) -> Iterator[tuple[datetime, datetime, datetime]]:
+    """``(gap_start, gap_end, window_start)`` of each window not covered by ``busy``.
+
+    Both inputs are sorted by start and ``busy`` is non-overlapping, so one
+    forward pass over each is enough.
+    """
+    busy = iter(busy)
+    current = next(busy, None)
+    for w_start, w_end in windows:
+        cursor = w_start
+        # Skip bookings that end before this window
+        while current is not None and current[1] <= cursor:
+            current = next(busy, None)
+        while current is not None and current[0] < w_end:
+            if current[0] > cursor:
+                yield cursor, current[0], w_start
+            cursor = max(cursor, current[1])
+            if current[1] >= w_end:
+                break
+            current = next(busy, None)
+        if cursor < w_end:
+            yield cursor, w_end, w_start
+
+
+def gap_slots(
+    gaps: Iterable[tuple[datetime, datetime, datetime]],
+    duration: timedelta,
+    step: timedelta,
+    not_before: datetime,
+    origin: Optional[datetime] = None,
+) -> Iterator[Interval]:
+    """Slots of ``duration`` inside each gap, on a ``step`` grid from ``origin`` (default: window start)."""
+    for g_start, g_end, w_start in gaps:
+        grid = origin or w_start
+        earliest = max(g_start, not_before)
+        start = grid + -(-(earliest - grid) // step) * step
+        while start + duration <= g_end:
+            yield start, start + duration
+            start += step
+
+
+def resource_slots(
+    resource: Resource,
+    windows: list[Interval],
+    bookings: dict[int, list[Interval]],
+    duration: timedelta,
+    step: timedelta,
+    not_before: datetime,
+    origin: Optional[datetime] = None,
+) -> Iterator[FreeSlot]:
+    """Free slots of one resource in time order, each on the lowest free lane."""
+    def lane_slots(lane: int) -> Iterator[FreeSlot]:
+        gaps = free_gaps(windows, bookings.get(lane, ()))
+        for start, end in gap_slots(gaps, duration, step, not_before, origin):
+            yield FreeSlot(start, end, resource.id, lane)
+
+    lanes = [lane_slots(lane) for lane in range(max(resource.capacity or 1, 1))]
+    last: Optional[datetime] = None
+    for slot in heapq.merge(*lanes):
+        if slot.start != last:
+            last = slot.start
+            yield slot
+
+
+class AvailabilityService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(
+        self,
+        duration_minutes: int,
+        modality: Optional[str] = None,
+        resource_ids: Optional[list[int]] = None,
+        start: Optional[datetime] = None,
+        days: int = 14,
+        limit: int = 10,
+        step_minutes: Optional[int] = None,
+    ) -> list[tuple[FreeSlot, Resource]]:
+        """First ``limit`` free slots across the matching resources, earliest first."""
+        # Operating hours are always read in SCHEDULE_TIMEZONE, whatever offset ``start`` has;
+        # a naive ``start`` is UTC, like the datetimes the slot is then booked with
+        tz = schedule_tz()
+        not_before = (_utc(start) if start is not None else datetime.now(tz)).astimezone(tz)
+        stmt = select(Resource).where(Resource.is_available.is_(True))
+        if modality:
+            stmt = stmt.where(Resource.modality == modality)
+        if resource_ids:
+            stmt = stmt.where(Resource.id.in_(resource_ids))
+        resources = list((await self.db.execute(stmt.order_by(Resource.id))).scalars().all())
+        if not resources:
+            return []
+
+        first_day = not_before.date()
+        windows = {r.id: operating_windows(r, first_day, days, tz) for r in resources}
+        horizon = datetime.combine(first_day + timedelta(days=days), time(), tz)
+        bookings = await self.bookings([r.id for r in resources], not_before, horizon)
+
+        duration = timedelta(minutes=duration_minutes)
+        step = timedelta(minutes=step_minutes or settings.slot_step_minutes)
+        streams = [
+            resource_slots(r, windows[r.id], bookings.get(r.id, {}), duration, step, not_before)
+            for r in resources
+        ]
+        by_id = {r.id: r for r in resources}
+        found = []
+        for slot in heapq.merge(*streams):
+            found.append((slot, by_id[slot.resource_id]))
+            if len(found) >= limit:
+                break
+        return found
+
+    async def bookings(
+        self, resource_ids: list[int], start: datetime, end: datetime
+    ) -> dict[int, dict[int, list[Interval]]]:
+        """``{resource_id: {lane: [(start, end), ...]}}`` of slot-holding appointments, sorted."""
+        result = await self.db.execute(
+            select(
+                Appointment.resource_id, Appointment.lane,
+                Appointment.start_datetime, Appointment.end_datetime,
+            )
+            .where(
+                Appointment.resource_id.in_(resource_ids),
+                Appointment.during.op("&&")(func.tstzrange(start, end, "[)", type_=TSTZRANGE)),
+                Appointment.status.notin_(INACTIVE_APPOINTMENT_STATUSES),
+            )
+            .order_by(Appointment.resource_id, Appointment.lane, Appointment.start_datetime)
+        )
+        bookings: dict[int, dict[int, list[Interval]]] = {}
+        for resource_id, lane, b_start, b_end in result.all():
+            bookings.setdefault(resource_id, {}).setdefault(lane, []).append((b_start, b_end))
+        return bookings
@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import get_settings
+from app.core.worklist_writer import write_after_commit
+from app.models.order import ImagingOrder, Modality, OrderPriority, OrderStatus, generate_accession_number
+from app.models.patient import Gender, Patient, PatientContact
+from app.models.worklist import DicomWorklistEntry
+from app.schemas.order import ImagingOrderCreate
+from app.schemas.patient import PatientCreate
+from app.services.patient_service import generate_mrn
+from app.services.worklist_service import WorklistService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_DCM_SYSTEM = "http://dicom.nema.org/resources/ontology/DCM"
+_IDENTIFIER_SYSTEMS = {"urn:oid:mrn": "mrn", "urn:oid:dni": "dni"}
+_GENDER = {"male": Gender.male, "female": Gender.female, "other": Gender.other, "unknown": Gender.unknown}
+_PRIORITY = {
+    "routine": OrderPriority.routine, "urgent": OrderPriority.urgent,
+    "asap": OrderPriority.asap, "stat": OrderPriority.stat,
+}
+_MODALITIES = {m.value for m in Modality}
+
+
+class _EntryError(Exception):
+    def __init__(self, status: str, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def _invalid(message: str) -> _EntryError:
+    return _EntryError("400 Bad Request", "invalid", message)
+
+
+def outcome(code: str, message: str) -> dict[str, Any]:
+    return {
+        "resourceType": "OperationOutcome",
+        "issue": [{"severity": "error", "code": code, "diagnostics": message}],
+    }
+
+
+@dataclass
+class _Entry:
+    index: int
+    full_url: Optional[str]
+    resource_type: str
+    values: dict[str, Any] = field(default_factory=dict)
+    contacts: list[dict[str, Any]] = field(default_factory=list)
+    subject: Optional[tuple[str, str]] = None      # ("id"|"mrn"|"dni"|"urn", value)
+    if_none_exist: Optional[tuple[str, str]] = None
+    error: Optional[_EntryError] = None
+    # Filled in while persisting
+    patient: Any = None
+    id: Optional[int] = None
+    created: bool = True
+
+
+@dataclass
+class BundleResult:
+    status_code: int
+    body: dict[str, Any]
+    order_ids: list[int]
+
+
+class FHIRBundleService:
+    """Ingests FHIR ``batch``/``transaction`` Bundles of Patient and ServiceRequest POSTs.
+
+    Every entry is parsed and validated before anything is written, patient
+    references (``Patient/<id>``, ``Patient?identifier=...`` and in-bundle
+    ``urn:uuid:`` fullUrls) are resolved with a single query, and patients,
+    orders and worklist rows are inserted with one multi-row INSERT each.
+    ``.wl`` files, ORM^O01 messages and notifications are left to
+    :func:`fan_out_order_side_effects`, run after the response is sent.
+
+    A ``transaction`` is all-or-nothing; a ``batch`` persists the valid entries
+    and reports per-entry errors.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def process(self, bundle: Any, user_id: Optional[int]) -> BundleResult:
+        if not isinstance(bundle, dict) or bundle.get("resourceType") != "Bundle":
+            return BundleResult(400, outcome("invalid", "Expected a Bundle resource"), [])
+        bundle_type = bundle.get("type")
+        if bundle_type not in ("batch", "transaction"):
+            return BundleResult(400, outcome("invalid", "Bundle.type must be 'batch' or 'transaction'"), [])
+        raw_entries = bundle.get("entry") or []
+        if len(raw_entries) > settings.fhir_bundle_max_entries:
+            return BundleResult(
+                413, outcome("too-costly", f"Bundle exceeds {settings.fhir_bundle_max_entries} entries"), []
+            )
+
+        entries = [self._parse(i, e) for i, e in enumerate(raw_entries)]
+        await self._resolve_patients(entries)
+
+        failed = [e for e in entries if e.error]
+        if bundle_type == "transaction" and failed:
+            issues = [
+                {"severity": "error", "code": e.error.code, "diagnostics": f"entry[{e.index}]: {e.error}"}
+                for e in failed
+            ]
+            return BundleResult(400, {"resourceType": "OperationOutcome", "issue": issues}, [])
+
+        await self._insert_patients([e for e in entries if e.resource_type == "Patient" and not e.error])
+        orders = await self._insert_orders(
+            [e for e in entries if e.resource_type == "ServiceRequest" and not e.error], user_id
+        )
+
+        return BundleResult(
+            200,
+            {
+                "resourceType": "Bundle",
+                "id": uuid.uuid4().hex,
+                "type": f"{bundle_type}-response",
+                "entry": [self._response_entry(e) for e in entries],
+            },
+            [o.id for o in orders],
+        )
+
+    # ── Parsing ────────────────────────────────────────────────────────────────
+
+    def _parse(self, index: int, raw: Any) -> _Entry:
+        resource = raw.get("resource") if isinstance(raw, dict) else None
+        rtype = resource.get("resourceType") if isinstance(resource, dict) else None
+        entry = _Entry(index=index, full_url=raw.get("fullUrl") if isinstance(raw, dict) else None,
+                       resource_type=rtype or "")
+        try:
+            request = raw.get("request") or {}
+            if request.get("method") != "POST":
+                raise _EntryError("405 Method Not Allowed", "not-supported", "Only POST entries are supported")
+            if rtype == "Patient":
+                self._parse_patient(entry, resource)
+                if request.get("ifNoneExist"):
+                    entry.if_none_exist = _parse_identifier_query(request["ifNoneExist"])
+            elif rtype == "ServiceRequest":
+                self._parse_service_request(entry, resource)
+            else:
+                raise _EntryError("422 Unprocessable Entity", "not-supported", f"Unsupported resourceType '{rtype}'")
+        except _EntryError as e:
+            entry.error = e
+        except ValidationError as e:
+            entry.error = _invalid("; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+        except (AttributeError, TypeError, KeyError, IndexError, ValueError) as e:
+            entry.error = _invalid(f"Malformed {rtype or 'entry'}: {e}")
+        return entry
+
+    def _parse_patient(self, entry: _Entry, r: dict) -> None:
+        name = next((n for n in r.get("name") or [] if n.get("use") in (None, "official", "usual")), None)
+        if not name:
+            raise _invalid("Patient.name is required")
+        dni = next(
+            (i.get("value") for i in r.get("identifier") or [] if i.get("system") == "urn:oid:dni"), None
+        )
+        data = PatientCreate(
+            first_name=" ".join(name.get("given") or []),
+            last_name=name.get("family") or "",
+            date_of_birth=date.fromisoformat(r["birthDate"]) if r.get("birthDate") else None,
+            gender=_GENDER.get(r.get("gender")) if r.get("gender") else None,
+            dni=dni,
+        )
+        entry.values = data.model_dump(exclude={"contacts"})
+        for t in r.get("telecom") or []:
+            if t.get("system") in ("phone", "email") and t.get("value"):
+                entry.contacts.append({
+                    "contact_type": t["system"],
+                    "value": t["value"],
+                    "label": t.get("use") if t["system"] == "phone" else None,
+                })
+
+    def _parse_service_request(self, entry: _Entry, r: dict) -> None:
+        reference = (r.get("subject") or {}).get("reference")
+        if not reference:
+            raise _invalid("ServiceRequest.subject is required")
+        entry.subject = _parse_reference(reference)
+
+        code = r.get("code") or {}
+        codings = [c for cc in (r.get("category") or []) + [code] + (r.get("orderDetail") or [])
+                   for c in cc.get("coding") or []]
+        modality = next(
+            (c["code"] for c in codings if c.get("system") == _DCM_SYSTEM and c.get("code") in _MODALITIES),
+            None,
+        ) or next((c["code"] for c in codings if c.get("code") in _MODALITIES), None)
+        if not modality:
+            raise _invalid("No DICOM modality code found in ServiceRequest.category/code/orderDetail")
+        procedure = next((c for c in code.get("coding") or [] if c.get("code") != modality), {})
+        description = code.get("text") or procedure.get("display")
+
+        data = ImagingOrderCreate(
+            patient_id=0,  # resolved later
+            modality=modality,
+            procedure_code=procedure.get("code"),
+            procedure_description=description or "",
+            body_part=_first_text(r.get("bodySite")),
+            priority=_PRIORITY.get(r.get("priority") or "routine", OrderPriority.routine),
+            clinical_indication=_first_text(r.get("reasonCode")),
+            special_instructions="\n".join(n["text"] for n in r.get("note") or [] if n.get("text")) or None,
+            scheduled_at=r.get("occurrenceDateTime"),
+        )
+        entry.values = data.model_dump(include={
+            "modality", "procedure_code", "procedure_description", "body_part",
+            "priority", "clinical_indication", "special_instructions", "scheduled_at",
+        })
+
+    # ── Reference resolution (one query) ───────────────────────────────────────
+
+    async def _resolve_patients(self, entries: list[_Entry]) -> None:
+        in_bundle = {e.full_url: e for e in entries if e.resource_type == "Patient" and e.full_url}
+        keys: dict[str, set] = {"id": set(), "mrn": set(), "dni": set()}
+        for e in entries:
+            if e.error:
+                continue
+            if e.subject and e.subject[0] != "urn":
+                keys[e.subject[0]].add(e.subject[1])
+            if e.if_none_exist:
+                keys[e.if_none_exist[0]].add(e.if_none_exist[1])
+            if e.resource_type == "Patient" and e.values.get("dni"):
+                keys["dni"].add(e.values["dni"])
+
+        by_key: dict[tuple[str, Any], Patient] = {}
+        clauses = [getattr(Patient, k).in_(v) for k, v in keys.items() if v]
+        if clauses:
+            result = await self.db.execute(select(Patient).where(or_(*clauses)))
+            for p in result.scalars().all():
+                by_key[("id", p.id)] = p
+                by_key[("mrn", p.mrn)] = p
+                if p.dni:
+                    by_key[("dni", p.dni)] = p
+
+        dnis_in_bundle: set[str] = set()
+        for e in entries:
+            if e.error or e.resource_type != "Patient":
+                continue
+            existing = by_key.get(e.if_none_exist) if e.if_none_exist else None
+            if existing:
+                e.patient, e.id, e.created = existing, existing.id, False
+            elif e.values.get("dni") and (("dni", e.values["dni"]) in by_key or e.values["dni"] in dnis_in_bundle):
+                e.error = _EntryError("409 Conflict", "duplicate", f"Patient with DNI {e.values['dni']} already exists")
+            elif e.values.get("dni"):
+                dnis_in_bundle.add(e.values["dni"])
+
+        for e in entries:
+            if e.error or e.resource_type != "ServiceRequest":
+                continue
+            kind, value = e.subject
+            if kind == "urn":
+                target = in_bundle.get(value)
+                if target is None:
+                    e.error = _EntryError("404 Not Found", "not-found", f"No Patient entry with fullUrl {value}")
+                elif target.error:
+                    e.error = _EntryError("424 Failed Dependency", "processing",
+                                          f"Referenced Patient entry[{target.index}] failed")
+                else:
+                    e.patient = target
+            else:
+                e.patient = by_key.get((kind, value))
+                if e.patient is None:
+                    e.error = _EntryError("404 Not Found", "not-found", f"Patient {kind}={value} not found")
+
+    # ── Bulk persistence ───────────────────────────────────────────────────────
+
+    async def _insert_patients(self, entries: list[_Entry]) -> None:
+        new = [e for e in entries if e.created]
+        if not new:
+            return
+        rows = [{**e.values, "mrn": generate_mrn(), "is_active": True} for e in new]
+        result = await self.db.execute(
+            insert(Patient).returning(Patient, sort_by_parameter_order=True), rows
+        )
+        for e, patient in zip(new, result.scalars().all()):
+            e.patient, e.id = patient, patient.id
+
+        contacts = [{**c, "patient_id": e.id, "is_primary": i == 0}
+                    for e in new for i, c in enumerate(e.contacts)]
+        if contacts:
+            await self.db.execute(insert(PatientContact), contacts)
+
+    async def _insert_orders(self, entries: list[_Entry], user_id: Optional[int]) -> list[ImagingOrder]:
+        if not entries:
+            return []
+        patients = [e.patient.patient if isinstance(e.patient, _Entry) else e.patient for e in entries]
+        rows = [
+            {
+                **e.values,
+                "patient_id": p.id,
+                "requesting_physician_id": user_id,
+                "accession_number": generate_accession_number(),
+                "status": OrderStatus.scheduled if e.values.get("scheduled_at") else OrderStatus.requested,
+            }
+            for e, p in zip(entries, patients)
+        ]
+        result = await self.db.execute(
+            insert(ImagingOrder).returning(ImagingOrder, sort_by_parameter_order=True), rows
+        )
+        orders = list(result.scalars().all())
+        for e, order in zip(entries, orders):
+            e.id = order.id
+
+        await self.db.execute(
+            insert(DicomWorklistEntry),
+            [WorklistService.entry_values(o, p) for o, p in zip(orders, patients)],
+        )
+        return orders
+
+    @staticmethod
+    def _response_entry(e: _Entry) -> dict[str, Any]:
+        if e.error:
+            return {"response": {"status": e.error.status, "outcome": outcome(e.error.code, str(e.error))}}
+        response = {
+            "status": "201 Created" if e.created else "200 OK",
+            "location": f"{e.resource_type}/{e.id}",
+        }
+        entry: dict[str, Any] = {"response": response}
+        if e.full_url:
+            entry["fullUrl"] = e.full_url
+        return entry
+
+
+def _parse_reference(reference: str) -> tuple[str, str]:
+    if reference.startswith("urn:uuid:"):
+        return "urn", reference
+    if reference.startswith("Patient?"):
+        return _parse_identifier_query(reference.split("?", 1)[1])
+    rtype, _, rid = reference.rpartition("/")
+    if rtype.endswith("Patient") and rid.isdigit():
+        return "id", int(rid)
+    raise _invalid(f"Unsupported subject reference '{reference}'")
+
+
+def _parse_identifier_query(query: str) -> tuple[str, str]:
+    """``identifier=<system>|<value>`` with the MRN or DNI system."""
+    param, _, token = query.partition("=")
+    system, _, value = token.partition("|")
+    kind = _IDENTIFIER_SYSTEMS.get(system)
+    if param != "identifier" or not kind or not value:
+        raise _invalid(f"Unsupported conditional reference '{query}' (use identifier=urn:oid:mrn|<value>)")
+    return kind, value
+
+
+def _first_text(concepts: Optional[list[dict]]) -> Optional[str]:
+    for c in concepts or []:
+        text = c.get("text") or next((x.get("display") for x in c.get("coding") or [] if x.get("display")), None)
+        if text:
+            return text
+    return None
+
+
+# ── Side effects (run after the response, on their own session) ──────────────
+
+async def fan_out_order_side_effects(order_ids: list[int]) -> None:
+    """Write ``.wl`` files, store ORM^O01 messages and notify technicians for new orders."""
+    if not order_ids:
+        return
+    from app.db.session import AsyncSessionLocal
+    from app.models.user import UserRole
+    from app.services.hl7_service import HL7Service
+    from app.services.notification_service import NotificationService
+
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.execute(
+                select(DicomWorklistEntry)
+                .options(selectinload(DicomWorklistEntry.order).selectinload(ImagingOrder.patient))
+                .where(DicomWorklistEntry.order_id.in_(order_ids))
+            )
+            entries = list(result.scalars().all())
+            if not entries:
+                return
+
+            # wl_file_path was stored with the entry; the files follow this commit
+            write_after_commit(db, entries)
+
+            db.add_all([HL7Service.orm_o01_message(e.order.patient, e.order) for e in entries])
+
+            modalities = sorted({e.modality for e in entries})
+            await NotificationService(db).notify_role(
+                UserRole.technician, "order_created",
+                f"{len(entries)} nuevas órdenes" if len(entries) > 1 else f"Nueva orden: {entries[0].procedure_description}",
+                body=f"Modalidad: {', '.join(modalities)}",
+                link="/worklist",
+            )
+            await db.commit()
+            logger.info(f"Order side effects done for {len(entries)} orders")
+        except Exception:
+            await db.rollback()
+            logger.exception(f"Order side effects failed for orders {order_ids[:10]}...")
+
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import shutil
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import get_settings
+from app.core.exceptions import BadRequestError, NotFoundError
+from app.core.responses import dumps_line
+from app.models.fhir_export import ExportStatus, FHIRExportJob
+from app.models.order import ImagingOrder
+from app.models.patient import Patient
+from app.models.report import RadiologyReport
+from app.models.study import ImagingStudy
+from app.services.fhir_service import FHIRService, Ref
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EXPORTABLE_TYPES = ("Patient", "ServiceRequest", "ImagingStudy", "DiagnosticReport")
+
+
+class _NDJSONWriter:
+    """Appends NDJSON lines to a gzip file; used from a worker thread."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = gzip.open(path, "wb", compresslevel=3)
+        self.count = 0
+
+    def write(self, lines: List[bytes]) -> None:
+        self._fh.write(b"".join(lines))
+        self.count += len(lines)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class FHIRExportService:
+    """FHIR Bulk Data export: job bookkeeping plus the streaming NDJSON writer.
+
+    Each resource type is read from a server-side cursor in batches of
+    ``fhir_export_batch_size`` rows, mapped through ``FHIRService`` and written to
+    ``<fhir_export_dir>/<job_id>/<Type>.ndjson.gz``. Encoding and compression of
+    one batch overlap with fetching the next one.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.fhir = FHIRService()
+
+    # ── Job bookkeeping ────────────────────────────────────────────────────────
+
+    async def create_job(
+        self, request_url: str, types: Optional[str], since: Optional[str], user_id: Optional[int]
+    ) -> FHIRExportJob:
+        resource_types = [t.strip() for t in (types or ",".join(EXPORTABLE_TYPES)).split(",") if t.strip()]
+        unknown = [t for t in resource_types if t not in EXPORTABLE_TYPES]
+        if unknown:
+            raise BadRequestError(f"Unsupported _type: {', '.join(unknown)}")
+
+        since_dt = None
+        if since:
+            try:
+                since_dt = datetime.fromisoformat(since.replace("Z", "+00:00"))
+            except ValueError:
+                raise BadRequestError(f"Invalid _since value '{since}'")
+            if since_dt.tzinfo is None:
+                since_dt = since_dt.replace(tzinfo=timezone.utc)
+
+        job = FHIRExportJob(
+            resource_types=",".join(resource_types),
+            since=since_dt,
+            request_url=request_url,
+            requested_by_id=user_id,
+            status=ExportStatus.accepted,
+        )
+        self.db.add(job)
+        await self.db.flush()
+        return job
+
+    async def get_job(self, job_id: str) -> FHIRExportJob:
+        result = await self.db.execute(select(FHIRExportJob).where(FHIRExportJob.id == job_id))
+        job = result.scalar_one_or_none()
+        if not job:
+            raise NotFoundError(f"Export job {job_id} not found")
+        return job
+
+    async def cancel_job(self, job_id: str) -> None:
+        job = await self.get_job(job_id)
+        if job.status in (ExportStatus.accepted, ExportStatus.in_progress):
+            job.status = ExportStatus.cancelled
+            await self.db.flush()
+        else:
+            await self.db.delete(job)
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    @staticmethod
+    def job_dir(job_id: str) -> Path:
+        return Path(settings.fhir_export_dir) / job_id
+
+    def output_file(self, job_id: str, filename: str) -> Path:
+        path = (self.job_dir(job_id) / filename).resolve()
+        if path.parent != self.job_dir(job_id).resolve() or not path.is_file():
+            raise NotFoundError(f"Export file {filename} not found")
+        return path
+
+    @staticmethod
+    def manifest(job: FHIRExportJob, base_url: str) -> dict[str, Any]:
+        return {
+            "transactionTime": job.transaction_time.isoformat(),
+            "request": job.request_url,
+            "requiresAccessToken": True,
+            "output": [
+                {
+                    "type": o["type"],
+                    "url": f"{base_url}/$export-file/{job.id}/{o['file']}",
+                    "count": o["count"],
+                }
+                for o in (job.output or [])
+            ],
+            "error": [],
+        }
+
+    # ── Export run (Celery worker) ─────────────────────────────────────────────
+
+    async def run(self, job_id: str) -> None:
+        job = await self.get_job(job_id)
+        if job.status != ExportStatus.accepted:
+            logger.info(f"Export {job_id} skipped (status={job.status.value})")
+            return
+        job.status = ExportStatus.in_progress
+        await self.db.commit()
+
+        out_dir = self.job_dir(job_id)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        output: list[dict[str, Any]] = []
+        total = 0
+        try:
+            for resource_type in job.resource_types.split(","):
+                count = await self._export_type(job, resource_type, out_dir / f"{resource_type}.ndjson.gz", total)
+                if count is None:
+                    logger.info(f"Export {job_id} cancelled")
+                    shutil.rmtree(out_dir, ignore_errors=True)
+                    return
+                total += count
+                if count:
+                    output.append({"type": resource_type, "file": f"{resource_type}.ndjson.gz", "count": count})
+                else:
+                    (out_dir / f"{resource_type}.ndjson.gz").unlink(missing_ok=True)
+        except Exception as e:
+            logger.exception(f"Export {job_id} failed")
+            await self.db.rollback()
+            await self.db.execute(
+                update(FHIRExportJob).where(FHIRExportJob.id == job_id)
+                .values(status=ExportStatus.failed, error=str(e)[:2000])
+            )
+            await self.db.commit()
+            shutil.rmtree(out_dir, ignore_errors=True)
+            return
+
+        await self.db.execute(
+            update(FHIRExportJob).where(FHIRExportJob.id == job_id).values(
+                status=ExportStatus.completed,
+                output=output,
+                resources_exported=total,
+                completed_at=datetime.now(timezone.utc),
+            )
+        )
+        await self.db.commit()
+        logger.info(f"Export {job_id} completed: {total} resources")
+
+    def _query(self, resource_type: str):
+        if resource_type == "Patient":
+            return select(Patient).options(selectinload(Patient.contacts)), self.fhir.patient_to_fhir
+        if resource_type == "ServiceRequest":
+            return select(ImagingOrder), self.fhir.order_to_fhir
+        if resource_type == "ImagingStudy":
+            return (
+                select(ImagingStudy).options(selectinload(ImagingStudy.order)),
+                lambda s: self.fhir.study_to_fhir(s, s.order, Ref(s.order.patient_id) if s.order else None),
+            )
+        return (
+            select(RadiologyReport).options(selectinload(RadiologyReport.study).selectinload(ImagingStudy.order)),
+            lambda r: self.fhir.report_to_fhir(
+                r, r.study, Ref(r.study.order.patient_id) if r.study.order else None
+            ),
+        )
+
+    async def _export_type(self, job: FHIRExportJob, resource_type: str, path: Path, done: int) -> Optional[int]:
+        stmt, mapper = self._query(resource_type)
+        model = stmt.column_descriptions[0]["entity"]
+        if job.since:
+            stmt = stmt.where(model.updated_at >= job.since)
+        stmt = stmt.order_by(model.id).execution_options(yield_per=settings.fhir_export_batch_size)
+
+        writer = _NDJSONWriter(path)
+        pending: Optional[asyncio.Future] = None
+        try:
+            result = await self.db.stream(stmt)
+            async for partition in result.scalars().partitions():
+                lines = _encode(partition, mapper)
+                if pending is not None:
+                    await pending
+                pending = asyncio.ensure_future(asyncio.to_thread(writer.write, lines))
+                if await self._cancelled(job.id, done + writer.count + len(lines)):
+                    await pending
+                    return None
+            if pending is not None:
+                await pending
+        finally:
+            # Never close the gzip stream under a write still running in the worker thread
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            writer.close()
+        return writer.count
+
+    async def _cancelled(self, job_id: str, progress: int) -> bool:
+        """Record progress and report whether the job was cancelled meanwhile."""
+        async with self.db.bind.connect() as conn:
+            result = await conn.execute(
+                update(FHIRExportJob)
+                .where(FHIRExportJob.id == job_id)
+                .values(resources_exported=progress)
+                .returning(FHIRExportJob.status)
+            )
+            status = result.scalar_one_or_none()
+            await conn.commit()
+        return status == ExportStatus.cancelled
+
+    async def purge_expired(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.fhir_export_retention_hours)
+        result = await self.db.execute(
+            delete(FHIRExportJob).where(FHIRExportJob.transaction_time < cutoff).returning(FHIRExportJob.id)
+        )
+        job_ids = result.scalars().all()
+        for job_id in job_ids:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return len(job_ids)
+
+
+def _encode(rows: list, mapper: Callable[[Any], dict[str, Any]]) -> List[bytes]:
+    return [dumps_line(mapper(r)) for r in rows]
@@ -0,0 +1,470 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Mapping, Sequence
+from urllib.parse import urlencode
+
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.exceptions import BadRequestError
+from app.models.order import ImagingOrder, Modality, OrderPriority, OrderStatus
+from app.models.patient import Gender, Patient
+from app.models.report import RadiologyReport, ReportStatus
+from app.models.study import ImagingStudy, StudyStatus
+from app.services.fhir_service import FHIRService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNT = 20
+MAX_COUNT = 200
+
+# Search parameters handled by the engine itself (never treated as filters)
+_CONTROL_PARAMS = {"_count", "_offset", "_cursor", "_include", "_revinclude", "_total", "_format"}
+
+_FHIR_GENDER = {"male": Gender.male, "female": Gender.female, "other": Gender.other, "unknown": Gender.unknown}
+
+# FHIR status → internal statuses (inverse of the FHIRService mappings)
+_SERVICE_REQUEST_STATUS = {
+    "active": [OrderStatus.requested, OrderStatus.scheduled, OrderStatus.in_progress],
+    "completed": [OrderStatus.completed],
+    "revoked": [OrderStatus.cancelled],
+    "on-hold": [OrderStatus.on_hold],
+}
+_IMAGING_STUDY_STATUS = {
+    "available": [StudyStatus.available],
+    "registered": [StudyStatus.pending, StudyStatus.received, StudyStatus.processing, StudyStatus.error],
+}
+_DIAGNOSTIC_REPORT_STATUS = {
+    "partial": [ReportStatus.draft],
+    "preliminary": [ReportStatus.preliminary],
+    "final": [ReportStatus.final],
+    "amended": [ReportStatus.amended],
+    "cancelled": [ReportStatus.cancelled],
+}
+
+
+# ── Parameter parsing helpers ──────────────────────────────────────────────────
+
+def _split(values: Iterable[str]) -> list[str]:
+    """FHIR OR-semantics: comma separated values inside a single parameter."""
+    out: list[str] = []
+    for v in values:
+        out.extend(part.strip() for part in v.split(",") if part.strip())
+    return out
+
+
+def _parse_reference(value: str, resource_type: str) -> int:
+    ref = value.rsplit("/", 1)
+    if len(ref) == 2 and ref[0].split("/")[-1] != resource_type:
+        raise BadRequestError(f"Reference '{value}' must point to a {resource_type}")
+    try:
+        return int(ref[-1])
+    except ValueError:
+        raise BadRequestError(f"Invalid {resource_type} reference '{value}'")
+
+
+def _parse_int(value: str, name: str, minimum: int = 0) -> int:
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise BadRequestError(f"Parameter {name} must be an integer")
+    if parsed < minimum:
+        raise BadRequestError(f"Parameter {name} must be >= {minimum}")
+    return parsed
+
+
+def _parse_date_range(raw: str) -> tuple[str, datetime, datetime]:
+    """Parse a FHIR date search value into (prefix, range_start, range_end).
+
+    The implicit precision of the value defines the range, e.g. ``2024`` covers
+    the whole year and ``2024-03-05`` a single day (end exclusive).
+    """
+    prefix = "eq"
+    if len(raw) > 2 and raw[:2].isalpha():
+        prefix, raw = raw[:2], raw[2:]
+    if prefix not in ("eq", "ne", "gt", "lt", "ge", "le", "sa", "eb"):
+        raise BadRequestError(f"Unsupported date prefix '{prefix}'")
+    try:
+        if len(raw) == 4:
+            start = datetime(int(raw), 1, 1, tzinfo=timezone.utc)
+            end = start.replace(year=start.year + 1)
+        elif len(raw) == 7:
+            start = datetime(int(raw[:4]), int(raw[5:7]), 1, tzinfo=timezone.utc)
+            end = (start + timedelta(days=32)).replace(day=1)
+        elif len(raw) == 10:
+            start = datetime.combine(date.fromisoformat(raw), datetime.min.time(), tzinfo=timezone.utc)
+            end = start + timedelta(days=1)
+        else:
+            start = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+            if start.tzinfo is None:
+                start = start.replace(tzinfo=timezone.utc)
+            end = start + timedelta(seconds=1)
+    except ValueError:
+        raise BadRequestError(f"Invalid date value '{raw}'")
+    return prefix, start, end
+
+
+def _date_clause(column, raw: str, as_date: bool = False):
+    prefix, start, end = _parse_date_range(raw)
+    lo: Any = start.date() if as_date else start
+    hi: Any = end.date() if as_date else end
+    if prefix == "eq":
+        return (column >= lo) & (column < hi)
+    if prefix == "ne":
+        return (column < lo) | (column >= hi)
+    if prefix in ("gt", "sa"):
+        return column >= hi
+    if prefix in ("lt", "eb"):
+        return column < lo
+    if prefix == "ge":
+        return column >= lo
+    return column < hi  # le
+
+
+def _status_clause(column, raw_values: list[str], mapping: dict[str, list]):
+    statuses = []
+    for v in raw_values:
+        if v not in mapping:
+            raise BadRequestError(f"Unknown status '{v}'")
+        statuses.extend(mapping[v])
+    return column.in_(statuses)
+
+
+class FHIRSearchService:
+    """FHIR R4 search engine for Patient, ServiceRequest, ImagingStudy and DiagnosticReport.
+
+    Supports the common search parameters of each resource, ``_count`` with
+    ``_offset`` or keyset (``_cursor``) paging, and ``_include``/``_revinclude``
+    resolved with one batched query per included resource type.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.fhir = FHIRService()
+
+    # ── Entry point ────────────────────────────────────────────────────────────
+
+    async def search(self, resource_type: str, params: Mapping[str, Sequence[str]], base_url: str) -> dict[str, Any]:
+        spec = self._specs()[resource_type]
+        model = spec["model"]
+
+        count = min(_parse_int(params["_count"][-1], "_count", 1), MAX_COUNT) if "_count" in params else DEFAULT_COUNT
+        offset = _parse_int(params["_offset"][-1], "_offset") if "_offset" in params else 0
+        cursor = _parse_int(params["_cursor"][-1], "_cursor") if "_cursor" in params else None
+
+        stmt = select(model)
+        for name, values in params.items():
+            if name in _CONTROL_PARAMS:
+                continue
+            builder = spec["params"].get(name)
+            if builder is None:
+                continue  # lenient handling: unknown parameters are ignored
+            for value in values:
+                stmt = builder(stmt, value)
+
+        total = None
+        if params.get("_total", ["accurate"])[-1] != "none":
+            count_stmt = select(func.count()).select_from(stmt.subquery())
+            total = (await self.db.execute(count_stmt)).scalar_one()
+
+        page_stmt = stmt.options(*spec["load"]).order_by(model.id)
+        if cursor is not None:
+            page_stmt = page_stmt.where(model.id > cursor)
+        else:
+            page_stmt = page_stmt.offset(offset)
+        rows = list((await self.db.execute(page_stmt.limit(count + 1))).scalars().all())
+        has_more = len(rows) > count
+        rows = rows[:count]
+
+        entries = [self._entry(base_url, resource_type, spec["map"](r), "match") for r in rows]
+        seen = {(resource_type, r.id) for r in rows}
+
+        for include in _split(params.get("_include", [])):
+            entries.extend(await self._resolve_include(include, resource_type, rows, seen, base_url))
+        for revinclude in _split(params.get("_revinclude", [])):
+            entries.extend(await self._resolve_revinclude(revinclude, resource_type, rows, seen, base_url))
+
+        links = [{"relation": "self", "url": self._page_url(base_url, resource_type, params, {})}]
+        if has_more:
+            if cursor is not None:
+                nxt = {"_cursor": str(rows[-1].id)}
+            else:
+                nxt = {"_offset": str(offset + count)}
+            links.append({"relation": "next", "url": self._page_url(base_url, resource_type, params, nxt)})
+        if cursor is None and offset > 0:
+            prev = {"_offset": str(max(offset - count, 0))}
+            links.append({"relation": "previous", "url": self._page_url(base_url, resource_type, params, prev)})
+
+        bundle: dict[str, Any] = {"resourceType": "Bundle", "type": "searchset"}
+        if total is not None:
+            bundle["total"] = total
+        bundle["link"] = links
+        bundle["entry"] = entries
+        return bundle
+
+    # ── Resource specifications ────────────────────────────────────────────────
+
+    def _specs(self) -> dict[str, dict[str, Any]]:
+        return {
+            "Patient": {
+                "model": Patient,
+                "load": [selectinload(Patient.contacts)],
+                "map": self.fhir.patient_to_fhir,
+                "params": {
+                    "_id": lambda s, v: s.where(Patient.id.in_([_parse_int(x, "_id") for x in _split([v])])),
+                    "identifier": self._patient_identifier,
+                    "name": lambda s, v: s.where(or_(*(
+                        or_(Patient.first_name.ilike(f"{x}%"), Patient.last_name.ilike(f"{x}%")) for x in _split([v])
+                    ))),
+                    "family": lambda s, v: s.where(or_(*(Patient.last_name.ilike(f"{x}%") for x in _split([v])))),
+                    "given": lambda s, v: s.where(or_(*(Patient.first_name.ilike(f"{x}%") for x in _split([v])))),
+                    "birthdate": lambda s, v: s.where(_date_clause(Patient.date_of_birth, v, as_date=True)),
+                    "gender": self._patient_gender,
+                    "active": lambda s, v: s.where(Patient.is_active == (v.lower() == "true")),
+                },
+            },
+            "ServiceRequest": {
+                "model": ImagingOrder,
+                "load": [selectinload(ImagingOrder.patient)],
+                "map": lambda o: self.fhir.order_to_fhir(o, o.patient),
+                "params": {
+                    "_id": lambda s, v: s.where(ImagingOrder.id.in_([_parse_int(x, "_id") for x in _split([v])])),
+                    "identifier": lambda s, v: s.where(ImagingOrder.accession_number.in_(
+                        [x.split("|")[-1] for x in _split([v])]
+                    )),
+                    "patient": self._order_patient,
+                    "subject": self._order_patient,
+                    "status": lambda s, v: s.where(_status_clause(ImagingOrder.status, _split([v]), _SERVICE_REQUEST_STATUS)),
+                    "modality": lambda s, v: s.where(ImagingOrder.modality.in_(self._modalities(v))),
+                    "priority": self._order_priority,
+                    "authored": lambda s, v: s.where(_date_clause(ImagingOrder.requested_at, v)),
+                    "occurrence": lambda s, v: s.where(_date_clause(ImagingOrder.scheduled_at, v)),
+                },
+            },
+            "ImagingStudy": {
+                "model": ImagingStudy,
+                "load": [selectinload(ImagingStudy.order).selectinload(ImagingOrder.patient)],
+                "map": lambda st: self.fhir.study_to_fhir(st, st.order, st.order.patient if st.order else None),
+                "params": {
+                    "_id": lambda s, v: s.where(ImagingStudy.id.in_([_parse_int(x, "_id") for x in _split([v])])),
+                    "identifier": lambda s, v: s.where(ImagingStudy.study_instance_uid.in_(
+                        [x.split("|")[-1].removeprefix("urn:oid:") for x in _split([v])]
+                    )),
+                    "patient": self._study_patient,
+                    "subject": self._study_patient,
+                    "basedon": lambda s, v: s.where(ImagingStudy.order_id.in_(
+                        [_parse_reference(x, "ServiceRequest") for x in _split([v])]
+                    )),
+                    "started": lambda s, v: s.where(_date_clause(ImagingStudy.study_date, v)),
+                    "modality": lambda s, v: s.where(ImagingStudy.modality.in_([x.split("|")[-1] for x in _split([v])])),
+                    "status": lambda s, v: s.where(_status_clause(ImagingStudy.status, _split([v]), _IMAGING_STUDY_STATUS)),
+                },
+            },
+            "DiagnosticReport": {
+                "model": RadiologyReport,
+                "load": [
+                    selectinload(RadiologyReport.study)
+                    .selectinload(ImagingStudy.order)
+                    .selectinload(ImagingOrder.patient)
+                ],
+                "map": self._report_to_fhir,
+                "params": {
+                    "_id": lambda s, v: s.where(RadiologyReport.id.in_([_parse_int(x, "_id") for x in _split([v])])),
+                    "patient": self._report_patient,
+                    "subject": self._report_patient,
+                    "status": lambda s, v: s.where(_status_clause(RadiologyReport.status, _split([v]), _DIAGNOSTIC_REPORT_STATUS)),
+                    "issued": lambda s, v: s.where(_date_clause(RadiologyReport.updated_at, v)),
+                    "date": lambda s, v: s.where(_date_clause(RadiologyReport.updated_at, v)),
+                    "imaging-study": lambda s, v: s.where(RadiologyReport.study_id.in_(
+                        [_parse_reference(x, "ImagingStudy") for x in _split([v])]
+                    )),
+                    "modality": self._report_modality,
+                },
+            },
+        }
+
+    # ── Parameter builders needing joins or lookups ────────────────────────────
+
+    @staticmethod
+    def _patient_identifier(stmt: Select, value: str) -> Select:
+        clauses = []
+        for token in _split([value]):
+            system, _, ident = token.rpartition("|")
+            if system.endswith("dni"):
+                clauses.append(Patient.dni == ident)
+            elif system.endswith("mrn"):
+                clauses.append(Patient.mrn == ident)
+            else:
+                clauses.append(or_(Patient.mrn == ident, Patient.dni == ident))
+        return stmt.where(or_(*clauses))
+
+    @staticmethod
+    def _patient_gender(stmt: Select, value: str) -> Select:
+        genders = []
+        for v in _split([value]):
+            if v not in _FHIR_GENDER:
+                raise BadRequestError(f"Unknown gender '{v}'")
+            genders.append(_FHIR_GENDER[v])
+        return stmt.where(Patient.gender.in_(genders))
+
+    @staticmethod
+    def _modalities(value: str) -> list[Modality]:
+        try:
+            return [Modality(x.split("|")[-1].upper()) for x in _split([value])]
+        except ValueError:
+            raise BadRequestError(f"Unknown modality '{value}'")
+
+    @staticmethod
+    def _order_priority(stmt: Select, value: str) -> Select:
+        try:
+            priorities = [OrderPriority(x.upper()) for x in _split([value])]
+        except ValueError:
+            raise BadRequestError(f"Unknown priority '{value}'")
+        return stmt.where(ImagingOrder.priority.in_(priorities))
+
+    @staticmethod
+    def _order_patient(stmt: Select, value: str) -> Select:
+        ids = [_parse_reference(x, "Patient") for x in _split([value])]
+        return stmt.where(ImagingOrder.patient_id.in_(ids))
+
+    @staticmethod
+    def _study_patient(stmt: Select, value: str) -> Select:
+        ids = [_parse_reference(x, "Patient") for x in _split([value])]
+        return stmt.where(ImagingStudy.order_id.in_(
+            select(ImagingOrder.id).where(ImagingOrder.patient_id.in_(ids))
+        ))
+
+    @staticmethod
+    def _report_patient(stmt: Select, value: str) -> Select:
+        ids = [_parse_reference(x, "Patient") for x in _split([value])]
+        return stmt.where(RadiologyReport.study_id.in_(
+            select(ImagingStudy.id)
+            .join(ImagingOrder, ImagingOrder.id == ImagingStudy.order_id)
+            .where(ImagingOrder.patient_id.in_(ids))
+        ))
+
+    @staticmethod
+    def _report_modality(stmt: Select, value: str) -> Select:
+        modalities = [x.split("|")[-1].upper() for x in _split([value])]
+        return stmt.where(RadiologyReport.study_id.in_(
+            select(ImagingStudy.id).where(ImagingStudy.modality.in_(modalities))
+        ))
+
+    def _report_to_fhir(self, report: RadiologyReport) -> dict[str, Any]:
+        study = report.study
+        patient = study.order.patient if study.order else None
+        return self.fhir.report_to_fhir(report, study, patient)
+
+    # ── _include / _revinclude ─────────────────────────────────────────────────
+
+    async def _resolve_include(
+        self, include: str, resource_type: str, rows: list, seen: set, base_url: str
+    ) -> list[dict[str, Any]]:
+        source, _, param = include.partition(":")
+        param = param.split(":")[0]
+        if source != resource_type or not rows:
+            return []
+
+        if param in ("patient", "subject") and resource_type != "Patient":
+            ids = self._patient_ids(resource_type, rows)
+            return await self._load_included("Patient", ids, seen, base_url)
+        if resource_type == "ImagingStudy" and param == "basedon":
+            return await self._load_included("ServiceRequest", {r.order_id for r in rows if r.order_id}, seen, base_url)
+        if resource_type == "DiagnosticReport" and param == "imaging-study":
+            return await self._load_included("ImagingStudy", {r.study_id for r in rows}, seen, base_url)
+        raise BadRequestError(f"Unsupported _include '{include}'")
+
+    async def _resolve_revinclude(
+        self, revinclude: str, resource_type: str, rows: list, seen: set, base_url: str
+    ) -> list[dict[str, Any]]:
+        target, _, param = revinclude.partition(":")
+        param = param.split(":")[0]
+        if not rows:
+            return []
+        ids = [r.id for r in rows]
+
+        if resource_type == "Patient" and param in ("patient", "subject"):
+            if target == "ServiceRequest":
+                stmt = select(ImagingOrder).where(ImagingOrder.patient_id.in_(ids))
+            elif target == "ImagingStudy":
+                stmt = select(ImagingStudy).join(ImagingOrder, ImagingOrder.id == ImagingStudy.order_id).where(
+                    ImagingOrder.patient_id.in_(ids)
+                )
+            elif target == "DiagnosticReport":
+                stmt = (
+                    select(RadiologyReport)
+                    .join(ImagingStudy, ImagingStudy.id == RadiologyReport.study_id)
+                    .join(ImagingOrder, ImagingOrder.id == ImagingStudy.order_id)
+                    .where(ImagingOrder.patient_id.in_(ids))
+                )
+            else:
+                stmt = None
+        elif resource_type == "ServiceRequest" and target == "ImagingStudy" and param == "basedon":
+            stmt = select(ImagingStudy).where(ImagingStudy.order_id.in_(ids))
+        elif resource_type == "ImagingStudy" and target == "DiagnosticReport" and param == "imaging-study":
+            stmt = select(RadiologyReport).where(RadiologyReport.study_id.in_(ids))
+        else:
+            stmt = None
+
+        if stmt is None:
+            raise BadRequestError(f"Unsupported _revinclude '{revinclude}'")
+        spec = self._specs()[target]
+        result = await self.db.execute(stmt.options(*spec["load"]).order_by(spec["model"].id))
+        return self._included_entries(target, result.scalars().all(), spec["map"], seen, base_url)
+
+    async def _load_included(self, resource_type: str, ids: set[int], seen: set, base_url: str) -> list[dict[str, Any]]:
+        ids = {i for i in ids if (resource_type, i) not in seen}
+        if not ids:
+            return []
+        spec = self._specs()[resource_type]
+        model = spec["model"]
+        result = await self.db.execute(select(model).options(*spec["load"]).where(model.id.in_(ids)).order_by(model.id))
+        return self._included_entries(resource_type, result.scalars().all(), spec["map"], seen, base_url)
+
+    def _included_entries(
+        self, resource_type: str, objs: Iterable, mapper: Callable, seen: set, base_url: str
+    ) -> list[dict[str, Any]]:
+        entries = []
+        for obj in objs:
+            key = (resource_type, obj.id)
+            if key in seen:
+                continue
+            seen.add(key)
+            entries.append(self._entry(base_url, resource_type, mapper(obj), "include"))
+        return entries
+
+    @staticmethod
+    def _patient_ids(resource_type: str, rows: list) -> set[int]:
+        if resource_type == "ServiceRequest":
+            return {r.patient_id for r in rows}
+        if resource_type == "ImagingStudy":
+            return {r.order.patient_id for r in rows if r.order}
+        if resource_type == "DiagnosticReport":
+            return {r.study.order.patient_id for r in rows if r.study and r.study.order}
+        return set()
+
+    # ── Bundle helpers ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _entry(base_url: str, resource_type: str, resource: dict[str, Any], mode: str) -> dict[str, Any]:
+        return {
+            "fullUrl": f"{base_url}/{resource_type}/{resource['id']}",
+            "resource": resource,
+            "search": {"mode": mode},
+        }
+
+    @staticmethod
+    def _page_url(
+        base_url: str, resource_type: str, params: Mapping[str, Sequence[str]], overrides: dict[str, str]
+    ) -> str:
+        query: list[tuple[str, str]] = []
+        for name, values in params.items():
+            if name in overrides or (overrides and name in ("_offset", "_cursor")):
+                continue
+            query.extend((name, v) for v in values)
+        query.extend(overrides.items())
+        qs = urlencode(query)
+        return f"{base_url}/{resource_type}" + (f"?{qs}" if qs else "")
@@ -1,40 +1,81 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Optional
+from typing import Any
+
+from app.models.order import OrderStatus
+from app.models.patient import Gender
+from app.models.report import ReportStatus
+from app.models.study import StudyStatus
 
 logger = logging.getLogger(__name__)
 
+# ── Lookup tables (built once at import, keyed by the model enums) ─────────────
+
+_GENDER = {
+    Gender.male: "male", Gender.female: "female",
+    Gender.other: "other", Gender.unknown: "unknown",
+}
+
+_ORDER_STATUS = {
+    OrderStatus.requested: "active", OrderStatus.scheduled: "active",
+    OrderStatus.in_progress: "active", OrderStatus.completed: "completed",
+    OrderStatus.cancelled: "revoked", OrderStatus.on_hold: "on-hold",
+}
+
+_REPORT_STATUS = {
+    ReportStatus.draft: "partial", ReportStatus.preliminary: "preliminary",
+    ReportStatus.final: "final", ReportStatus.amended: "amended",
+    ReportStatus.cancelled: "cancelled",
+}
+
+# Static fragments. Every resource gets its own copy (built from literals, which
+# is cheap), so a caller mutating one resource cannot change the others.
+_DCM_SYSTEM = "http://dicom.nema.org/resources/ontology/DCM"
+
+
+def _imaging_category() -> list[dict]:
+    return [{"coding": [{"system": "http://snomed.info/sct", "code": "363679005", "display": "Imaging"}]}]
+
+
+def _report_category() -> list[dict]:
+    return [{"coding": [{"system": "http://loinc.org", "code": "18748-4", "display": "Diagnostic imaging study"}]}]
+
+
+class Ref:
+    """Minimal stand-in for a related row when only its id is needed by a mapper."""
+
+    __slots__ = ("id",)
+
+    def __init__(self, id: int):
+        self.id = id
+
 
 class FHIRService:
-    """Maps SQLAlchemy models to FHIR R4 resources."""
+    """Maps SQLAlchemy models to FHIR R4 resources.
+
+    The returned dicts only contain JSON-native values and are rendered with
+    orjson (see ``app.core.responses``) without further validation.
+    """
 
     def patient_to_fhir(self, patient) -> dict[str, Any]:
+        identifier = [{"system": "urn:oid:mrn", "value": patient.mrn}]
+        if patient.dni:
+            identifier.append({"system": "urn:oid:dni", "value": patient.dni})
         resource = {
             "resourceType": "Patient",
             "id": str(patient.id),
-            "identifier": [
-                {"system": "urn:oid:mrn", "value": patient.mrn},
-            ],
-            "name": [
-                {
-                    "use": "official",
-                    "family": patient.last_name,
-                    "given": [patient.first_name],
-                }
-            ],
+            "identifier": identifier,
+            "name": [{"use": "official", "family": patient.last_name, "given": [patient.first_name]}],
             "active": patient.is_active,
         }
         if patient.date_of_birth:
             resource["birthDate"] = patient.date_of_birth.isoformat()
         if patient.gender:
-            gender_map = {"M": "male", "F": "female", "O": "other", "U": "unknown"}
-            resource["gender"] = gender_map.get(patient.gender.value, "unknown")
-        if patient.dni:
-            resource["identifier"].append({"system": "urn:oid:dni", "value": patient.dni})
+            resource["gender"] = _GENDER.get(patient.gender, "unknown")
 
         telecom = []
-        for c in (patient.contacts or []):
+        for c in (patient.contacts or ()):
             if c.contact_type == "phone":
                 telecom.append({"system": "phone", "value": c.value, "use": c.label or "home"})
             elif c.contact_type == "email":
@@ -44,75 +85,66 @@ class FHIRService:
 
         return resource
 
-    def order_to_fhir(self, order, patient) -> dict[str, Any]:
+    def order_to_fhir(self, order, patient=None) -> dict[str, Any]:
+        patient_id = patient.id if patient else order.patient_id
+        description = order.procedure_description
         return {
             "resourceType": "ServiceRequest",
             "id": str(order.id),
-            "status": self._order_status_to_fhir(order.status.value),
+            "status": _ORDER_STATUS.get(order.status, "unknown"),
             "intent": "order",
-            "category": [{"coding": [{"system": "http://snomed.info/sct", "code": "363679005", "display": "Imaging"}]}],
-            "code": {
-                "coding": [{"display": order.procedure_description}],
-                "text": order.procedure_description,
-            },
-            "subject": {"reference": f"Patient/{patient.id}"},
+            "category": _imaging_category(),
+            "code": {"coding": [{"display": description}], "text": description},
+            "subject": {"reference": f"Patient/{patient_id}"},
             "identifier": [{"value": order.accession_number}],
             "priority": order.priority.value.lower(),
             "authoredOn": order.requested_at.isoformat(),
         }
 
     def study_to_fhir(self, study, order, patient) -> dict[str, Any]:
-        return {
+        resource = {
             "resourceType": "ImagingStudy",
             "id": str(study.id),
             "identifier": [{"system": "urn:dicom:uid", "value": f"urn:oid:{study.study_instance_uid}"}],
-            "status": "available" if study.status.value == "AVAILABLE" else "registered",
-            "subject": {"reference": f"Patient/{patient.id}"},
-            "basedOn": [{"reference": f"ServiceRequest/{order.id}"}],
+            "status": "available" if study.status == StudyStatus.available else "registered",
             "numberOfSeries": study.series_count,
             "numberOfInstances": study.instances_count,
-            "started": study.study_date.isoformat() if study.study_date else None,
         }
+        if study.modality:
+            resource["modality"] = [{"system": _DCM_SYSTEM, "code": study.modality}]
+        if study.study_date:
+            resource["started"] = study.study_date.isoformat()
+        # Studies received without a matching order have no known subject
+        if patient:
+            resource["subject"] = {"reference": f"Patient/{patient.id}"}
+        if order:
+            resource["basedOn"] = [{"reference": f"ServiceRequest/{order.id}"}]
+        return resource
 
     def report_to_fhir(self, report, study, patient) -> dict[str, Any]:
-        status_map = {
-            "draft": "partial", "preliminary": "preliminary",
-            "final": "final", "amended": "amended", "cancelled": "cancelled"
-        }
         resource = {
             "resourceType": "DiagnosticReport",
             "id": str(report.id),
-            "status": status_map.get(report.status.value, "unknown"),
-            "category": [{"coding": [{"system": "http://loinc.org", "code": "18748-4", "display": "Diagnostic imaging study"}]}],
-            "subject": {"reference": f"Patient/{patient.id}"},
+            "status": _REPORT_STATUS.get(report.status, "unknown"),
+            "category": _report_category(),
             "imagingStudy": [{"reference": f"ImagingStudy/{study.id}"}],
             "issued": report.updated_at.isoformat(),
         }
+        if patient:
+            resource["subject"] = {"reference": f"Patient/{patient.id}"}
         result = []
         if report.findings:
             result.append({
-                "resourceType": "Observation",
-                "status": "final",
-                "code": {"text": "Findings"},
-                "valueString": report.findings,
+                "resourceType": "Observation", "status": "final",
+                "code": {"text": "Findings"}, "valueString": report.findings,
             })
         if report.impression:
             result.append({
-                "resourceType": "Observation",
-                "status": "final",
-                "code": {"text": "Impression"},
-                "valueString": report.impression,
+                "resourceType": "Observation", "status": "final",
+                "code": {"text": "Impression"}, "valueString": report.impression,
             })
         if result:
             resource["result"] = result
-        if report.status.value == "final" and report.signed_by:
+        if report.status == ReportStatus.final and report.signed_by:
             resource["performer"] = [{"display": report.signed_by}]
         return resource
-
-    def _order_status_to_fhir(self, status: str) -> str:
-        mapping = {
-            "REQUESTED": "active", "SCHEDULED": "active",
-            "IN_PROGRESS": "active", "COMPLETED": "completed",
-            "CANCELLED": "revoked", "ON_HOLD": "on-hold",
-        }
-        return mapping.get(status, "unknown")
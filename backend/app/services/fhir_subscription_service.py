@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Mapping, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import BadRequestError, NotFoundError
+from app.models.fhir_subscription import FHIRSubscription, SubscriptionStatus
+
+logger = logging.getLogger(__name__)
+
+# Resource types that emit events, and the criteria parameters evaluated for each
+SUBSCRIBABLE = {
+    "ImagingStudy": {"status", "patient", "subject", "modality"},
+    "DiagnosticReport": {"status", "patient", "subject"},
+}
+_PAYLOADS = {"application/fhir+json", "application/json"}
+
+
+def parse_criteria(criteria: str) -> tuple[str, dict[str, set[str]]]:
+    """Split ``Type?param=a,b&...`` into the resource type and OR-sets of values."""
+    resource_type, _, query = criteria.partition("?")
+    allowed = SUBSCRIBABLE.get(resource_type)
+    if allowed is None:
+        raise BadRequestError(
+            f"Unsupported criteria resource '{resource_type}' (supported: {', '.join(SUBSCRIBABLE)})"
+        )
+    params: dict[str, set[str]] = {}
+    for name, value in parse_qsl(query, keep_blank_values=False):
+        if name not in allowed:
+            raise BadRequestError(f"Unsupported criteria parameter '{name}' for {resource_type}")
+        if name == "subject":
+            name = "patient"
+        params.setdefault(name, set()).update(v.strip() for v in value.split(",") if v.strip())
+    return resource_type, params
+
+
+def matches(params: Mapping[str, set[str]], resource: Mapping[str, Any]) -> bool:
+    """Evaluate parsed criteria against a FHIR resource dict (AND across params, OR within)."""
+    for name, values in params.items():
+        if name == "status":
+            if resource.get("status") not in values:
+                return False
+        elif name == "patient":
+            ref = (resource.get("subject") or {}).get("reference", "")
+            if ref not in values and ref.rpartition("/")[2] not in values:
+                return False
+        elif name == "modality":
+            codes = {c.get("code") for c in resource.get("modality") or []}
+            if not codes & values:
+                return False
+    return True
+
+
+class FHIRSubscriptionService:
+    """CRUD and FHIR mapping for rest-hook Subscriptions.
+
+    Delivery lives in ``app.core.subscription_dispatcher``; every write here
+    invalidates its in-memory subscription cache.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create(self, resource: Any, user_id: Optional[int]) -> FHIRSubscription:
+        sub = FHIRSubscription(created_by_id=user_id)
+        self._apply(sub, resource)
+        self.db.add(sub)
+        await self.db.flush()
+        await self.db.refresh(sub)
+        _invalidate()
+        return sub
+
+    async def get(self, subscription_id: int) -> FHIRSubscription:
+        result = await self.db.execute(select(FHIRSubscription).where(FHIRSubscription.id == subscription_id))
+        sub = result.scalar_one_or_none()
+        if not sub:
+            raise NotFoundError(f"Subscription {subscription_id} not found")
+        return sub
+
+    async def list_subscriptions(self, status: Optional[str] = None) -> list[FHIRSubscription]:
+        stmt = select(FHIRSubscription).order_by(FHIRSubscription.id)
+        if status:
+            stmt = stmt.where(FHIRSubscription.status == status)
+        return list((await self.db.execute(stmt)).scalars().all())
+
+    async def update(self, subscription_id: int, resource: Any) -> FHIRSubscription:
+        sub = await self.get(subscription_id)
+        self._apply(sub, resource)
+        await self.db.flush()
+        await self.db.refresh(sub)
+        _invalidate()
+        return sub
+
+    async def delete(self, subscription_id: int) -> None:
+        sub = await self.get(subscription_id)
+        await self.db.delete(sub)
+        await self.db.flush()
+        _invalidate()
+
+    @staticmethod
+    def _apply(sub: FHIRSubscription, r: Any) -> None:
+        if not isinstance(r, dict) or r.get("resourceType") != "Subscription":
+            raise BadRequestError("Expected a Subscription resource")
+        channel = r.get("channel") or {}
+        if channel.get("type") != "rest-hook":
+            raise BadRequestError("Only channel.type 'rest-hook' is supported")
+        endpoint = channel.get("endpoint") or ""
+        if urlsplit(endpoint).scheme not in ("http", "https"):
+            raise BadRequestError("channel.endpoint must be an http(s) URL")
+        payload = channel.get("payload") or None
+        if payload and payload not in _PAYLOADS:
+            raise BadRequestError(f"Unsupported channel.payload '{payload}'")
+        headers = channel.get("header") or []
+        if not all(isinstance(h, str) and ":" in h for h in headers):
+            raise BadRequestError("channel.header entries must look like 'Name: value'")
+        criteria = (r.get("criteria") or "").strip()
+        resource_type, _ = parse_criteria(criteria)
+
+        end = None
+        if r.get("end"):
+            try:
+                end = datetime.fromisoformat(r["end"].replace("Z", "+00:00"))
+            except (AttributeError, ValueError):
+                raise BadRequestError(f"Invalid end '{r['end']}'")
+            if end.tzinfo is None:
+                end = end.replace(tzinfo=timezone.utc)
+
+        # Clients may only request or switch off; 'active'/'error' are set by the server
+        status = r.get("status") or "requested"
+        if status not in ("requested", "active", "off"):
+            raise BadRequestError(f"Invalid status '{status}'")
+
+        sub.criteria = criteria
+        sub.resource_type = resource_type
+        sub.reason = r.get("reason")
+        sub.endpoint = endpoint
+        sub.payload = payload
+        sub.headers = headers or None
+        sub.end = end
+        sub.error = None
+        sub.status = SubscriptionStatus.off if status == "off" else SubscriptionStatus.active
+
+    @staticmethod
+    def to_fhir(sub: FHIRSubscription) -> dict[str, Any]:
+        channel: dict[str, Any] = {"type": "rest-hook", "endpoint": sub.endpoint}
+        if sub.payload:
+            channel["payload"] = sub.payload
+        if sub.headers:
+            channel["header"] = sub.headers
+        resource: dict[str, Any] = {
+            "resourceType": "Subscription",
+            "id": str(sub.id),
+            "status": sub.status.value,
+            "criteria": sub.criteria,
+            "channel": channel,
+            "meta": {"lastUpdated": sub.updated_at.isoformat()},
+        }
+        if sub.reason:
+            resource["reason"] = sub.reason
+        if sub.end:
+            resource["end"] = sub.end.isoformat()
+        if sub.error:
+            resource["error"] = sub.error
+        return resource
+
+
+def _invalidate() -> None:
+    from app.core.subscription_dispatcher import dispatcher
+    dispatcher.invalidate()
@@ -57,7 +57,9 @@ class HL7Service:
         )
         return await self._store_message("ADT^A03", HL7Direction.outbound, raw, patient_id=patient.id)
 
-    async def send_orm_o01(self, patient, order) -> HL7Message:
+    @staticmethod
+    def orm_o01_message(patient, order) -> HL7Message:
+        """Build (but do not add) an outbound ORM^O01 row; bulk paths add_all() them."""
         raw = build_orm_o01(
             patient_id=patient.mrn,
             patient_name=f"{patient.last_name}^{patient.first_name}",
@@ -67,7 +69,20 @@ class HL7Service:
             priority=order.priority.value[0],  # R/U/S
             order_datetime=order.requested_at,
         )
-        return await self._store_message("ORM^O01", HL7Direction.outbound, raw, patient_id=patient.id, order_id=order.id)
+        return HL7Message(
+            message_type="ORM^O01",
+            direction=HL7Direction.outbound,
+            raw_message=raw,
+            status=HL7Status.sent,
+            patient_id=patient.id,
+            order_id=order.id,
+        )
+
+    async def send_orm_o01(self, patient, order) -> HL7Message:
+        msg = self.orm_o01_message(patient, order)
+        self.db.add(msg)
+        await self.db.flush()
+        return msg
 
     async def send_oru_r01(self, patient, order, report) -> HL7Message:
         report_text = f"Findings: {report.findings or ''}\nImpression: {report.impression or ''}"
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Optional
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional
 
-from sqlalchemy import select, update, func
+from sqlalchemy import String, Text, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.notification import Notification
+from app.core.notification_hub import created_event, publish_after_commit, read_all_event, read_event
+from app.models.notification import Notification, NotificationArchive, NotificationUnreadCount
 from app.models.user import User, UserRole
 
 logger = logging.getLogger(__name__)
@@ -27,6 +31,8 @@ class NotificationService:
         n = Notification(user_id=user_id, type=type, title=title, body=body, link=link)
         self.db.add(n)
         await self.db.flush()
+        await self._add_unread([user_id])
+        publish_after_commit(self.db, [created_event(n.id, user_id, type, title, body, link, n.created_at)])
         return n
 
     async def notify_role(
@@ -36,18 +42,28 @@ class NotificationService:
         title: str,
         body: Optional[str] = None,
         link: Optional[str] = None,
-    ) -> List[Notification]:
+    ) -> int:
+        """Notify every active user with ``role``: one ``INSERT ... SELECT`` from users."""
         result = await self.db.execute(
-            select(User.id).where(User.role == role, User.is_active == True)
+            insert(Notification)
+            .from_select(
+                ["user_id", "type", "title", "body", "link"],
+                select(
+                    User.id,
+                    literal(type, String),
+                    literal(title, String),
+                    literal(body, Text),
+                    literal(link, String),
+                ).where(User.role == role, User.is_active == True),
+            )
+            .returning(Notification.id, Notification.user_id, Notification.created_at)
         )
-        user_ids = result.scalars().all()
-        notifications = []
-        for uid in user_ids:
-            n = Notification(user_id=uid, type=type, title=title, body=body, link=link)
-            self.db.add(n)
-            notifications.append(n)
-        await self.db.flush()
-        return notifications
+        rows = result.all()
+        await self._add_unread(user_id for _, user_id, _ in rows)
+        publish_after_commit(self.db, [
+            created_event(id, user_id, type, title, body, link, created_at) for id, user_id, created_at in rows
+        ])
+        return len(rows)
 
     async def get_for_user(self, user_id: int, limit: int = 20) -> List[Notification]:
         result = await self.db.execute(
@@ -60,23 +76,70 @@ class NotificationService:
 
     async def unread_count(self, user_id: int) -> int:
         result = await self.db.execute(
-            select(func.count(Notification.id)).where(
-                Notification.user_id == user_id,
-                Notification.is_read == False,
-            )
+            select(NotificationUnreadCount.unread).where(NotificationUnreadCount.user_id == user_id)
         )
         return result.scalar() or 0
 
     async def mark_read(self, notification_id: int, user_id: int) -> None:
-        await self.db.execute(
+        result = await self.db.execute(
             update(Notification)
-            .where(Notification.id == notification_id, Notification.user_id == user_id)
+            .where(Notification.id == notification_id, Notification.user_id == user_id, Notification.is_read == False)
             .values(is_read=True)
         )
+        if result.rowcount:
+            await self.db.execute(
+                update(NotificationUnreadCount)
+                .where(NotificationUnreadCount.user_id == user_id)
+                .values(unread=func.greatest(NotificationUnreadCount.unread - 1, 0))
+            )
+            publish_after_commit(self.db, [read_event(user_id)])
 
     async def mark_all_read(self, user_id: int) -> None:
-        await self.db.execute(
+        result = await self.db.execute(
             update(Notification)
             .where(Notification.user_id == user_id, Notification.is_read == False)
             .values(is_read=True)
         )
+        # Also resets a counter that drifted
+        await self.db.execute(
+            update(NotificationUnreadCount).where(NotificationUnreadCount.user_id == user_id).values(unread=0)
+        )
+        if result.rowcount:
+            publish_after_commit(self.db, [read_all_event(user_id)])
+
+    async def _add_unread(self, user_ids: Iterable[int]) -> None:
+        """Bump the unread counters; rows are upserted in user order so concurrent writers cannot deadlock."""
+        per_user = Counter(user_ids)
+        if not per_user:
+            return
+        stmt = pg_insert(NotificationUnreadCount).values(
+            [{"user_id": uid, "unread": n} for uid, n in sorted(per_user.items())]
+        )
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[NotificationUnreadCount.user_id],
+            set_={"unread": NotificationUnreadCount.unread + stmt.excluded.unread},
+        ))
+
+    async def archive_read(self, older_than: datetime, limit: int) -> int:
+        """Move up to ``limit`` read notifications created before ``older_than`` to the archive."""
+        moved = (
+            Notification.__table__.delete()
+            .where(Notification.id.in_(
+                select(Notification.id)
+                .where(Notification.is_read == True, Notification.created_at < older_than)
+                .order_by(Notification.created_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ))
+            .returning(
+                Notification.id, Notification.user_id, Notification.type, Notification.title,
+                Notification.body, Notification.link, Notification.created_at,
+            )
+            .cte("moved")
+        )
+        result = await self.db.execute(
+            insert(NotificationArchive)
+            .from_select(["id", "user_id", "type", "title", "body", "link", "created_at"], select(moved))
+            .returning(NotificationArchive.id)
+        )
+        return len(result.all())
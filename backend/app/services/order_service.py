@@ -1,22 +1,24 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, List, Optional
 
-from sqlalchemy import func, select
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from datetime import timedelta
-from app.core.exceptions import BadRequestError, ConflictError, NotFoundError
+from app.core.exceptions import BadRequestError, NotFoundError
 from app.models.order import ImagingOrder, OrderStatus, generate_accession_number
 from app.models.patient import Patient
-from app.models.schedule import Appointment, AppointmentStatus, Resource
+from app.models.schedule import INACTIVE_APPOINTMENT_STATUSES, Appointment, AppointmentStatus, Resource
 from app.models.worklist import DicomWorklistEntry, WorklistStatus
-from app.schemas.order import ImagingOrderCreate, ImagingOrderEdit, ImagingOrderUpdate
+from app.schemas.order import BulkOrderItemResult, ImagingOrderCreate, ImagingOrderEdit, ImagingOrderUpdate
 from app.services.worklist_service import WorklistService
-from app.services.schedule_service import ScheduleService
-from app.schemas.schedule import AppointmentCreate
+from app.services.availability_service import within_operating_hours
+from app.services.schedule_service import ScheduleService, guard_overlap
 
 
 class OrderService:
@@ -31,58 +33,13 @@ class OrderService:
         if not patient:
             raise NotFoundError(f"Patient {data.patient_id} not found")
 
-        # Validate patient is not already scheduled at this time
-        if data.scheduled_at:
-            end_dt_patient = data.scheduled_at + timedelta(minutes=data.duration_minutes)
-            patient_conflict = await self.db.execute(
-                select(Appointment).where(
-                    Appointment.patient_id == data.patient_id,
-                    Appointment.status.notin_([AppointmentStatus.cancelled, AppointmentStatus.noshow]),
-                    Appointment.start_datetime < end_dt_patient,
-                    Appointment.end_datetime > data.scheduled_at,
-                )
-            )
-            existing = patient_conflict.scalar_one_or_none()
-            if existing:
-                raise ConflictError(
-                    "El paciente ya tiene un estudio programado en ese horario. "
-                    f"Debe haber al menos {data.duration_minutes} minutos entre estudios."
-                )
-
         # Resolve resource and run all validations BEFORE creating anything
+        sched_svc = ScheduleService(self.db)
         resource = None
         if data.resource_id:
-            res_result = await self.db.execute(
-                select(Resource).where(Resource.id == data.resource_id)
-            )
-            resource = res_result.scalar_one_or_none()
-            if not resource:
-                raise NotFoundError(f"Recurso {data.resource_id} no encontrado")
-
-            if data.scheduled_at and resource:
-                appt_hour = data.scheduled_at.hour
-                end_dt = data.scheduled_at + timedelta(minutes=data.duration_minutes)
-                appt_end_hour = end_dt.hour + (1 if end_dt.minute > 0 else 0)
-                # Validate operating hours
-                if appt_hour < resource.operating_start_hour or appt_end_hour > resource.operating_end_hour:
-                    raise BadRequestError(
-                        f"La hora programada está fuera del horario de operación del equipo "
-                        f"'{resource.name}' ({resource.operating_start_hour}:00 - {resource.operating_end_hour}:00)"
-                    )
-                # Validate no scheduling conflict on this resource
-                conflict = await self.db.execute(
-                    select(Appointment).where(
-                        Appointment.resource_id == data.resource_id,
-                        Appointment.status.notin_([AppointmentStatus.cancelled, AppointmentStatus.noshow]),
-                        Appointment.start_datetime < end_dt,
-                        Appointment.end_datetime > data.scheduled_at,
-                    )
-                )
-                if conflict.scalar_one_or_none():
-                    raise ConflictError(
-                        f"El equipo '{resource.name}' ya tiene un estudio programado en ese horario. "
-                        f"Seleccione otra hora u otro equipo."
-                    )
+            resource = await sched_svc.get_resource(data.resource_id)
+        if data.scheduled_at:
+            lane = await sched_svc.validate_slot(data.patient_id, resource, data.scheduled_at, data.duration_minutes)
 
         # All validations passed — create the order
         order = ImagingOrder(
@@ -114,25 +71,165 @@ class OrderService:
         # Update status to scheduled if datetime provided
         if data.scheduled_at:
             order.status = OrderStatus.scheduled
-            # Auto-create appointment in the agenda
-            try:
-                sched_svc = ScheduleService(self.db)
-                await sched_svc.create_appointment(AppointmentCreate(
-                    patient_id=patient.id,
-                    order_id=order.id,
-                    resource_id=data.resource_id,
-                    start_datetime=data.scheduled_at,
-                    duration_minutes=data.duration_minutes,
-                    notes=data.procedure_description,
-                ))
-            except (ConflictError, BadRequestError):
-                pass  # Already validated above, skip duplicate conflict
-            except Exception:
-                pass  # Best-effort for appointment creation
+            # Auto-create appointment in the agenda; already validated above, so only a
+            # concurrent booking of the same slot can still make this fail (409)
+            await sched_svc.book(
+                patient.id, data.scheduled_at, data.duration_minutes,
+                resource=resource, order_id=order.id, notes=data.procedure_description, lane=lane,
+            )
 
         await self.db.flush()
         return order
 
+    async def create_orders_bulk(
+        self, items: list[dict[str, Any]], requesting_user_id: int
+    ) -> list[BulkOrderItemResult]:
+        """Validate and insert many orders with a fixed number of queries.
+
+        Runs the checks of :meth:`create_order` (patient and resource exist,
+        operating hours, no overlapping appointment for the patient or the
+        resource, including earlier items of the same batch) against patients,
+        resources and bookings loaded with one query each, then inserts orders,
+        worklist entries and appointments with one multi-row INSERT each.
+        Invalid items get their own error result and do not stop the others.
+        ``.wl`` files, ORM^O01 messages and notifications are left to the caller.
+        """
+        results = [BulkOrderItemResult(index=i, status=201) for i in range(len(items))]
+
+        def fail(i: int, status: int, error: str) -> None:
+            results[i] = BulkOrderItemResult(index=i, status=status, error=error)
+
+        valid: list[tuple[int, ImagingOrderCreate]] = []
+        for i, raw in enumerate(items):
+            try:
+                valid.append((i, ImagingOrderCreate.model_validate(raw)))
+            except ValidationError as e:
+                fail(i, 422, "; ".join(
+                    f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+                ))
+
+        patient_ids = {d.patient_id for _, d in valid}
+        resource_ids = {d.resource_id for _, d in valid if d.resource_id}
+        patients: dict[int, Patient] = {}
+        if patient_ids:
+            result = await self.db.execute(select(Patient).where(Patient.id.in_(patient_ids)))
+            patients = {p.id: p for p in result.scalars()}
+        resources: dict[int, Resource] = {}
+        if resource_ids:
+            result = await self.db.execute(select(Resource).where(Resource.id.in_(resource_ids)))
+            resources = {r.id: r for r in result.scalars()}
+
+        # Active bookings of these patients/resources inside the batch's overall time window
+        slots = [_slot(d) for _, d in valid if d.scheduled_at]
+        busy_patient: dict[int, list[tuple[datetime, datetime]]] = defaultdict(list)
+        # resource id → lane → bookings
+        busy_resource: dict[int, dict[int, list[tuple[datetime, datetime]]]] = defaultdict(lambda: defaultdict(list))
+        if slots:
+            result = await self.db.execute(
+                select(
+                    Appointment.patient_id, Appointment.resource_id, Appointment.lane,
+                    Appointment.start_datetime, Appointment.end_datetime,
+                ).where(
+                    Appointment.status.notin_(INACTIVE_APPOINTMENT_STATUSES),
+                    Appointment.start_datetime < max(end for _, end in slots),
+                    Appointment.end_datetime > min(start for start, _ in slots),
+                    or_(Appointment.patient_id.in_(patient_ids), Appointment.resource_id.in_(resource_ids)),
+                )
+            )
+            for patient_id, resource_id, lane, start, end in result.all():
+                slot = (_utc(start), _utc(end))
+                busy_patient[patient_id].append(slot)
+                if resource_id:
+                    busy_resource[resource_id][lane].append(slot)
+
+        accepted: list[tuple[int, ImagingOrderCreate, Patient, Optional[Resource], int]] = []
+        for i, d in valid:
+            lane = 0
+            patient = patients.get(d.patient_id)
+            if not patient:
+                fail(i, 404, f"Patient {d.patient_id} not found")
+                continue
+            resource = resources.get(d.resource_id) if d.resource_id else None
+            if d.scheduled_at:
+                start, end = _slot(d)
+                if _overlaps(busy_patient[d.patient_id], start, end):
+                    fail(i, 409, "El paciente ya tiene un estudio programado en ese horario.")
+                    continue
+            if d.resource_id and not resource:
+                fail(i, 404, f"Recurso {d.resource_id} no encontrado")
+                continue
+            if d.scheduled_at and resource:
+                if not within_operating_hours(resource, start, end):
+                    fail(i, 400, f"La hora programada está fuera del horario de operación del equipo "
+                                 f"'{resource.name}' ({resource.operating_start_hour}:00 - {resource.operating_end_hour}:00)")
+                    continue
+                lanes = busy_resource[resource.id]
+                lane = next(
+                    (n for n in range(max(resource.capacity or 1, 1)) if not _overlaps(lanes[n], start, end)), None
+                )
+                if lane is None:
+                    fail(i, 409, f"El equipo '{resource.name}' ya tiene un estudio programado en ese horario. "
+                                 "Seleccione otra hora u otro equipo.")
+                    continue
+            if d.scheduled_at:
+                # Later items of the batch must not overlap this one either
+                busy_patient[d.patient_id].append((start, end))
+                if resource:
+                    busy_resource[resource.id][lane].append((start, end))
+            accepted.append((i, d, patient, resource, lane))
+
+        if not accepted:
+            return results
+
+        result = await self.db.execute(
+            insert(ImagingOrder).returning(ImagingOrder, sort_by_parameter_order=True),
+            [
+                {
+                    **d.model_dump(exclude={"resource_id", "duration_minutes"}),
+                    "requesting_physician_id": requesting_user_id,
+                    "accession_number": generate_accession_number(),
+                    "status": OrderStatus.scheduled if d.scheduled_at else OrderStatus.requested,
+                }
+                for _, d, _, _, _ in accepted
+            ],
+        )
+        orders = list(result.scalars().all())
+
+        await self.db.execute(insert(DicomWorklistEntry), [
+            WorklistService.entry_values(
+                order, patient,
+                ae_title=resource.ae_title if resource else None,
+                station_name=resource.name if resource else None,
+            )
+            for order, (_, _, patient, resource, _) in zip(orders, accepted)
+        ])
+
+        appointments = [
+            dict(
+                patient_id=patient.id,
+                order_id=order.id,
+                resource_id=d.resource_id,
+                status=AppointmentStatus.booked,
+                start_datetime=d.scheduled_at,
+                end_datetime=d.scheduled_at + timedelta(minutes=d.duration_minutes),
+                duration_minutes=d.duration_minutes,
+                lane=lane,
+                notes=d.procedure_description,
+            )
+            for order, (_, d, patient, _, lane) in zip(orders, accepted)
+            if d.scheduled_at
+        ]
+        if appointments:
+            # A concurrent booking since the check above fails the whole batch with 409
+            async with guard_overlap(self.db):
+                await self.db.execute(insert(Appointment), appointments)
+
+        for order, (i, _, _, _, _) in zip(orders, accepted):
+            results[i] = BulkOrderItemResult(
+                index=i, status=201, order_id=order.id, accession_number=order.accession_number
+            )
+        return results
+
     async def get_by_id(self, order_id: int) -> ImagingOrder:
         result = await self.db.execute(
             select(ImagingOrder)
@@ -204,3 +301,16 @@ class OrderService:
             order.priority = data.priority
         await self.db.flush()
         return order
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _slot(data: ImagingOrderCreate) -> tuple[datetime, datetime]:
+    start = _utc(data.scheduled_at)
+    return start, start + timedelta(minutes=data.duration_minutes)
+
+
+def _overlaps(busy: list[tuple[datetime, datetime]], start: datetime, end: datetime) -> bool:
+    return any(s < end and e > start for s, e in busy)
@@ -1,64 +1,226 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from typing import Any, Optional
 
 import httpx
 
 from app.config import get_settings
+from app.core import metrics
+from app.core.exceptions import ServiceUnavailableError
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+METRIC = "orthanc"
+
+
+# ── Shared connection pool ─────────────────────────────────────────────────────
+# One keep-alive pool per event loop. An AsyncClient is bound to the loop it was
+# first used on: the API's is opened/closed by the FastAPI lifespan, and callers
+# on other loops (Celery tasks use asyncio.run per task) get their own. Each
+# client is closed when its loop shuts down, so per-task loops leak no pools.
+
+_clients: dict[asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, asyncio.Task]] = {}
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings.orthanc_url,
+        auth=(settings.orthanc_username, settings.orthanc_password),
+        timeout=httpx.Timeout(settings.orthanc_timeout_seconds, connect=settings.orthanc_connect_timeout_seconds),
+        limits=httpx.Limits(
+            max_connections=settings.orthanc_max_connections,
+            max_keepalive_connections=settings.orthanc_max_keepalive_connections,
+            keepalive_expiry=settings.orthanc_keepalive_expiry_seconds,
+        ),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(loop)
+    if entry is None or entry[0].is_closed:
+        client = _new_client()
+        _clients[loop] = (client, loop.create_task(_close_on_shutdown(loop, client), name="orthanc-client-closer"))
+        return client
+    return entry[0]
+
+
+async def _close_on_shutdown(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+    """Wait until cancelled (``close_client`` or ``asyncio.run`` cancelling leftover tasks), then close ``client``."""
+    try:
+        await loop.create_future()
+    finally:
+        if _clients.get(loop, (None,))[0] is client:
+            del _clients[loop]
+        await client.aclose()
+
+
+async def start_client() -> None:
+    get_client()
+    logger.info(f"Orthanc client pool ready ({settings.orthanc_url})")
+
+
+async def close_client() -> None:
+    entry = _clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        client, closer = entry
+        closer.cancel()
+        await client.aclose()
+
+
+# ── Circuit breaker ────────────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """Fails fast after ``threshold`` consecutive failures.
+
+    closed → open after ``threshold`` failures; open → half-open once
+    ``reset_seconds`` have elapsed, letting a single probe through; the probe's
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open" or (state == "half-open" and self._probing):
+            raise ServiceUnavailableError("Orthanc no disponible (circuito abierto), reintente en unos segundos")
+        if state == "half-open":
+            self._probing = True
+
+    def release_probe(self) -> None:
+        self._probing = False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("Orthanc circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning(f"Orthanc circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(settings.orthanc_breaker_failure_threshold, settings.orthanc_breaker_reset_seconds)
+
 
 class OrthancService:
     def __init__(self):
         self.base_url = settings.orthanc_url
-        self.auth = (settings.orthanc_username, settings.orthanc_password)
-        self.timeout = 30.0
-
-    def _client(self) -> httpx.AsyncClient:
-        return httpx.AsyncClient(
-            base_url=self.base_url,
-            auth=self.auth,
-            timeout=self.timeout,
-        )
+
+    async def _request(self, method: str, path: str, endpoint: str, **kwargs) -> httpx.Response:
+        """Send a request through the shared pool, the circuit breaker and the latency histograms.
+
+        ``endpoint`` is the templated path used as histogram label
+        (e.g. ``GET /studies/{id}``). Transport errors and 5xx count as
+        breaker failures; other HTTP errors are raised but leave it closed.
+        """
+        breaker.before_call()
+        start = time.perf_counter()
+        try:
+            resp = await get_client().request(method, path, **kwargs)
+        except httpx.TransportError:
+            metrics.observe(METRIC, endpoint, time.perf_counter() - start, error=True)
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release_probe()  # e.g. cancelled while probing a half-open circuit
+            raise
+        failed = resp.status_code >= 500
+        metrics.observe(METRIC, endpoint, time.perf_counter() - start, error=resp.is_error)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        resp.raise_for_status()
+        return resp
 
     async def get_system_info(self) -> dict[str, Any]:
-        async with self._client() as client:
-            resp = await client.get("/system")
-            resp.raise_for_status()
-            return resp.json()
+        resp = await self._request("GET", "/system", "GET /system")
+        return resp.json()
 
     async def get_study(self, orthanc_id: str) -> dict[str, Any]:
-        async with self._client() as client:
-            resp = await client.get(f"/studies/{orthanc_id}")
-            resp.raise_for_status()
-            return resp.json()
+        resp = await self._request("GET", f"/studies/{orthanc_id}", "GET /studies/{id}")
+        return resp.json()
 
     async def find_study_by_uid(self, study_instance_uid: str) -> Optional[str]:
-        async with self._client() as client:
-            resp = await client.post(
-                "/tools/find",
-                json={
-                    "Level": "Study",
-                    "Query": {"StudyInstanceUID": study_instance_uid},
-                }
-            )
-            resp.raise_for_status()
-            results = resp.json()
-            return results[0] if results else None
+        resp = await self._request(
+            "POST", "/tools/find", "POST /tools/find",
+            json={
+                "Level": "Study",
+                "Query": {"StudyInstanceUID": study_instance_uid},
+            },
+        )
+        results = resp.json()
+        return results[0] if results else None
 
     async def get_study_metadata(self, orthanc_id: str) -> dict[str, Any]:
-        async with self._client() as client:
-            resp = await client.get(f"/studies/{orthanc_id}/statistics")
-            resp.raise_for_status()
-            return resp.json()
+        resp = await self._request("GET", f"/studies/{orthanc_id}/statistics", "GET /studies/{id}/statistics")
+        return resp.json()
+
+    async def get_study_series(self, orthanc_id: str) -> list[dict[str, Any]]:
+        resp = await self._request(
+            "GET", f"/studies/{orthanc_id}/series", "GET /studies/{id}/series", params={"expand": ""}
+        )
+        return resp.json()
+
+    async def get_study_instances(self, orthanc_id: str) -> list[dict[str, Any]]:
+        resp = await self._request(
+            "GET", f"/studies/{orthanc_id}/instances", "GET /studies/{id}/instances", params={"expand": ""}
+        )
+        return resp.json()
+
+    async def get_instance_file(self, instance_id: str) -> bytes:
+        resp = await self._request("GET", f"/instances/{instance_id}/file", "GET /instances/{id}/file")
+        return resp.content
+
+    async def get_instance_file_hash(self, instance_id: str) -> str:
+        """MD5 of the stored DICOM file as recorded by Orthanc.
+
+        Falls back to the attachment's UUID when Orthanc runs with StoreMD5
+        disabled; a stored file is never rewritten under the same UUID.
+        """
+        try:
+            resp = await self._request(
+                "GET", f"/instances/{instance_id}/attachments/dicom/md5", "GET /instances/{id}/attachments/dicom/md5"
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                raise
+            resp = await self._request(
+                "GET", f"/instances/{instance_id}/attachments/dicom/uuid", "GET /instances/{id}/attachments/dicom/uuid"
+            )
+        return resp.text.strip().strip('"')
+
+    async def get_changes(self, since: int, limit: int) -> dict[str, Any]:
+        """One page of the Orthanc change feed: ``{"Changes": [...], "Done": bool, "Last": seq}``."""
+        resp = await self._request("GET", "/changes", "GET /changes", params={"since": since, "limit": limit})
+        return resp.json()
 
     async def delete_study(self, orthanc_id: str) -> None:
-        async with self._client() as client:
-            resp = await client.delete(f"/studies/{orthanc_id}")
-            resp.raise_for_status()
+        await self._request("DELETE", f"/studies/{orthanc_id}", "DELETE /studies/{id}")
 
     async def get_study_preview_url(self, orthanc_id: str, instance_id: Optional[str] = None) -> str:
         return f"{self.base_url}/studies/{orthanc_id}/preview"
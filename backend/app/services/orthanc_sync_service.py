@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.core.notification_dispatcher import notify_role_after_commit
+from app.core.worklist_writer import delete_after_commit
+from app.core.subscription_dispatcher import publish_after_commit
+from app.models.order import ImagingOrder, OrderStatus
+from app.models.orthanc_sync import OrthancSyncState
+from app.models.study import ImagingStudy, StudyStatus
+from app.models.user import UserRole
+from app.models.worklist import DicomWorklistEntry, WorklistStatus
+from app.services.fhir_service import FHIRService, Ref
+from app.services.orthanc_service import OrthancService
+from app.services.preview_service import warm_study_previews
+from app.services.study_metadata_service import warm_study_metadata
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+FEED = "changes"
+
+
+class OrthancSyncService:
+    """Consumes Orthanc's ``/changes`` feed and reconciles stable studies into ``imaging_studies``.
+
+    Each :meth:`poll_once` call processes one page of changes inside a single
+    transaction: the feed cursor row is locked with ``FOR UPDATE SKIP LOCKED``
+    (so only one API worker consumes at a time), ``StableStudy`` events are
+    de-duplicated, their tags and statistics are fetched concurrently (bounded
+    by ``orthanc_changes_concurrency``), studies are bulk-upserted on
+    ``study_instance_uid`` and the cursor advances in the same commit.
+    """
+
+    def __init__(self, db: AsyncSession, orthanc: Optional[OrthancService] = None):
+        self.db = db
+        self.orthanc = orthanc or OrthancService()
+
+    async def poll_once(self) -> tuple[int, bool]:
+        """Process one page. Returns ``(studies upserted, feed exhausted)``."""
+        state = await self._lock_cursor()
+        if state is None:
+            await self.db.rollback()
+            return 0, True  # another worker holds the feed
+
+        page = await self.orthanc.get_changes(state.last_seq, settings.orthanc_changes_batch_limit)
+        changes = page.get("Changes") or []
+        orthanc_ids = list(dict.fromkeys(
+            c["ID"] for c in changes
+            if c.get("ChangeType") == "StableStudy" and c.get("ResourceType") == "Study"
+        ))
+
+        upserted = 0
+        if orthanc_ids:
+            studies = [s for s in await self._fetch_studies(orthanc_ids) if s]
+            upserted = await self._reconcile(studies)
+
+        state.last_seq = page.get("Last", state.last_seq)
+        await self.db.commit()
+        if orthanc_ids:
+            await warm_study_metadata(orthanc_ids)
+            await warm_study_previews(orthanc_ids)
+        if changes:
+            logger.info(
+                f"Orthanc changes: {len(changes)} events, {len(orthanc_ids)} stable studies, "
+                f"{upserted} upserted (seq={state.last_seq})"
+            )
+        return upserted, bool(page.get("Done", True))
+
+    async def _lock_cursor(self) -> Optional[OrthancSyncState]:
+        stmt = (
+            select(OrthancSyncState)
+            .where(OrthancSyncState.name == FEED)
+            .with_for_update(skip_locked=True)
+        )
+        state = (await self.db.execute(stmt)).scalar_one_or_none()
+        if state is None:
+            await self.db.execute(
+                pg_insert(OrthancSyncState).values(name=FEED, last_seq=0).on_conflict_do_nothing()
+            )
+            state = (await self.db.execute(stmt)).scalar_one_or_none()
+        return state
+
+    async def _fetch_studies(self, orthanc_ids: list[str]) -> list[Optional[dict[str, Any]]]:
+        sem = asyncio.Semaphore(settings.orthanc_changes_concurrency)
+
+        async def fetch(orthanc_id: str) -> Optional[dict[str, Any]]:
+            async with sem:
+                try:
+                    study, stats = await asyncio.gather(
+                        self.orthanc.get_study(orthanc_id),
+                        self.orthanc.get_study_metadata(orthanc_id),
+                    )
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code == 404:
+                        return None  # deleted since the change was recorded
+                    raise
+            return {**study, "Statistics": stats}
+
+        return await asyncio.gather(*(fetch(i) for i in orthanc_ids))
+
+    async def _reconcile(self, studies: list[dict[str, Any]]) -> int:
+        if not studies:
+            return 0
+        now = datetime.now(timezone.utc)
+        by_uid: dict[str, dict[str, Any]] = {}
+        for s in studies:
+            tags = s.get("MainDicomTags") or {}
+            if tags.get("StudyInstanceUID"):
+                by_uid[tags["StudyInstanceUID"]] = s
+        if not by_uid:
+            return 0
+
+        # Orders still open for these accession numbers and not linked to another study
+        accessions = {
+            (s.get("MainDicomTags") or {}).get("AccessionNumber") for s in by_uid.values()
+        } - {None, ""}
+        orders: dict[str, ImagingOrder] = {}
+        if accessions:
+            result = await self.db.execute(
+                select(ImagingOrder)
+                .outerjoin(ImagingStudy, ImagingStudy.order_id == ImagingOrder.id)
+                .where(
+                    ImagingOrder.accession_number.in_(accessions),
+                    (ImagingStudy.id.is_(None)) | (ImagingStudy.study_instance_uid.in_(by_uid.keys())),
+                )
+            )
+            orders = {o.accession_number: o for o in result.scalars().all()}
+
+        rows, linked = [], set()
+        for uid, s in by_uid.items():
+            tags = s.get("MainDicomTags") or {}
+            stats = s.get("Statistics") or {}
+            order = orders.get(tags.get("AccessionNumber"))
+            if order is not None and order.id in linked:
+                order = None  # one study per order
+            if order is not None:
+                linked.add(order.id)
+            rows.append({
+                "study_instance_uid": uid,
+                "orthanc_study_id": s["ID"],
+                "order_id": order.id if order else None,
+                "series_count": stats.get("CountSeries", len(s.get("Series") or [])),
+                "instances_count": stats.get("CountInstances", 0),
+                "modality": tags.get("Modality"),
+                "study_description": tags.get("StudyDescription"),
+                "status": StudyStatus.available,
+                "received_at": now,
+            })
+
+        stmt = pg_insert(ImagingStudy).values(rows)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ImagingStudy.study_instance_uid],
+            set_={
+                "orthanc_study_id": excluded.orthanc_study_id,
+                "order_id": func.coalesce(ImagingStudy.order_id, excluded.order_id),
+                "series_count": excluded.series_count,
+                "instances_count": excluded.instances_count,
+                "modality": func.coalesce(excluded.modality, ImagingStudy.modality),
+                "study_description": func.coalesce(excluded.study_description, ImagingStudy.study_description),
+                "status": excluded.status,
+                "updated_at": now,
+            },
+        ).returning(ImagingStudy)
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        saved = list(result.scalars().all())
+
+        completed = [o for o in orders.values() if o.id in linked and o.status != OrderStatus.completed]
+        if completed:
+            await self.db.execute(
+                update(ImagingOrder)
+                .where(ImagingOrder.id.in_([o.id for o in completed]))
+                .values(status=OrderStatus.completed, completed_at=now)
+            )
+            accession_numbers = [o.accession_number for o in completed]
+            await self.db.execute(
+                update(DicomWorklistEntry)
+                .where(DicomWorklistEntry.accession_number.in_(accession_numbers))
+                .values(status=WorklistStatus.completed)
+            )
+            delete_after_commit(self.db, accession_numbers)
+
+        await self._notify(saved, {o.id: o for o in orders.values()}, now)
+        return len(saved)
+
+    async def _notify(self, studies: list[ImagingStudy], orders: dict[int, ImagingOrder], now: datetime) -> None:
+        fhir = FHIRService()
+        for study in studies:
+            order = orders.get(study.order_id)
+            patient = Ref(order.patient_id) if order else None
+            publish_after_commit(self.db, "ImagingStudy", fhir.study_to_fhir(study, order, patient))
+
+        # received_at is only written on insert, so it tells new studies from re-synced ones
+        new = sum(1 for s in studies if s.received_at == now)
+        if not new:
+            return
+        await notify_role_after_commit(
+            self.db, UserRole.radiologist, "study_received",
+            f"{new} estudios recibidos" if new > 1 else f"Estudio recibido: {studies[0].study_description or 'Sin descripción'}",
+            body="Sincronizado desde Orthanc",
+            link="/worklist",
+        )
+
+
+async def run_changes_poller(session_factory=None) -> None:
+    """Long-running task: drain the feed, then poll every ``orthanc_changes_poll_interval_seconds``."""
+    if session_factory is None:
+        from app.db.session import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+
+    interval = settings.orthanc_changes_poll_interval_seconds
+    delay = interval
+    logger.info("Orthanc /changes poller started")
+    while True:
+        try:
+            async with session_factory() as db:
+                _, done = await OrthancSyncService(db).poll_once()
+            delay = 0 if not done else interval
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            delay = min(max(delay, interval) * 2, 300)
+            logger.warning(f"Orthanc /changes poll failed ({e}); retrying in {delay:.0f}s")
+        await asyncio.sleep(delay)
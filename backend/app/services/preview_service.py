@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import pydicom
+from PIL import Image
+from pydicom.multival import MultiValue
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.core.exceptions import NotFoundError
+from app.core.file_cache import FileCache
+from app.services.orthanc_service import OrthancService
+from app.services.study_metadata_service import StudyMetadataService, middle_instance
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_MEDIA_TYPES = {"webp": "image/webp", "png": "image/png"}
+
+
+# ── Rendering ──────────────────────────────────────────────────────────────────
+
+def _first(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, MultiValue):
+        value = value[0] if len(value) else None
+    return float(value) if value is not None else None
+
+
+def render_preview(dicom_bytes: bytes, size: int, fmt: str) -> bytes:
+    """Downsampled 8-bit preview of one DICOM instance (middle frame for multi-frame).
+
+    Applies Modality LUT (rescale slope/intercept) and the VOI window stored in
+    the instance, falling back to the 0.5–99.5 percentile range when there is
+    none. MONOCHROME1 is inverted so every preview reads as MONOCHROME2.
+    """
+    ds = pydicom.dcmread(io.BytesIO(dicom_bytes), force=True)
+    pixels = ds.pixel_array
+    frames = int(getattr(ds, "NumberOfFrames", 1) or 1)
+    if frames > 1:
+        pixels = pixels[frames // 2]
+
+    if getattr(ds, "SamplesPerPixel", 1) == 3:
+        image = Image.fromarray(np.ascontiguousarray(pixels, dtype=np.uint8), "RGB")
+    else:
+        data = pixels.astype(np.float32)
+        slope = _first(getattr(ds, "RescaleSlope", None)) or 1.0
+        intercept = _first(getattr(ds, "RescaleIntercept", None)) or 0.0
+        data = data * slope + intercept
+
+        center = _first(getattr(ds, "WindowCenter", None))
+        width = _first(getattr(ds, "WindowWidth", None))
+        if center is not None and width and width > 1:
+            low, high = center - width / 2, center + width / 2
+        else:
+            low, high = np.percentile(data, (0.5, 99.5))
+        if high <= low:
+            high = low + 1
+        data = np.clip((data - low) / (high - low), 0.0, 1.0)
+        if getattr(ds, "PhotometricInterpretation", "") == "MONOCHROME1":
+            data = 1.0 - data
+        image = Image.fromarray((data * 255).astype(np.uint8), "L")
+
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    if fmt == "webp":
+        image.save(out, "WEBP", quality=80, method=4)
+    else:
+        image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+# ── On-disk cache ──────────────────────────────────────────────────────────────
+
+cache = FileCache(settings.preview_cache_dir, settings.preview_cache_max_mb * 1024 * 1024)
+
+
+# ── Service ────────────────────────────────────────────────────────────────────
+
+class PreviewService:
+    """Per-series PNG/WebP thumbnails rendered from the middle instance of each series.
+
+    The cache key hashes the MD5 Orthanc records for the instance's stored
+    DICOM file (kept in the study metadata cache) with the render parameters.
+    A preview therefore changes only when the pixels it is rendered from do,
+    and its key is known without rendering or calling Orthanc: it is the ETag
+    and the ``v`` parameter of versioned preview URLs.
+    """
+
+    def __init__(self, db: AsyncSession, orthanc: Optional[OrthancService] = None):
+        self.db = db
+        self.orthanc = orthanc or OrthancService()
+        self.fmt = settings.preview_format
+        self.media_type = _MEDIA_TYPES[self.fmt]
+
+    async def series_instance(self, orthanc_study_id: str, series_id: str) -> dict[str, Any]:
+        """The instance a series preview is rendered from."""
+        metadata = await StudyMetadataService(self.db, self.orthanc).get_metadata(orthanc_study_id)
+        series = next((s for s in metadata["Series"] if s["ID"] == series_id), None)
+        if series is None or not series["Instances"]:
+            raise NotFoundError(f"Series {series_id} not found in study {orthanc_study_id}")
+        return middle_instance(series)
+
+    async def preview_key(self, instance: dict[str, Any]) -> str:
+        """Cache key (and ETag) of the instance's preview; nothing is rendered."""
+        file_hash = instance.get("FileHash") or await self.orthanc.get_instance_file_hash(instance["ID"])
+        return hashlib.sha256(f"{file_hash}|{settings.preview_size}|{self.fmt}".encode()).hexdigest()
+
+    async def preview_file(self, instance: dict[str, Any], key: str) -> Path:
+        """Path of the cached preview under ``key`` (rendered on miss)."""
+        path = cache.get(key, self.fmt)
+        if path is None:
+            dicom_bytes = await self.orthanc.get_instance_file(instance["ID"])
+            data = await asyncio.to_thread(render_preview, dicom_bytes, settings.preview_size, self.fmt)
+            path = await asyncio.to_thread(cache.put, key, self.fmt, data)
+        return path
+
+    async def render_study(self, orthanc_study_id: str) -> int:
+        """Render every series preview of a study that is not cached yet."""
+        metadata = await StudyMetadataService(self.db, self.orthanc).get_metadata(orthanc_study_id)
+        rendered = 0
+        for series in metadata["Series"]:
+            if series["Instances"]:
+                instance = middle_instance(series)
+                await self.preview_file(instance, await self.preview_key(instance))
+                rendered += 1
+        return rendered
+
+
+async def warm_study_previews(orthanc_ids: Iterable[str], session_factory=None) -> None:
+    """Render previews for newly arrived studies (runs outside the request path)."""
+    if session_factory is None:
+        from app.db.session import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+
+    for orthanc_id in dict.fromkeys(orthanc_ids):
+        try:
+            async with session_factory() as db:
+                count = await PreviewService(db).render_study(orthanc_id)
+                await db.commit()
+            logger.debug(f"Rendered {count} previews for study {orthanc_id}")
+        except Exception as e:
+            logger.warning(f"Could not render previews for study {orthanc_id}: {e}")
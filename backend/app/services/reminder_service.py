@@ -0,0 +1,300 @@
+"""
+Appointment reminders.
+
+Run from Celery beat (``send_appointment_reminders``). Each pass picks the
+appointments starting within ``reminder_lead_hours`` whose reminder has not
+been sent, in batches of ``reminder_batch_size`` ordered by start time (served
+by the ``(reminder_sent, start_datetime)`` index). Rows are locked with
+``FOR UPDATE SKIP LOCKED`` so overlapping runs never send twice. The patients'
+contacts are loaded with one query per batch, every reminder goes out through
+each configured channel that has a matching contact, with at most
+``reminder_concurrency`` sends in flight, and the batch is marked sent with a
+single UPDATE.
+
+Appointments whose patient has no usable contact are marked as handled too;
+failed sends are left unsent and retried on the next run. Nothing runs unless
+REMINDERS_ENABLED is set and at least one channel is configured.
+"""
+from __future__ import annotations
+
+import abc
+import asyncio
+import logging
+import smtplib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import Optional
+
+import httpx
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.order import ImagingOrder
+from app.models.patient import Patient, PatientContact
+from app.models.schedule import Appointment, AppointmentStatus, Resource
+from app.services.availability_service import schedule_tz
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Appointments in these states get a reminder
+REMINDABLE_STATUSES = (AppointmentStatus.pending, AppointmentStatus.booked)
+
+
+@dataclass
+class Reminder:
+    appointment_id: int
+    patient_id: int
+    patient_name: str
+    start: datetime
+    resource_name: Optional[str] = None
+    procedure: Optional[str] = None
+    contacts: dict[str, str] = field(default_factory=dict)  # contact_type -> value
+
+
+def render(reminder: Reminder) -> tuple[str, str]:
+    """Subject and body of the reminder message."""
+    when = reminder.start.astimezone(schedule_tz())
+    what = f"de {reminder.procedure}" if reminder.procedure else "de imagen"
+    where = f" en {reminder.resource_name}" if reminder.resource_name else ""
+    subject = f"Recordatorio de cita - {when:%d/%m/%Y %H:%M}"
+    body = (
+        f"Estimado/a {reminder.patient_name}: le recordamos su cita {what} el "
+        f"{when:%d/%m/%Y} a las {when:%H:%M}{where}, {settings.institution_name}. "
+        f"Si no puede asistir, por favor avísenos."
+    )
+    return subject, body
+
+
+# ── Channels ─────────────────────────────────────────────────────────────
+
+class ReminderChannel(abc.ABC):
+    """Delivers a message to one kind of patient contact (``contact_type``)."""
+
+    name = ""
+    contact_type = ""
+
+    @abc.abstractmethod
+    async def send(self, to: str, subject: str, body: str) -> None:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SMTPChannel(ReminderChannel):
+    """E-mail over SMTP. smtplib blocks, so sends run in threads; connections are reused."""
+
+    name = "smtp"
+    contact_type = "email"
+
+    def __init__(self) -> None:
+        self._idle: list[smtplib.SMTP] = []
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout_seconds)
+        if settings.smtp_use_tls:
+            conn.starttls()
+        if settings.smtp_username:
+            conn.login(settings.smtp_username, settings.smtp_password)
+        return conn
+
+    def _deliver(self, message: EmailMessage) -> None:
+        try:
+            conn = self._idle.pop()
+        except IndexError:
+            conn = self._connect()
+        try:
+            conn.send_message(message)
+        except Exception:
+            conn.close()
+            raise
+        self._idle.append(conn)
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        message = EmailMessage()
+        message["From"] = settings.smtp_from
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(body)
+        await asyncio.to_thread(self._deliver, message)
+
+    async def aclose(self) -> None:
+        while self._idle:
+            conn = self._idle.pop()
+            try:
+                await asyncio.to_thread(conn.quit)
+            except Exception:
+                conn.close()
+
+
+class HTTPGatewayChannel(ReminderChannel):
+    """SMS/messaging gateway: ``POST {"to", "message"}`` to REMINDER_GATEWAY_URL."""
+
+    name = "http"
+    contact_type = "phone"
+
+    def __init__(self) -> None:
+        if not settings.reminder_gateway_url:
+            raise ValueError("REMINDER_GATEWAY_URL is not set")
+        headers = {"Authorization": f"Bearer {settings.reminder_gateway_token}"} if settings.reminder_gateway_token else {}
+        self._client = httpx.AsyncClient(
+            timeout=settings.reminder_gateway_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.reminder_concurrency,
+                max_keepalive_connections=settings.reminder_concurrency,
+            ),
+            headers=headers,
+        )
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        response = await self._client.post(settings.reminder_gateway_url, json={"to": to, "message": body})
+        response.raise_for_status()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class LogChannel(ReminderChannel):
+    """Local stand-in: logs the message instead of sending it and keeps it in ``sent``."""
+
+    name = "log"
+
+    def __init__(self, contact_type: str = "email") -> None:
+        self.contact_type = contact_type
+        self.sent: list[tuple[str, str, str]] = []
+
+    async def send(self, to: str, subject: str, body: str) -> None:
+        self.sent.append((to, subject, body))
+        logger.info(f"Reminder to {to}: {subject}")
+
+
+CHANNELS: dict[str, type[ReminderChannel]] = {
+    SMTPChannel.name: SMTPChannel,
+    HTTPGatewayChannel.name: HTTPGatewayChannel,
+    LogChannel.name: LogChannel,
+}
+
+
+def build_channels(names: Optional[str] = None) -> list[ReminderChannel]:
+    """Instantiate the channels listed in ``names`` (default: REMINDER_CHANNELS)."""
+    channels = []
+    for name in (names if names is not None else settings.reminder_channels).split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in CHANNELS:
+            raise ValueError(f"Unknown reminder channel '{name}' (expected one of: {', '.join(CHANNELS)})")
+        channels.append(CHANNELS[name]())
+    return channels
+
+
+# ── Dispatcher ───────────────────────────────────────────────────────────
+
+class ReminderService:
+    def __init__(self, db: AsyncSession, channels: list[ReminderChannel]):
+        self.db = db
+        self.channels = channels
+        self._slots = asyncio.Semaphore(settings.reminder_concurrency)
+
+    async def run(self, now: Optional[datetime] = None) -> dict[str, int]:
+        """Send every due reminder; commits after each batch. Returns counts per outcome."""
+        now = now or datetime.now(timezone.utc)
+        horizon = now + timedelta(hours=settings.reminder_lead_hours)
+        stats = {"sent": 0, "failed": 0, "no_contact": 0}
+        if not self.channels:
+            # Every appointment would count as "no contact" and be marked sent
+            logger.warning("No reminder channels configured, skipping the reminder pass")
+            return stats
+        cursor: Optional[tuple[datetime, int]] = None
+        while True:
+            batch = await self._next_batch(now, horizon, cursor)
+            if not batch:
+                break
+            # Failed ones stay unsent; the cursor keeps them out of this run
+            cursor = (batch[-1].start, batch[-1].appointment_id)
+            outcomes = await asyncio.gather(*(self._deliver(r) for r in batch))
+            handled = [r.appointment_id for r, outcome in zip(batch, outcomes) if outcome != "failed"]
+            if handled:
+                await self.db.execute(
+                    update(Appointment)
+                    .where(Appointment.id.in_(handled))
+                    .values(reminder_sent=True)
+                    .execution_options(synchronize_session=False)
+                )
+            await self.db.commit()  # also releases the row locks
+            for outcome in outcomes:
+                stats[outcome] += 1
+            if len(batch) < settings.reminder_batch_size:
+                break
+        return stats
+
+    async def _next_batch(
+        self, now: datetime, horizon: datetime, cursor: Optional[tuple[datetime, int]]
+    ) -> list[Reminder]:
+        stmt = (
+            select(
+                Appointment.id, Appointment.patient_id, Appointment.start_datetime,
+                Patient.first_name, Patient.last_name, Resource.name, ImagingOrder.procedure_description,
+            )
+            .join(Patient, Patient.id == Appointment.patient_id)
+            .outerjoin(Resource, Resource.id == Appointment.resource_id)
+            .outerjoin(ImagingOrder, ImagingOrder.id == Appointment.order_id)
+            .where(
+                Appointment.reminder_sent.is_(False),
+                Appointment.start_datetime >= now,
+                Appointment.start_datetime < horizon,
+                Appointment.status.in_(REMINDABLE_STATUSES),
+            )
+            .order_by(Appointment.start_datetime, Appointment.id)
+            .limit(settings.reminder_batch_size)
+            .with_for_update(of=Appointment, skip_locked=True)
+        )
+        if cursor:
+            stmt = stmt.where(tuple_(Appointment.start_datetime, Appointment.id) > cursor)
+        batch = [
+            Reminder(
+                appointment_id=appt_id, patient_id=patient_id, patient_name=f"{first} {last}",
+                start=start, resource_name=resource_name, procedure=procedure,
+            )
+            for appt_id, patient_id, start, first, last, resource_name, procedure in (await self.db.execute(stmt)).all()
+        ]
+        if batch:
+            contacts = await self._contacts({r.patient_id for r in batch})
+            for r in batch:
+                r.contacts = contacts.get(r.patient_id, {})
+        return batch
+
+    async def _contacts(self, patient_ids: set[int]) -> dict[int, dict[str, str]]:
+        """Each patient's primary (else first) contact of every type the channels use."""
+        types = {c.contact_type for c in self.channels}
+        result = await self.db.execute(
+            select(PatientContact.patient_id, PatientContact.contact_type, PatientContact.value)
+            .where(PatientContact.patient_id.in_(patient_ids), PatientContact.contact_type.in_(types))
+            .order_by(PatientContact.patient_id, PatientContact.is_primary.desc(), PatientContact.id)
+        )
+        contacts: dict[int, dict[str, str]] = {}
+        for patient_id, contact_type, value in result.all():
+            contacts.setdefault(patient_id, {}).setdefault(contact_type, value)
+        return contacts
+
+    async def _deliver(self, reminder: Reminder) -> str:
+        subject, body = render(reminder)
+        attempted = delivered = 0
+        for channel in self.channels:
+            to = reminder.contacts.get(channel.contact_type)
+            if not to:
+                continue
+            attempted += 1
+            async with self._slots:
+                try:
+                    await channel.send(to, subject, body)
+                    delivered += 1
+                except Exception as e:
+                    logger.warning(f"Reminder for appointment {reminder.appointment_id} via {channel.name} failed: {e}")
+        if not attempted:
+            logger.info(f"Appointment {reminder.appointment_id}: patient has no contact for a reminder")
+            return "no_contact"
+        return "sent" if delivered else "failed"
@@ -0,0 +1,303 @@
+"""
+Report packets: every signed report matching a filter as a single download.
+
+A packet is requested through ``POST /reports/packets`` (reports signed within
+a date range and/or of one patient) and built by the ``build_report_packet``
+Celery task on the ``report_packets`` queue, served by a ``--pool=solo``
+worker so that it can start the ReportLab process pool (``report_pdf_workers``
+processes). Matching reports are read from a server-side cursor in batches of
+``report_packet_batch_size``; the PDFs of a batch are obtained through
+:class:`~app.services.report_pdf_service.ReportPDFService`, so reports whose
+signed PDF is already stored are not rendered again and the rest are rendered
+in parallel in that pool. Each batch is appended to the packet in a worker
+thread while the next one is fetched and rendered:
+
+* ``pdf``: one merged PDF with a bookmark per report (pypdf);
+* ``zip``: one PDF per report (stored, PDFs are already compressed).
+
+Progress (``done``/``total``) is recorded after every batch, which is also
+when a cancellation is noticed. Packets are written under
+``<report_pdf_dir>/packets/<job_id>/`` and purged after
+``report_packet_retention_hours``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import zipfile
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import get_settings
+from app.core.exceptions import BadRequestError, NotFoundError
+from app.models.order import ImagingOrder
+from app.models.report import RadiologyReport
+from app.models.report_packet import PacketFormat, PacketStatus, ReportPacketJob
+from app.models.study import ImagingStudy
+from app.services.availability_service import schedule_tz
+from app.services.report_pdf_service import SIGNED_STATUSES, ReportPDFService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _entry_name(report: RadiologyReport) -> str:
+    order = report.study.order if report.study else None
+    accession = order.accession_number if order else None
+    return f"{accession}_{report.id}.pdf" if accession else f"report_{report.id}.pdf"
+
+
+def _bookmark(report: RadiologyReport) -> str:
+    order = report.study.order if report.study else None
+    patient = order.patient if order else None
+    parts = [
+        patient.full_name if patient else None,
+        order.accession_number if order else None,
+        f"{report.signed_at:%d/%m/%Y}" if report.signed_at else None,
+    ]
+    return " - ".join(p for p in parts if p) or f"Informe {report.id}"
+
+
+class _PacketWriter:
+    """Appends report PDFs to the packet file; used from a worker thread."""
+
+    def __init__(self, path: Path, format: PacketFormat):
+        self.path = path
+        self.format = format
+        self._tmp = path.with_suffix(f"{path.suffix}.tmp")
+        self.count = 0
+        if format == PacketFormat.zip:
+            self._zip = zipfile.ZipFile(self._tmp, "w", compression=zipfile.ZIP_STORED)
+        else:
+            from pypdf import PdfWriter
+            self._pdf = PdfWriter()
+
+    def write(self, entries: list[tuple[Path, str, str]]) -> None:
+        for pdf_path, name, bookmark in entries:
+            if self.format == PacketFormat.zip:
+                self._zip.write(pdf_path, arcname=name)
+            else:
+                self._pdf.append(str(pdf_path), outline_item=bookmark, import_outline=False)
+        self.count += len(entries)
+
+    def close(self) -> None:
+        """Finish the packet and move it into place."""
+        if self.format == PacketFormat.zip:
+            self._zip.close()
+        else:
+            with open(self._tmp, "wb") as fh:
+                self._pdf.write(fh)
+            self._pdf.close()
+        os.replace(self._tmp, self.path)
+
+    def discard(self) -> None:
+        if self.format == PacketFormat.zip:
+            self._zip.close()
+        else:
+            self._pdf.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class ReportPacketService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # ── Job bookkeeping ────────────────────────────────────────────────────────
+
+    async def create_job(
+        self,
+        format: PacketFormat,
+        patient_id: Optional[int],
+        date_from: Optional[date],
+        date_to: Optional[date],
+        user_id: Optional[int],
+    ) -> ReportPacketJob:
+        if patient_id is None and date_from is None and date_to is None:
+            raise BadRequestError("A patient or a date range is required")
+        if date_from and date_to and date_from > date_to:
+            raise BadRequestError("date_from must not be after date_to")
+
+        total = await self._count(patient_id, date_from, date_to)
+        if not total:
+            raise BadRequestError("No signed reports match the filter")
+        if total > settings.report_packet_max_reports:
+            raise BadRequestError(
+                f"{total} reports match; a packet holds at most {settings.report_packet_max_reports}, "
+                f"narrow the filter"
+            )
+
+        job = ReportPacketJob(
+            format=format,
+            patient_id=patient_id,
+            date_from=date_from,
+            date_to=date_to,
+            requested_by_id=user_id,
+            total=total,
+            status=PacketStatus.accepted,
+        )
+        self.db.add(job)
+        await self.db.flush()
+        return job
+
+    async def get_job(self, job_id: str) -> ReportPacketJob:
+        result = await self.db.execute(select(ReportPacketJob).where(ReportPacketJob.id == job_id))
+        job = result.scalar_one_or_none()
+        if not job:
+            raise NotFoundError(f"Report packet {job_id} not found")
+        return job
+
+    async def cancel_job(self, job_id: str) -> None:
+        job = await self.get_job(job_id)
+        if job.status in (PacketStatus.accepted, PacketStatus.in_progress):
+            job.status = PacketStatus.cancelled
+            await self.db.flush()
+        else:
+            await self.db.delete(job)
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    @staticmethod
+    def job_dir(job_id: str) -> Path:
+        return Path(settings.report_pdf_dir) / "packets" / job_id
+
+    def output_file(self, job: ReportPacketJob) -> Path:
+        if job.status != PacketStatus.completed or not job.filename:
+            raise NotFoundError(f"Report packet {job.id} is not complete")
+        path = self.job_dir(job.id) / job.filename
+        if not path.is_file():
+            raise NotFoundError(f"Report packet {job.id} is no longer available")
+        return path
+
+    # ── Packet build (Celery worker) ───────────────────────────────────────────
+
+    async def run(self, job_id: str) -> None:
+        job = await self.get_job(job_id)
+        if job.status != PacketStatus.accepted:
+            logger.info(f"Report packet {job_id} skipped (status={job.status.value})")
+            return
+        # Reports may have been signed since the request; the bar follows the actual count
+        job.total = min(
+            await self._count(job.patient_id, job.date_from, job.date_to), settings.report_packet_max_reports
+        )
+        job.status = PacketStatus.in_progress
+        await self.db.commit()
+
+        out_dir = self.job_dir(job_id)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        filename = f"packet.{job.format.value}"
+        try:
+            count = await self._build(job, out_dir / filename)
+            if count is None:
+                logger.info(f"Report packet {job_id} cancelled")
+                shutil.rmtree(out_dir, ignore_errors=True)
+                return
+        except Exception as e:
+            logger.exception(f"Report packet {job_id} failed")
+            await self.db.rollback()
+            await self.db.execute(
+                update(ReportPacketJob).where(ReportPacketJob.id == job_id)
+                .values(status=PacketStatus.failed, error=str(e)[:2000])
+            )
+            await self.db.commit()
+            shutil.rmtree(out_dir, ignore_errors=True)
+            return
+
+        await self.db.execute(
+            update(ReportPacketJob).where(ReportPacketJob.id == job_id).values(
+                status=PacketStatus.completed,
+                filename=filename,
+                total=count,
+                done=count,
+                completed_at=datetime.now(timezone.utc),
+            )
+        )
+        await self.db.commit()  # also stores pdf_path of the reports rendered for the packet
+        logger.info(f"Report packet {job_id} completed: {count} reports")
+
+    async def _build(self, job: ReportPacketJob, path: Path) -> Optional[int]:
+        stmt = (
+            self._query(job.patient_id, job.date_from, job.date_to)
+            .options(
+                selectinload(RadiologyReport.study).selectinload(ImagingStudy.order).selectinload(ImagingOrder.patient)
+            )
+            .order_by(RadiologyReport.signed_at, RadiologyReport.id)
+            .limit(settings.report_packet_max_reports)
+            .execution_options(yield_per=settings.report_packet_batch_size)
+        )
+        pdfs = ReportPDFService(self.db)
+        writer = await asyncio.to_thread(_PacketWriter, path, job.format)
+        pending: Optional[asyncio.Future] = None
+        done = 0
+        try:
+            result = await self.db.stream(stmt)
+            async for partition in result.scalars().partitions():
+                # Stored PDFs come straight back; the others render in the pool side by side
+                files = await asyncio.gather(*(pdfs.report_pdf(r) for r in partition))
+                entries = [(p, _entry_name(r), _bookmark(r)) for r, (p, _) in zip(partition, files)]
+                if pending is not None:
+                    await pending
+                pending = asyncio.ensure_future(asyncio.to_thread(writer.write, entries))
+                done += len(entries)
+                if await self._cancelled(job.id, done):
+                    await pending
+                    await asyncio.to_thread(writer.discard)
+                    return None
+            if pending is not None:
+                await pending
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            await asyncio.to_thread(writer.discard)
+            raise
+        return writer.count
+
+    async def _cancelled(self, job_id: str, done: int) -> bool:
+        """Record progress and report whether the job was cancelled meanwhile."""
+        async with self.db.bind.connect() as conn:
+            result = await conn.execute(
+                update(ReportPacketJob)
+                .where(ReportPacketJob.id == job_id)
+                .values(done=done)
+                .returning(ReportPacketJob.status)
+            )
+            status = result.scalar_one_or_none()
+            await conn.commit()
+        return status == PacketStatus.cancelled
+
+    @staticmethod
+    def _query(patient_id: Optional[int], date_from: Optional[date], date_to: Optional[date]):
+        stmt = select(RadiologyReport).where(RadiologyReport.status.in_(SIGNED_STATUSES))
+        if patient_id is not None:
+            stmt = (
+                stmt.join(ImagingStudy, ImagingStudy.id == RadiologyReport.study_id)
+                .join(ImagingOrder, ImagingOrder.id == ImagingStudy.order_id)
+                .where(ImagingOrder.patient_id == patient_id)
+            )
+        # Dates are calendar days of the institution
+        tz = schedule_tz()
+        if date_from:
+            stmt = stmt.where(RadiologyReport.signed_at >= datetime.combine(date_from, time.min, tz))
+        if date_to:
+            stmt = stmt.where(RadiologyReport.signed_at < datetime.combine(date_to + timedelta(days=1), time.min, tz))
+        return stmt
+
+    async def _count(self, patient_id: Optional[int], date_from: Optional[date], date_to: Optional[date]) -> int:
+        subq = self._query(patient_id, date_from, date_to).with_only_columns(RadiologyReport.id).subquery()
+        return (await self.db.execute(select(func.count()).select_from(subq))).scalar_one()
+
+    async def purge_expired(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.report_packet_retention_hours)
+        result = await self.db.execute(
+            delete(ReportPacketJob).where(ReportPacketJob.created_at < cutoff).returning(ReportPacketJob.id)
+        )
+        job_ids = result.scalars().all()
+        for job_id in job_ids:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return len(job_ids)
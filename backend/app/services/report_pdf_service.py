@@ -0,0 +1,265 @@
+"""
+Report PDF rendering: a process pool for ReportLab and a content-addressed file cache.
+
+ReportLab is pure Python and CPU-bound, so documents are built in a small
+``ProcessPoolExecutor`` whose workers build the paragraph styles and load
+the font metrics once at start-up. The pool is started from the FastAPI
+lifespan and, for report packets, by the ``build_report_packet`` task on its
+``--pool=solo`` worker.
+Where child processes are not allowed (Celery prefork children are daemonic)
+rendering falls back to a thread.
+
+Every PDF is keyed by the SHA-256 of the data it is rendered from (report
+text, patient header, signature) plus the layout version:
+
+* signed reports (final/amended) are written once to
+  ``<report_pdf_dir>/signed/<key[:2]>/<key>.pdf``, recorded in
+  ``RadiologyReport.pdf_path`` and never evicted;
+* drafts go to an LRU cache under ``<report_pdf_dir>/drafts``, so they are
+  re-rendered only when their content changes.
+
+Concurrent requests for the same key share one render. Files are served with
+``FileResponse``, or handed to nginx (``X-Accel-Redirect``, sendfile) when
+REPORT_PDF_ACCEL_REDIRECT is set.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Optional
+from xml.sax.saxutils import escape
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import get_settings
+from app.core.exceptions import NotFoundError
+from app.core.file_cache import FileCache
+from app.models.order import ImagingOrder
+from app.models.report import RadiologyReport, ReportStatus
+from app.models.study import ImagingStudy
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so cached PDFs are not reused
+LAYOUT_VERSION = 2
+SIGNED_STATUSES = (ReportStatus.final, ReportStatus.amended)
+
+
+# ── Rendering (runs in the worker processes) ───────────────────────────────────
+
+_styles = None
+
+
+def _init_worker() -> None:
+    """Process-pool initializer: build the styles and load the fonts once per worker."""
+    global _styles
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.pdfbase import pdfmetrics
+
+    _styles = getSampleStyleSheet()
+    for font in ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Times-Roman"):
+        pdfmetrics.getFont(font)
+
+
+def render_report_pdf(data: dict[str, Any]) -> bytes:
+    """Build the report PDF from :func:`pdf_data`."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import HRFlowable, Paragraph, SimpleDocTemplate, Spacer
+
+    if _styles is None:
+        _init_worker()
+    styles = _styles
+    # Paragraph text is markup: report text such as "x<y" must not be parsed as tags
+    data = {k: escape(v) if isinstance(v, str) else v for k, v in data.items()}
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
+
+    story = []
+    story.append(Paragraph("INFORME RADIOLÓGICO", styles["Title"]))
+    story.append(HRFlowable(width="100%", thickness=1, color=colors.black))
+    story.append(Spacer(1, 0.3*cm))
+
+    if data["patient_name"] is not None:
+        story.append(Paragraph(f"<b>Paciente:</b> {data['patient_name']} | MRN: {data['mrn']}", styles["Normal"]))
+        story.append(Paragraph(f"<b>Modalidad:</b> {data['modality'] or 'N/A'} | Acceso: {data['accession_number']}", styles["Normal"]))
+
+    story.append(Spacer(1, 0.3*cm))
+
+    for field, heading in (
+        ("technique", "Técnica"),
+        ("findings", "Hallazgos"),
+        ("impression", "Impresión Diagnóstica"),
+        ("recommendation", "Recomendaciones"),
+    ):
+        if data[field]:
+            story.append(Paragraph(f"<b>{heading}:</b>", styles["Heading3"]))
+            text = data[field] if field == "technique" else data[field].replace("\n", "<br/>")
+            story.append(Paragraph(text, styles["Normal"]))
+
+    if data["status"] == ReportStatus.final.value:
+        story.append(Spacer(1, 0.5*cm))
+        story.append(HRFlowable(width="100%", thickness=0.5, color=colors.grey))
+        story.append(Paragraph(f"<b>Firmado por:</b> {data['signed_by']}", styles["Normal"]))
+        story.append(Paragraph(f"<b>Fecha firma:</b> {data['signed_at']}", styles["Normal"]))
+        story.append(Paragraph(f"<b>Hash verificación:</b> {data['signature_hash'][:32]}...", styles["Normal"]))
+
+    doc.build(story)
+    return buf.getvalue()
+
+
+# ── Process pool ───────────────────────────────────────────────────────────────
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def start_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and settings.report_pdf_workers > 0 and not multiprocessing.current_process().daemon:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.report_pdf_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        logger.info(f"Report PDF pool started ({settings.report_pdf_workers} workers)")
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def render(data: dict[str, Any]) -> bytes:
+    """Render in the process pool (or a thread where there is none)."""
+    global _pool
+    pool = start_pool()
+    if pool is not None:
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, render_report_pdf, data)
+        except BrokenProcessPool:
+            if _pool is pool:
+                logger.warning("Report PDF pool broke, restarting it")
+                pool.shutdown(wait=False, cancel_futures=True)
+                _pool = None
+    return await asyncio.to_thread(render_report_pdf, data)
+
+
+# ── Storage ────────────────────────────────────────────────────────────────────
+
+drafts = FileCache(os.path.join(settings.report_pdf_dir, "drafts"), settings.report_pdf_cache_max_mb * 1024 * 1024)
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def signed_path(key: str) -> Path:
+    return Path(settings.report_pdf_dir) / "signed" / key[:2] / f"{key}.pdf"
+
+
+def _write_signed(key: str, pdf: bytes) -> Path:
+    path = signed_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(pdf)
+    os.replace(tmp, path)
+    return path
+
+
+async def _render_and_store(key: str, data: dict[str, Any], signed: bool) -> Path:
+    pdf = await render(data)
+    if signed:
+        return await asyncio.to_thread(_write_signed, key, pdf)
+    return await asyncio.to_thread(drafts.put, key, "pdf", pdf)
+
+
+def pdf_data(report: RadiologyReport) -> dict[str, Any]:
+    """Everything the PDF shows; it is both the render input and the cache key material."""
+    study = report.study
+    order = study.order if study else None
+    patient = order.patient if order else None
+    return {
+        "layout": LAYOUT_VERSION,
+        "report_id": report.id,
+        "status": report.status.value,
+        "patient_name": patient.full_name if patient else None,
+        "mrn": patient.mrn if patient else None,
+        "modality": study.modality if study else None,
+        "accession_number": order.accession_number if order else None,
+        "technique": report.technique,
+        "findings": report.findings,
+        "impression": report.impression,
+        "recommendation": report.recommendation,
+        "signed_by": report.signed_by,
+        "signed_at": str(report.signed_at) if report.signed_at else None,
+        "signature_hash": report.signature_hash,
+    }
+
+
+def pdf_key(data: dict[str, Any]) -> str:
+    return hashlib.sha256(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+# ── Service ────────────────────────────────────────────────────────────────────
+
+class ReportPDFService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def pdf_file(self, report_id: int) -> tuple[Path, str]:
+        """Path of the report's PDF and its content key (rendered on miss).
+
+        For signed reports ``pdf_path`` is updated; the caller commits.
+        """
+        result = await self.db.execute(
+            select(RadiologyReport)
+            .options(selectinload(RadiologyReport.study).selectinload(ImagingStudy.order).selectinload(ImagingOrder.patient))
+            .where(RadiologyReport.id == report_id)
+        )
+        report = result.scalar_one_or_none()
+        if not report:
+            raise NotFoundError(f"Report {report_id} not found")
+        return await self.report_pdf(report)
+
+    async def report_pdf(self, report: RadiologyReport) -> tuple[Path, str]:
+        """Like :meth:`pdf_file` for a report loaded with study, order and patient."""
+        data = pdf_data(report)
+        key = pdf_key(data)
+        signed = report.status in SIGNED_STATUSES
+        path = signed_path(key) if signed else drafts.get(key, "pdf")
+        if path is None or not path.exists():
+            task = _inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(_render_and_store(key, data, signed))
+                _inflight[key] = task
+                task.add_done_callback(lambda _: _inflight.pop(key, None))
+            path = await asyncio.shield(task)
+        if signed and report.pdf_path != str(path):
+            report.pdf_path = str(path)
+        return path, key
+
+
+async def prerender_report_pdf(report_id: int) -> None:
+    """Render a freshly signed report's PDF outside the request path."""
+    from app.db.session import AsyncSessionLocal
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await ReportPDFService(db).pdf_file(report_id)
+            await db.commit()
+    except Exception as e:
+        logger.warning(f"Could not pre-render PDF for report {report_id}: {e}")
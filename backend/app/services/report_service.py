@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import io
+import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import List, Optional
@@ -11,11 +11,12 @@ from sqlalchemy.orm import selectinload
 
 from app.core.exceptions import BadRequestError, ForbiddenError, NotFoundError
 from app.core.security import compute_report_signature, verify_password
-from app.models.order import ImagingOrder
+from app.core.subscription_dispatcher import publish_after_commit
 from app.models.report import RadiologyReport, ReportStatus, ReportVersion
 from app.models.study import ImagingStudy
 from app.models.user import User
 from app.schemas.report import ReportCreate, ReportUpdate
+from app.services.fhir_service import FHIRService, Ref
 
 logger = logging.getLogger(__name__)
 
@@ -127,63 +128,19 @@ class ReportService:
         report.status = ReportStatus.final
 
         await self.db.flush()
-        return await self.get_by_id(report.id)
-
-    async def generate_pdf(self, report_id: int) -> bytes:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import cm
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable
-        from reportlab.lib import colors
-
-        report = await self.get_by_id(report_id)
+        report = await self.get_by_id(report.id)
 
-        # Load study and patient info
-        result = await self.db.execute(
-            select(ImagingStudy)
-            .options(selectinload(ImagingStudy.order).selectinload(ImagingOrder.patient))
-            .where(ImagingStudy.id == report.study_id)
+        # Notify FHIR DiagnosticReport subscribers once the signature is committed
+        study = report.study
+        resource = FHIRService().report_to_fhir(
+            report, study, Ref(study.order.patient_id) if study and study.order else None
         )
-        study = result.scalar_one_or_none()
-
-        buf = io.BytesIO()
-        doc = SimpleDocTemplate(buf, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-        styles = getSampleStyleSheet()
-
-        story = []
-        story.append(Paragraph("INFORME RADIOLÓGICO", styles["Title"]))
-        story.append(HRFlowable(width="100%", thickness=1, color=colors.black))
-        story.append(Spacer(1, 0.3*cm))
-
-        if study and study.order and study.order.patient:
-            p = study.order.patient
-            story.append(Paragraph(f"<b>Paciente:</b> {p.full_name} | MRN: {p.mrn}", styles["Normal"]))
-            story.append(Paragraph(f"<b>Modalidad:</b> {study.modality or 'N/A'} | Acceso: {study.order.accession_number}", styles["Normal"]))
-
-        story.append(Spacer(1, 0.3*cm))
-
-        if report.technique:
-            story.append(Paragraph("<b>Técnica:</b>", styles["Heading3"]))
-            story.append(Paragraph(report.technique, styles["Normal"]))
-
-        if report.findings:
-            story.append(Paragraph("<b>Hallazgos:</b>", styles["Heading3"]))
-            story.append(Paragraph(report.findings.replace("\n", "<br/>"), styles["Normal"]))
-
-        if report.impression:
-            story.append(Paragraph("<b>Impresión Diagnóstica:</b>", styles["Heading3"]))
-            story.append(Paragraph(report.impression.replace("\n", "<br/>"), styles["Normal"]))
+        publish_after_commit(self.db, "DiagnosticReport", resource)
+        return report
 
-        if report.recommendation:
-            story.append(Paragraph("<b>Recomendaciones:</b>", styles["Heading3"]))
-            story.append(Paragraph(report.recommendation.replace("\n", "<br/>"), styles["Normal"]))
+    async def generate_pdf(self, report_id: int) -> bytes:
+        """PDF bytes of the report, from the rendered-PDF cache (see report_pdf_service)."""
+        from app.services.report_pdf_service import ReportPDFService
 
-        if report.status == ReportStatus.final:
-            story.append(Spacer(1, 0.5*cm))
-            story.append(HRFlowable(width="100%", thickness=0.5, color=colors.grey))
-            story.append(Paragraph(f"<b>Firmado por:</b> {report.signed_by}", styles["Normal"]))
-            story.append(Paragraph(f"<b>Fecha firma:</b> {report.signed_at}", styles["Normal"]))
-            story.append(Paragraph(f"<b>Hash verificación:</b> {report.signature_hash[:32]}...", styles["Normal"]))
-
-        doc.build(story)
-        return buf.getvalue()
+        path, _ = await ReportPDFService(self.db).pdf_file(report_id)
+        return await asyncio.to_thread(path.read_bytes)
@@ -0,0 +1,275 @@
+"""
+Greedy day scheduler for pending imaging orders.
+
+Orders are placed one at a time, STAT first, then ASAP, URGENT and ROUTINE,
+and within a priority the longest exams first (longest-processing-time
+packing leaves fewer unusable fragments). Each order takes the earliest
+start at which some lane of a room of its modality is free and the patient
+has no other appointment; ties go to the tightest-fitting gap so large gaps
+stay available for long exams. Exams are packed back-to-back; only "now"
+is rounded up to the ``slot_step_minutes`` grid.
+
+Free time is kept per lane as a sorted list of gaps (operating hours minus
+existing bookings, from :func:`free_gaps`); placing an order splits one gap.
+:func:`plan` is pure, so it is benchmarked offline (``bench_schedule_optimizer.py``).
+"""
+from __future__ import annotations
+
+import time as _time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.core.worklist_writer import write_after_commit
+from app.models.order import ImagingOrder, OrderPriority, OrderStatus
+from app.models.schedule import INACTIVE_APPOINTMENT_STATUSES, Appointment, AppointmentStatus, Resource
+from app.models.worklist import DicomWorklistEntry
+from app.services.availability_service import AvailabilityService, Interval, free_gaps, operating_windows, schedule_tz
+from app.services.schedule_service import guard_overlap
+
+settings = get_settings()
+
+PRIORITY_RANK = {OrderPriority.stat: 0, OrderPriority.asap: 1, OrderPriority.urgent: 2, OrderPriority.routine: 3}
+
+
+@dataclass
+class Job:
+    order_id: int
+    patient_id: int
+    modality: str
+    priority: OrderPriority
+    duration: timedelta
+    requested_at: Optional[datetime] = None
+
+
+@dataclass
+class Assignment:
+    order_id: int
+    resource_id: int
+    lane: int
+    start: datetime
+    end: datetime
+
+
+@dataclass
+class Plan:
+    assignments: list[Assignment] = field(default_factory=list)
+    unscheduled: list[tuple[int, str]] = field(default_factory=list)  # (order_id, reason)
+    utilization: list[dict[str, Any]] = field(default_factory=list)
+    duration_ms: float = 0.0
+
+
+def _minutes(delta: timedelta) -> float:
+    return delta.total_seconds() / 60
+
+
+def plan(
+    jobs: list[Job],
+    resources: list[Resource],
+    windows: dict[int, list[Interval]],
+    bookings: dict[int, dict[int, list[Interval]]],
+    patient_busy: dict[int, list[Interval]],
+    step: timedelta,
+    origin: datetime,
+    not_before: datetime,
+) -> Plan:
+    """Assign rooms and start times to ``jobs``.
+
+    ``windows`` are each resource's operating hours, ``bookings`` its existing
+    appointments per lane and ``patient_busy`` the patients' other
+    appointments. Starts before ``not_before`` are not used; ``not_before`` is
+    rounded up to the ``step`` grid from ``origin``.
+    """
+    started = _time.perf_counter()
+    result = Plan()
+
+    # (resource, lane, gaps) per modality
+    lanes: dict[str, list[tuple[Resource, int, list[Interval]]]] = {}
+    for r in resources:
+        for lane in range(max(r.capacity or 1, 1)):
+            gaps = [(s, e) for s, e, _ in free_gaps(windows.get(r.id, []), bookings.get(r.id, {}).get(lane, ()))]
+            lanes.setdefault(r.modality, []).append((r, lane, gaps))
+    patient_busy = {p: sorted(b) for p, b in patient_busy.items()}
+
+    def align(t: datetime) -> datetime:
+        return origin + -(-(t - origin) // step) * step
+
+    def earliest_fit(gaps: list[Interval], job: Job) -> Optional[tuple[int, datetime, timedelta]]:
+        busy = patient_busy.get(job.patient_id, ())
+        for i, (g_start, g_end) in enumerate(gaps):
+            if g_end - g_start < job.duration:
+                continue
+            t = g_start if g_start >= not_before else align(not_before)
+            while t + job.duration <= g_end:
+                clash = next((e for s, e in busy if s < t + job.duration and e > t), None)
+                if clash is None:
+                    return i, t, (g_end - g_start) - job.duration
+                t = clash
+        return None
+
+    ordered = sorted(jobs, key=lambda j: (
+        PRIORITY_RANK.get(j.priority, 3), -j.duration, j.requested_at or origin, j.order_id,
+    ))
+    for job in ordered:
+        candidates = lanes.get(job.modality)
+        if not candidates:
+            result.unscheduled.append((job.order_id, f"No hay salas disponibles para {job.modality}"))
+            continue
+        best = None
+        for resource, lane, gaps in candidates:
+            fit = earliest_fit(gaps, job)
+            if fit and (best is None or (fit[1], fit[2]) < (best[1][1], best[1][2])):
+                best = ((resource, lane, gaps), fit)
+        if best is None:
+            result.unscheduled.append((job.order_id, "Sin capacidad disponible en el día"))
+            continue
+        (resource, lane, gaps), (i, start, _) = best
+        end = start + job.duration
+        g_start, g_end = gaps[i]
+        gaps[i:i + 1] = [g for g in ((g_start, start), (end, g_end)) if g[1] > g[0]]
+        patient_busy.setdefault(job.patient_id, []).append((start, end))
+        result.assignments.append(Assignment(job.order_id, resource.id, lane, start, end))
+
+    result.utilization = _utilization(resources, windows, bookings, result.assignments)
+    result.duration_ms = round((_time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def _utilization(
+    resources: list[Resource],
+    windows: dict[int, list[Interval]],
+    bookings: dict[int, dict[int, list[Interval]]],
+    assignments: list[Assignment],
+) -> list[dict[str, Any]]:
+    planned: dict[int, float] = {}
+    for a in assignments:
+        planned[a.resource_id] = planned.get(a.resource_id, 0) + _minutes(a.end - a.start)
+    rows = []
+    for r in resources:
+        capacity = max(r.capacity or 1, 1)
+        available = sum(_minutes(e - s) for s, e in windows.get(r.id, [])) * capacity
+        booked = 0.0
+        for lane_bookings in bookings.get(r.id, {}).values():
+            for b_start, b_end in lane_bookings:
+                for w_start, w_end in windows.get(r.id, []):
+                    overlap = min(b_end, w_end) - max(b_start, w_start)
+                    if overlap > timedelta(0):
+                        booked += _minutes(overlap)
+        total = booked + planned.get(r.id, 0)
+        rows.append({
+            "resource_id": r.id,
+            "resource_name": r.name,
+            "modality": r.modality,
+            "available_minutes": round(available),
+            "booked_minutes": round(booked),
+            "planned_minutes": round(planned.get(r.id, 0)),
+            "utilization": round(total / available, 3) if available else 0.0,
+        })
+    return rows
+
+
+class ScheduleOptimizerService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def optimize(
+        self,
+        day: date,
+        order_ids: Optional[list[int]] = None,
+        modality: Optional[str] = None,
+        durations: Optional[dict[str, int]] = None,
+        default_duration_minutes: int = 30,
+        apply: bool = False,
+        tz: Optional[tzinfo] = None,
+    ) -> Plan:
+        """Plan the day's pending orders (REQUESTED, no appointment); with ``apply`` book them."""
+        tz = tz or schedule_tz()
+        durations = durations or {}
+        day_start = datetime.combine(day, time(), tz)
+        day_end = day_start + timedelta(days=1)
+        not_before = max(day_start, datetime.now(tz))
+
+        stmt = (
+            select(ImagingOrder)
+            .outerjoin(Appointment, Appointment.order_id == ImagingOrder.id)
+            .where(ImagingOrder.status == OrderStatus.requested, Appointment.id.is_(None))
+        )
+        if order_ids:
+            stmt = stmt.where(ImagingOrder.id.in_(order_ids))
+        if modality:
+            stmt = stmt.where(ImagingOrder.modality == modality)
+        orders = list((await self.db.execute(stmt)).scalars().all())
+        jobs = [
+            Job(
+                order_id=o.id,
+                patient_id=o.patient_id,
+                modality=o.modality.value,
+                priority=o.priority,
+                duration=timedelta(minutes=durations.get(o.modality.value, default_duration_minutes)),
+                requested_at=o.requested_at,
+            )
+            for o in orders
+        ]
+
+        stmt = select(Resource).where(Resource.is_available.is_(True), Resource.modality.is_not(None))
+        if modality:
+            stmt = stmt.where(Resource.modality == modality)
+        resources = list((await self.db.execute(stmt.order_by(Resource.id))).scalars().all())
+        windows = {r.id: operating_windows(r, day, 1, tz) for r in resources}
+        bookings = await AvailabilityService(self.db).bookings([r.id for r in resources], day_start, day_end)
+
+        patient_busy: dict[int, list[Interval]] = {}
+        patient_ids = {j.patient_id for j in jobs}
+        if patient_ids:
+            result = await self.db.execute(
+                select(Appointment.patient_id, Appointment.start_datetime, Appointment.end_datetime).where(
+                    Appointment.patient_id.in_(patient_ids),
+                    Appointment.status.notin_(INACTIVE_APPOINTMENT_STATUSES),
+                    Appointment.start_datetime < day_end,
+                    Appointment.end_datetime > day_start,
+                )
+            )
+            for patient_id, start, end in result.all():
+                patient_busy.setdefault(patient_id, []).append((start, end))
+
+        step = timedelta(minutes=settings.slot_step_minutes)
+        result = plan(jobs, resources, windows, bookings, patient_busy, step, day_start, not_before)
+        if apply and result.assignments:
+            await self._apply(result.assignments, {o.id: o for o in orders}, {r.id: r for r in resources})
+        return result
+
+    async def _apply(
+        self, assignments: list[Assignment], orders: dict[int, ImagingOrder], resources: dict[int, Resource]
+    ) -> None:
+        entries = {
+            e.order_id: e for e in (await self.db.execute(
+                select(DicomWorklistEntry).where(DicomWorklistEntry.order_id.in_([a.order_id for a in assignments]))
+            )).scalars()
+        }
+        async with guard_overlap(self.db):
+            for a in assignments:
+                order, resource = orders[a.order_id], resources[a.resource_id]
+                order.status = OrderStatus.scheduled
+                order.scheduled_at = a.start
+                self.db.add(Appointment(
+                    patient_id=order.patient_id,
+                    order_id=order.id,
+                    resource_id=resource.id,
+                    lane=a.lane,
+                    status=AppointmentStatus.booked,
+                    start_datetime=a.start,
+                    end_datetime=a.end,
+                    duration_minutes=int(_minutes(a.end - a.start)),
+                    notes=order.procedure_description,
+                ))
+                entry = entries.get(order.id)
+                if entry:
+                    entry.scheduled_datetime = a.start
+                    entry.scheduled_station_ae_title = resource.ae_title
+                    entry.scheduled_station_name = resource.name
+        # The .wl files carry the scheduled date/time, so rewrite them
+        write_after_commit(self.db, entries.values())
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from datetime import datetime, time, timedelta, timezone
+from typing import AsyncIterator, List, Optional
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.dialects.postgresql import TSTZRANGE
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.exceptions import ConflictError, NotFoundError
-from app.models.schedule import Appointment, AppointmentStatus, Resource
+from app.core.exceptions import BadRequestError, ConflictError, NotFoundError
+from app.models.schedule import INACTIVE_APPOINTMENT_STATUSES, Appointment, AppointmentStatus, Resource
 from app.schemas.schedule import AppointmentCreate, AppointmentUpdate, SlotResponse
+from app.services.availability_service import (
+    AvailabilityService, operating_windows, resource_slots, schedule_tz, within_operating_hours,
+)
 
 
 class ScheduleService:
@@ -23,118 +29,165 @@ class ScheduleService:
         working_hours_start: int = 8,
         working_hours_end: int = 18,
     ) -> List[SlotResponse]:
-        # Get all booked appointments for the day
-        day_start = date.replace(hour=working_hours_start, minute=0, second=0, microsecond=0)
-        day_end = date.replace(hour=working_hours_end, minute=0, second=0, microsecond=0)
-
-        booked = await self.db.execute(
-            select(Appointment).where(
-                Appointment.resource_id == resource_id,
-                Appointment.status.notin_([AppointmentStatus.cancelled, AppointmentStatus.noshow]),
-                Appointment.start_datetime >= day_start,
-                Appointment.start_datetime < day_end,
+        """The day's grid of ``duration_minutes`` slots, each flagged free or taken.
+
+        A slot is available when it lies within the resource's operating hours
+        and one of its ``capacity`` lanes is free (see availability_service).
+        """
+        resource = await self.get_resource(resource_id)
+        # The requested calendar day, with operating hours read in SCHEDULE_TIMEZONE
+        tz = schedule_tz()
+        day_start = datetime.combine(date.date(), time(working_hours_start), tz)
+        day_end = datetime.combine(date.date(), time(working_hours_end), tz)
+        duration = timedelta(minutes=duration_minutes)
+
+        windows = [
+            (max(s, day_start), min(e, day_end))
+            for s, e in operating_windows(resource, date.date(), 1, tz)
+            if s < day_end and e > day_start
+        ]
+        bookings = await AvailabilityService(self.db).bookings([resource_id], day_start, day_end)
+        free = {
+            slot.start
+            for slot in resource_slots(
+                resource, windows, bookings.get(resource_id, {}), duration, duration, day_start, origin=day_start
             )
-        )
-        booked_slots = list(booked.scalars().all())
+        }
 
         slots = []
         current = day_start
-        while current + timedelta(minutes=duration_minutes) <= day_end:
-            slot_end = current + timedelta(minutes=duration_minutes)
-            available = not any(
-                not (slot_end <= b.start_datetime or current >= b.end_datetime)
-                for b in booked_slots
-            )
+        while current + duration <= day_end:
             slots.append(SlotResponse(
                 resource_id=resource_id,
                 start_datetime=current,
-                end_datetime=slot_end,
+                end_datetime=current + duration,
                 duration_minutes=duration_minutes,
-                available=available,
+                available=current in free,
             ))
-            current += timedelta(minutes=duration_minutes)
-
+            current += duration
         return slots
 
-    async def create_appointment(self, data: AppointmentCreate) -> Appointment:
-        from datetime import timedelta
-        end_dt = data.start_datetime + timedelta(minutes=data.duration_minutes)
-
-        # Validate operating hours of the resource
-        if data.resource_id:
-            res_result = await self.db.execute(
-                select(Resource).where(Resource.id == data.resource_id)
-            )
-            resource = res_result.scalar_one_or_none()
-            if resource:
-                appt_hour = data.start_datetime.hour
-                appt_end_hour = end_dt.hour + (1 if end_dt.minute > 0 else 0)
-                if appt_hour < resource.operating_start_hour or appt_end_hour > resource.operating_end_hour:
-                    raise ConflictError(
-                        f"La cita está fuera del horario de operación del recurso "
-                        f"'{resource.name}' ({resource.operating_start_hour}:00 - {resource.operating_end_hour}:00)"
-                    )
-
-        # Check patient is not double-booked at this time
-        patient_conflict = await self.db.execute(
-            select(Appointment).where(
-                Appointment.patient_id == data.patient_id,
-                Appointment.status.notin_([AppointmentStatus.cancelled, AppointmentStatus.noshow]),
-                Appointment.start_datetime < end_dt,
-                Appointment.end_datetime > data.start_datetime,
-            )
+    async def find_conflict(
+        self,
+        patient_id: int,
+        resource: Optional[Resource],
+        start: datetime,
+        end: datetime,
+        exclude_id: Optional[int] = None,
+    ) -> tuple[Optional[str], int]:
+        """``("patient" | "resource" | None, lane)`` for the slot ``[start, end)``.
+
+        One probe for both checks, served by the GiST indexes behind the
+        exclusion constraints. ``lane`` is the lowest of the resource's
+        ``capacity`` lanes with no overlapping booking; a patient overlap is
+        reported first.
+        """
+        is_patient = Appointment.patient_id == patient_id
+        stmt = select(is_patient, Appointment.resource_id, Appointment.lane).where(
+            or_(is_patient, Appointment.resource_id == resource.id) if resource else is_patient,
+            Appointment.during.op("&&")(func.tstzrange(start, end, "[)", type_=TSTZRANGE)),
+            Appointment.status.notin_(INACTIVE_APPOINTMENT_STATUSES),
         )
-        existing = patient_conflict.scalar_one_or_none()
-        if existing:
-            raise ConflictError(
-                "El paciente ya tiene un estudio programado en ese horario. "
-                "Debe haber al menos 30 minutos entre estudios."
-            )
-
-        # Check for resource conflicts
-        if data.resource_id:
-            conflict = await self.db.execute(
-                select(Appointment).where(
-                    Appointment.resource_id == data.resource_id,
-                    Appointment.status.notin_([AppointmentStatus.cancelled, AppointmentStatus.noshow]),
-                    Appointment.start_datetime < end_dt,
-                    Appointment.end_datetime > data.start_datetime,
-                )
+        if exclude_id:
+            stmt = stmt.where(Appointment.id != exclude_id)
+        rows = (await self.db.execute(stmt)).all()
+        if any(same_patient for same_patient, _, _ in rows):
+            return "patient", 0
+        if resource is None:
+            return None, 0
+        taken = {lane for _, resource_id, lane in rows if resource_id == resource.id}
+        lane = next((n for n in range(max(resource.capacity or 1, 1)) if n not in taken), None)
+        return (None, lane) if lane is not None else ("resource", 0)
+
+    async def validate_slot(
+        self,
+        patient_id: int,
+        resource: Optional[Resource],
+        start: datetime,
+        duration_minutes: int,
+        exclude_id: Optional[int] = None,
+    ) -> int:
+        """Operating hours of ``resource`` and patient/resource overlaps, before anything is written.
+
+        Returns the resource lane to book.
+        """
+        end = start + timedelta(minutes=duration_minutes)
+        if resource and not within_operating_hours(resource, start, end):
+            raise BadRequestError(
+                f"La hora programada está fuera del horario de operación del equipo "
+                f"'{resource.name}' ({resource.operating_start_hour}:00 - {resource.operating_end_hour}:00)"
             )
-            if conflict.scalar_one_or_none():
-                raise ConflictError(
-                    f"El equipo ya tiene un estudio programado en ese horario. "
-                    f"Seleccione otra hora u otro equipo."
-                )
+        conflict, lane = await self.find_conflict(patient_id, resource, start, end, exclude_id)
+        if conflict:
+            raise _conflict_error(conflict, resource)
+        return lane
 
+    async def book(
+        self,
+        patient_id: int,
+        start_datetime: datetime,
+        duration_minutes: int,
+        resource: Optional[Resource] = None,
+        order_id: Optional[int] = None,
+        notes: Optional[str] = None,
+        lane: int = 0,
+    ) -> Appointment:
+        """Insert a booked appointment; the exclusion constraints settle races with other sessions."""
         appt = Appointment(
-            patient_id=data.patient_id,
-            order_id=data.order_id,
-            resource_id=data.resource_id,
+            patient_id=patient_id,
+            order_id=order_id,
+            resource_id=resource.id if resource else None,
             status=AppointmentStatus.booked,
-            start_datetime=data.start_datetime,
-            end_datetime=end_dt,
-            duration_minutes=data.duration_minutes,
-            notes=data.notes,
+            start_datetime=start_datetime,
+            end_datetime=start_datetime + timedelta(minutes=duration_minutes),
+            duration_minutes=duration_minutes,
+            lane=lane,
+            notes=notes,
         )
-        self.db.add(appt)
-        await self.db.flush()
+        async with guard_overlap(self.db, resource):
+            self.db.add(appt)
         return appt
 
+    async def create_appointment(self, data: AppointmentCreate) -> Appointment:
+        resource = None
+        if data.resource_id:
+            resource = await self.get_resource(data.resource_id)
+        lane = await self.validate_slot(data.patient_id, resource, data.start_datetime, data.duration_minutes)
+        return await self.book(
+            data.patient_id, data.start_datetime, data.duration_minutes,
+            resource=resource, order_id=data.order_id, notes=data.notes, lane=lane,
+        )
+
+    async def get_resource(self, resource_id: int) -> Resource:
+        resource = await self.db.get(Resource, resource_id)
+        if not resource:
+            raise NotFoundError(f"Recurso {resource_id} no encontrado")
+        return resource
+
     async def update_appointment(self, appt_id: int, data: AppointmentUpdate) -> Appointment:
         result = await self.db.execute(select(Appointment).where(Appointment.id == appt_id))
         appt = result.scalar_one_or_none()
         if not appt:
             raise NotFoundError(f"Appointment {appt_id} not found")
 
-        for field, value in data.model_dump(exclude_none=True).items():
-            setattr(appt, field, value)
-
-        if data.start_datetime and data.duration_minutes:
-            from datetime import timedelta
-            appt.end_datetime = data.start_datetime + timedelta(minutes=data.duration_minutes)
-
-        await self.db.flush()
+        changes = data.model_dump(exclude_none=True)
+        start = changes.get("start_datetime", appt.start_datetime)
+        end = start + timedelta(minutes=changes.get("duration_minutes", appt.duration_minutes))
+        resource_id = changes.get("resource_id", appt.resource_id)
+        resource = await self.db.get(Resource, resource_id) if resource_id else None
+        lane = appt.lane
+        moved = (start, end, resource_id) != (appt.start_datetime, appt.end_datetime, appt.resource_id)
+        if moved and changes.get("status", appt.status) not in INACTIVE_APPOINTMENT_STATUSES:
+            # Re-pick the lane: the current one may be taken at the new time while another is free
+            conflict, lane = await self.find_conflict(appt.patient_id, resource, start, end, exclude_id=appt.id)
+            if conflict:
+                raise _conflict_error(conflict, resource)
+
+        async with guard_overlap(self.db, resource):
+            for field, value in changes.items():
+                setattr(appt, field, value)
+            appt.end_datetime = end
+            appt.lane = lane
         return appt
 
     async def list_appointments(
@@ -156,3 +209,32 @@ class ScheduleService:
         stmt = stmt.order_by(Appointment.start_datetime)
         result = await self.db.execute(stmt)
         return list(result.scalars().all())
+
+
+def _conflict_error(kind: str, resource: Optional[Resource] = None) -> ConflictError:
+    if kind == "patient":
+        return ConflictError("El paciente ya tiene un estudio programado en ese horario.")
+    name = f"'{resource.name}' " if resource else ""
+    return ConflictError(
+        f"El equipo {name}ya tiene un estudio programado en ese horario. "
+        "Seleccione otra hora u otro equipo."
+    )
+
+
+@asynccontextmanager
+async def guard_overlap(db: AsyncSession, resource: Optional[Resource] = None) -> AsyncIterator[None]:
+    """Flush the block's changes in a SAVEPOINT, mapping exclusion violations to ConflictError.
+
+    SQLSTATE 23P01 means another transaction booked an overlapping slot after
+    the pre-check; only the savepoint is rolled back, the caller's transaction
+    stays usable.
+    """
+    try:
+        async with db.begin_nested():
+            yield
+            await db.flush()
+    except IntegrityError as e:
+        if getattr(e.orig, "pgcode", None) != "23P01":
+            raise
+        kind = "patient" if "appointments_patient_no_overlap" in str(e.orig) else "resource"
+        raise _conflict_error(kind, resource) from e
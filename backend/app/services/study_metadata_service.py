@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+import httpx
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import NotFoundError
+from app.models.study import ImagingStudy
+from app.models.study_metadata import StudyMetadata
+from app.services.orthanc_service import OrthancService
+
+logger = logging.getLogger(__name__)
+
+# Concurrent Orthanc studies fetched by warm()
+_WARM_CONCURRENCY = 4
+# Concurrent file-hash requests per refreshed study
+_HASH_CONCURRENCY = 8
+
+
+def middle_instance(series: dict[str, Any]) -> dict[str, Any]:
+    """The instance a series preview is rendered from."""
+    instances = series["Instances"]
+    return instances[len(instances) // 2]
+
+
+class StudyMetadataService:
+    """Read-through cache of Orthanc study metadata in ``study_metadata_cache``.
+
+    Rows are written when a study arrives (webhook / ``/changes`` poller) and on
+    the first miss; study views are then answered from the database. A row is
+    replaced when Orthanc reports the study stable again and dropped by
+    :meth:`delete_study`. The middle instance of each series also carries the
+    MD5 of its stored file (``FileHash``), from which preview keys are derived.
+    """
+
+    def __init__(self, db: AsyncSession, orthanc: Optional[OrthancService] = None):
+        self.db = db
+        self.orthanc = orthanc or OrthancService()
+
+    async def get_study(self, orthanc_id: str) -> dict[str, Any]:
+        """``GET /studies/{id}`` as Orthanc returns it."""
+        return (await self._get(orthanc_id)).study
+
+    async def get_metadata(self, orthanc_id: str) -> dict[str, Any]:
+        """Study tags plus series and instance tag summaries."""
+        row = await self._get(orthanc_id)
+        return {
+            "orthanc_study_id": row.orthanc_study_id,
+            "study_instance_uid": row.study_instance_uid,
+            "series_count": row.series_count,
+            "instances_count": row.instances_count,
+            "fetched_at": row.fetched_at,
+            "MainDicomTags": row.study.get("MainDicomTags", {}),
+            "PatientMainDicomTags": row.study.get("PatientMainDicomTags", {}),
+            "Series": row.series,
+        }
+
+    async def refresh(self, orthanc_id: str) -> StudyMetadata:
+        """Fetch the study from Orthanc and (re)write its cache row."""
+        try:
+            study, series, instances = await asyncio.gather(
+                self.orthanc.get_study(orthanc_id),
+                self.orthanc.get_study_series(orthanc_id),
+                self.orthanc.get_study_instances(orthanc_id),
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                await self.invalidate(orthanc_id)
+                raise NotFoundError(f"Study {orthanc_id} not found in Orthanc")
+            raise
+
+        by_series: dict[str, list[dict[str, Any]]] = {}
+        for inst in instances:
+            by_series.setdefault(inst.get("ParentSeries"), []).append({
+                "ID": inst["ID"],
+                "IndexInSeries": inst.get("IndexInSeries"),
+                "MainDicomTags": inst.get("MainDicomTags", {}),
+            })
+        summaries = []
+        for s in series:
+            series_instances = sorted(by_series.get(s["ID"], []), key=lambda i: i["IndexInSeries"] or 0)
+            summaries.append({
+                "ID": s["ID"],
+                "MainDicomTags": s.get("MainDicomTags", {}),
+                "Instances": series_instances,
+            })
+        await self._add_file_hashes([middle_instance(s) for s in summaries if s["Instances"]])
+
+        values = {
+            "orthanc_study_id": orthanc_id,
+            "study_instance_uid": study.get("MainDicomTags", {}).get("StudyInstanceUID", ""),
+            "study": study,
+            "series": summaries,
+            "series_count": len(summaries),
+            "instances_count": len(instances),
+            "fetched_at": datetime.now(timezone.utc),
+        }
+        stmt = pg_insert(StudyMetadata).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudyMetadata.orthanc_study_id],
+            set_={k: stmt.excluded[k] for k in values if k != "orthanc_study_id"},
+        ).returning(StudyMetadata)
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        return result.scalar_one()
+
+    async def _add_file_hashes(self, instances: list[dict[str, Any]]) -> None:
+        sem = asyncio.Semaphore(_HASH_CONCURRENCY)
+
+        async def add(inst: dict[str, Any]) -> None:
+            async with sem:
+                try:
+                    inst["FileHash"] = await self.orthanc.get_instance_file_hash(inst["ID"])
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code != 404:
+                        raise
+                    # Deleted meanwhile; the preview key falls back to asking Orthanc
+
+        await asyncio.gather(*(add(i) for i in instances))
+
+    async def invalidate(self, orthanc_id: str) -> None:
+        await self.db.execute(delete(StudyMetadata).where(StudyMetadata.orthanc_study_id == orthanc_id))
+
+    async def delete_study(self, orthanc_id: str) -> None:
+        """Delete the study from Orthanc, drop its cached metadata and unlink it from ImagingStudy."""
+        await self.orthanc.delete_study(orthanc_id)
+        await self.invalidate(orthanc_id)
+        # Viewer/metadata lookups would otherwise go to Orthanc for a study that is gone
+        await self.db.execute(
+            update(ImagingStudy)
+            .where(ImagingStudy.orthanc_study_id == orthanc_id)
+            .values(orthanc_study_id=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _get(self, orthanc_id: str) -> StudyMetadata:
+        row = (
+            await self.db.execute(select(StudyMetadata).where(StudyMetadata.orthanc_study_id == orthanc_id))
+        ).scalar_one_or_none()
+        if row is None:
+            row = await self.refresh(orthanc_id)
+        return row
+
+
+async def warm_study_metadata(orthanc_ids: Iterable[str], session_factory=None) -> None:
+    """Populate the cache for newly arrived studies (runs outside the request path)."""
+    if session_factory is None:
+        from app.db.session import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+
+    sem = asyncio.Semaphore(_WARM_CONCURRENCY)
+
+    async def warm(orthanc_id: str) -> None:
+        async with sem:
+            try:
+                async with session_factory() as db:
+                    await StudyMetadataService(db).refresh(orthanc_id)
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"Could not cache metadata for study {orthanc_id}: {e}")
+
+    await asyncio.gather(*(warm(i) for i in dict.fromkeys(orthanc_ids)))
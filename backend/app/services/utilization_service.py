@@ -0,0 +1,205 @@
+"""
+Resource utilization heatmaps: booked vs available minutes per weekday and hour.
+
+All selected resources are rasterized together onto one minute grid with
+NumPy: each booking adds +1 at its start minute and -1 at its end minute of
+a flat ``(resources × days × 1440)`` difference array, a cumulative sum turns
+that into per-minute occupancy, which is capped at the resource's capacity,
+masked by its operating hours and summed per hour. Days are processed in
+chunks to bound memory.
+
+Closed days (older than ``utilization_cache_after_days``) are stored in
+``resource_utilization_daily`` the first time they are computed and read
+from there afterwards. Minutes are counted on the wall clock of
+SCHEDULE_TIMEZONE at ``date_from`` (days are taken as 24 h).
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Optional
+
+import numpy as np
+from sqlalchemy import extract, func, select
+from sqlalchemy.dialects.postgresql import TSTZRANGE
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.schedule import INACTIVE_APPOINTMENT_STATUSES, Appointment, Resource
+from app.models.utilization import ResourceUtilizationDay
+from app.services.availability_service import schedule_tz
+
+settings = get_settings()
+
+MINUTES_PER_DAY = 24 * 60
+_CHUNK_DAYS = 31
+
+
+def rasterize(
+    rows: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    capacity: np.ndarray,
+    open_from: np.ndarray,
+    open_to: np.ndarray,
+    n_days: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Booked and available minutes per resource, day and hour: two ``(R, n_days, 24)`` arrays.
+
+    ``rows`` is each booking's resource row, ``starts``/``ends`` its minute
+    offsets from the first day's midnight; ``capacity`` and the operating
+    hours ``open_from``/``open_to`` are per resource row.
+    """
+    n_resources = len(capacity)
+    span = n_days * MINUTES_PER_DAY
+    starts = np.clip(starts, 0, span).astype(np.int64)
+    ends = np.clip(ends, 0, span).astype(np.int64)
+    keep = ends > starts
+    base = rows[keep].astype(np.int64) * span
+
+    # One extra slot: a booking ending at the last minute of the last row
+    diff = np.zeros(n_resources * span + 1, dtype=np.int32)
+    np.add.at(diff, base + starts[keep], 1)
+    np.add.at(diff, base + ends[keep], -1)
+    occupancy = np.cumsum(diff[:-1], dtype=np.int32).reshape(n_resources, n_days, MINUTES_PER_DAY)
+
+    minute = np.arange(MINUTES_PER_DAY)
+    is_open = (minute >= open_from[:, None] * 60) & (minute < open_to[:, None] * 60)   # (R, 1440)
+    cap = capacity[:, None, None]
+    booked = np.minimum(occupancy, cap) * is_open[:, None, :]
+    available = np.broadcast_to(is_open[:, None, :] * cap, booked.shape)
+    return (
+        booked.reshape(n_resources, n_days, 24, 60).sum(axis=3),
+        available.reshape(n_resources, n_days, 24, 60).sum(axis=3),
+    )
+
+
+def weekday_heatmap(values: np.ndarray, days: list[date]) -> np.ndarray:
+    """Sum ``(R, n_days, 24)`` per weekday into ``(R, 7, 24)`` (0 = Monday)."""
+    one_hot = np.eye(7, dtype=values.dtype)[[d.weekday() for d in days]]
+    return np.einsum("dw,rdh->rwh", one_hot, values)
+
+
+class UtilizationService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def heatmap(
+        self,
+        date_from: date,
+        date_to: date,
+        resource_ids: Optional[list[int]] = None,
+        modality: Optional[str] = None,
+    ) -> dict[str, Any]:
+        tz = schedule_tz()
+        stmt = select(Resource)
+        if resource_ids:
+            stmt = stmt.where(Resource.id.in_(resource_ids))
+        if modality:
+            stmt = stmt.where(Resource.modality == modality)
+        resources = list((await self.db.execute(stmt.order_by(Resource.id))).scalars().all())
+        days = [date_from + timedelta(days=n) for n in range((date_to - date_from).days + 1)]
+        booked = np.zeros((len(resources), len(days), 24), dtype=np.int64)
+        available = np.zeros_like(booked)
+
+        if resources:
+            row_of = {r.id: i for i, r in enumerate(resources)}
+            day_of = {d: i for i, d in enumerate(days)}
+            closed_before = datetime.now(tz).date() - timedelta(days=settings.utilization_cache_after_days)
+
+            # Closed days already computed
+            done: set[tuple[int, date]] = set()
+            if days[0] < closed_before:
+                result = await self.db.execute(
+                    select(ResourceUtilizationDay).where(
+                        ResourceUtilizationDay.resource_id.in_(row_of),
+                        ResourceUtilizationDay.day.between(days[0], min(days[-1], closed_before - timedelta(days=1))),
+                    )
+                )
+                for cached in result.scalars():
+                    i, j = row_of[cached.resource_id], day_of[cached.day]
+                    booked[i, j], available[i, j] = cached.booked, cached.available
+                    done.add((cached.resource_id, cached.day))
+
+            missing = [d for d in days if any((r.id, d) not in done for r in resources)]
+            if missing:
+                first, last = day_of[missing[0]], day_of[missing[-1]]
+                b, a = await self._compute(resources, days[first], last - first + 1, tz)
+                fresh = [(i, j) for i, r in enumerate(resources) for j in range(first, last + 1)
+                         if (r.id, days[j]) not in done]
+                for i, j in fresh:
+                    booked[i, j], available[i, j] = b[i, j - first], a[i, j - first]
+                to_cache = [
+                    {"resource_id": resources[i].id, "day": days[j],
+                     "booked": booked[i, j].tolist(), "available": available[i, j].tolist()}
+                    for i, j in fresh if days[j] < closed_before
+                ]
+                if to_cache:
+                    # executemany: batched by SQLAlchemy, a year of many resources stays under
+                    # asyncpg's 32767 bind parameters per statement
+                    await self.db.execute(pg_insert(ResourceUtilizationDay).on_conflict_do_nothing(), to_cache)
+
+        booked_grid = weekday_heatmap(booked, days)
+        available_grid = weekday_heatmap(available, days)
+        return {
+            "date_from": date_from,
+            "date_to": date_to,
+            "timezone": settings.schedule_timezone,
+            "resources": [
+                {
+                    "resource_id": r.id,
+                    "resource_name": r.name,
+                    "modality": r.modality,
+                    "capacity": r.capacity,
+                    **_summary(booked_grid[i], available_grid[i]),
+                }
+                for i, r in enumerate(resources)
+            ],
+            "total": _summary(booked_grid.sum(axis=0), available_grid.sum(axis=0)),
+        }
+
+    async def _compute(
+        self, resources: list[Resource], first_day: date, n_days: int, tz
+    ) -> tuple[np.ndarray, np.ndarray]:
+        origin = datetime.combine(first_day, time(), tz)
+        end = origin + timedelta(days=n_days)
+        result = await self.db.execute(
+            select(
+                Appointment.resource_id,
+                extract("epoch", Appointment.start_datetime),
+                extract("epoch", Appointment.end_datetime),
+            ).where(
+                Appointment.resource_id.in_([r.id for r in resources]),
+                Appointment.during.op("&&")(func.tstzrange(origin, end, "[)", type_=TSTZRANGE)),
+                Appointment.status.notin_(INACTIVE_APPOINTMENT_STATUSES),
+            )
+        )
+        bookings = np.array(result.all(), dtype=np.float64).reshape(-1, 3)
+        ids = np.array([r.id for r in resources])
+        rows = np.searchsorted(ids, bookings[:, 0].astype(np.int64))
+        minutes = (bookings[:, 1:] - origin.timestamp()) // 60
+        capacity = np.array([max(r.capacity or 1, 1) for r in resources])
+        open_from = np.array([r.operating_start_hour for r in resources])
+        open_to = np.array([r.operating_end_hour for r in resources])
+
+        booked = np.empty((len(resources), n_days, 24), dtype=np.int64)
+        available = np.empty_like(booked)
+        for chunk in range(0, n_days, _CHUNK_DAYS):
+            size = min(_CHUNK_DAYS, n_days - chunk)
+            offset = chunk * MINUTES_PER_DAY
+            starts, ends = minutes[:, 0] - offset, minutes[:, 1] - offset
+            inside = (ends > 0) & (starts < size * MINUTES_PER_DAY)
+            b, a = rasterize(rows[inside], starts[inside], ends[inside], capacity, open_from, open_to, size)
+            booked[:, chunk:chunk + size], available[:, chunk:chunk + size] = b, a
+        return booked, available
+
+
+def _summary(booked: np.ndarray, available: np.ndarray) -> dict[str, Any]:
+    total_booked, total_available = int(booked.sum()), int(available.sum())
+    return {
+        "booked_minutes": total_booked,
+        "available_minutes": total_available,
+        "utilization": round(total_booked / total_available, 3) if total_available else 0.0,
+        "booked": booked.astype(int).tolist(),          # [weekday][hour], 0 = Monday
+        "available": available.astype(int).tolist(),
+    }
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.core.worklist_writer import mwl_kwargs, writer
+from app.models.worklist import DicomWorklistEntry, WorklistStatus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Leftover temp files of interrupted atomic writes older than this are removed
+_TEMP_GRACE_SECONDS = 3600
+
+
+@dataclass
+class DriftReport:
+    active_entries: int = 0
+    files: int = 0
+    missing: int = 0          # active entry without .wl file
+    orphaned: int = 0         # .wl file without active entry
+    expired: int = 0          # active entries past worklist_expiry_days (cancelled)
+    temp_removed: int = 0
+    rebuilt: int = 0
+    deleted: int = 0
+    failed: int = 0
+    dry_run: bool = False
+    duration_ms: float = 0.0
+
+    @property
+    def drift(self) -> int:
+        return self.missing + self.orphaned + self.expired
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "drift": self.drift}
+
+
+class WorklistReconcileService:
+    """Brings ``worklist_dir`` back in line with ``dicom_worklist_entries``.
+
+    One query loads the active entries and one ``os.scandir`` pass lists the
+    directory; the diff then rebuilds missing files, deletes ``.wl`` files with
+    no active entry (completed, cancelled or unknown accession numbers) and
+    cancels active entries scheduled more than ``worklist_expiry_days`` ago.
+    File operations go through the worklist writer's thread pool. With
+    ``worklist_files_enabled`` off, every ``.wl`` file counts as orphaned.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def reconcile(self, dry_run: bool = False) -> DriftReport:
+        start = time.perf_counter()
+        report = DriftReport(dry_run=dry_run)
+        now = datetime.now(timezone.utc)
+        expiry_cutoff = now - timedelta(days=settings.worklist_expiry_days)
+
+        active: dict[str, DicomWorklistEntry] = {}
+        expired: list[DicomWorklistEntry] = []
+        snapshot_at = time.time()
+        if settings.worklist_files_enabled:
+            result = await self.db.execute(
+                select(DicomWorklistEntry, DicomWorklistEntry.scheduled_datetime < expiry_cutoff)
+                .where(DicomWorklistEntry.status == WorklistStatus.active)
+            )
+            for entry, is_expired in result.all():
+                if is_expired:
+                    expired.append(entry)
+                else:
+                    active[entry.accession_number] = entry
+
+        files, temp_files = await asyncio.to_thread(_scan, settings.worklist_dir, snapshot_at)
+        report.active_entries = len(active)
+        report.files = len(files)
+        report.expired = len(expired)
+
+        missing = [e for a, e in active.items() if a not in files or files[a][0] == 0]  # absent or truncated
+        # Files written after the snapshot may belong to entries committed since; leave them to the next run
+        orphaned = [a for a, (_, mtime) in files.items() if a not in active and mtime < snapshot_at]
+        report.missing, report.orphaned = len(missing), len(orphaned)
+
+        if not dry_run:
+            if expired:
+                await self.db.execute(
+                    update(DicomWorklistEntry)
+                    .where(DicomWorklistEntry.id.in_([e.id for e in expired]))
+                    .values(status=WorklistStatus.cancelled)
+                )
+                await self.db.commit()
+            # Separate batches so failures are charged to the right counter
+            write_failed, delete_failed = await asyncio.gather(
+                writer.flush({e.accession_number: mwl_kwargs(e) for e in missing}),
+                writer.flush({}, orphaned),
+            )
+            report.rebuilt = len(missing) - write_failed
+            report.deleted = len(orphaned) - delete_failed
+            report.failed = write_failed + delete_failed
+            report.temp_removed = await asyncio.to_thread(_remove, temp_files)
+
+        report.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        log = logger.warning if report.drift else logger.info
+        log(
+            f"Worklist reconcile{' (dry run)' if dry_run else ''}: {report.active_entries} active, "
+            f"{report.files} files, {report.missing} missing, {report.orphaned} orphaned, "
+            f"{report.expired} expired, {report.failed} failed in {report.duration_ms} ms"
+        )
+        return report
+
+
+def _scan(directory: str, now: float) -> tuple[dict[str, tuple[int, float]], list[str]]:
+    """``{accession: (size, mtime)}`` of ``.wl`` files and paths of stale temp files, in one pass."""
+    files: dict[str, tuple[int, float]] = {}
+    temp_files: list[str] = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                name = entry.name
+                if name.endswith(".wl") and not name.startswith("."):
+                    st = entry.stat()
+                    files[name[:-3]] = (st.st_size, st.st_mtime)
+                elif name.endswith(".tmp") and now - entry.stat().st_mtime > _TEMP_GRACE_SECONDS:
+                    temp_files.append(entry.path)
+    except FileNotFoundError:
+        pass
+    return files, temp_files
+
+
+def _remove(paths: list[str]) -> int:
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -7,11 +7,15 @@ from typing import List, Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dicom_utils import build_mwl_dataset, delete_worklist_file, write_worklist_file
+from app.config import get_settings
+from app.core.dicom_utils import worklist_file_path, write_worklist_bytes
+from app.core.mwl_encoder import encode_mwl
+from app.core.worklist_writer import delete_after_commit, mwl_kwargs, write_after_commit
 from app.models.order import ImagingOrder
 from app.models.patient import Patient
 from app.models.worklist import DicomWorklistEntry, WorklistStatus
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
@@ -19,60 +23,47 @@ class WorklistService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def create_worklist_entry(
-        self, order: ImagingOrder, patient: Patient,
+    @staticmethod
+    def entry_values(
+        order: ImagingOrder, patient: Patient,
         ae_title: Optional[str] = None, station_name: Optional[str] = None,
-    ) -> DicomWorklistEntry:
-        dob_str = patient.date_of_birth.strftime("%Y%m%d") if patient.date_of_birth else None
-        sex_str = patient.gender.value if patient.gender else None
-
-        # DICOM name format: LAST^FIRST
-        patient_name_dicom = f"{patient.last_name.upper()}^{patient.first_name.upper()}"
-
-        # Use DNI (cédula) as DICOM patient ID when available, fallback to MRN
-        patient_id_for_dicom = patient.dni or patient.mrn
-
-        scheduled_dt = order.scheduled_at or datetime.now(timezone.utc)
-
-        entry = DicomWorklistEntry(
+    ) -> dict:
+        """Column values of the MWL entry for an order (shared by single and bulk inserts)."""
+        return dict(
             order_id=order.id,
             accession_number=order.accession_number,
-            patient_id_dicom=patient_id_for_dicom,
-            patient_name_dicom=patient_name_dicom,
-            patient_dob=dob_str,
-            patient_sex=sex_str,
+            # Use DNI (cédula) as DICOM patient ID when available, fallback to MRN
+            patient_id_dicom=patient.dni or patient.mrn,
+            # DICOM name format: LAST^FIRST
+            patient_name_dicom=f"{patient.last_name.upper()}^{patient.first_name.upper()}",
+            patient_dob=patient.date_of_birth.strftime("%Y%m%d") if patient.date_of_birth else None,
+            patient_sex=patient.gender.value if patient.gender else None,
             modality=order.modality.value,
-            scheduled_datetime=scheduled_dt,
+            scheduled_datetime=order.scheduled_at or datetime.now(timezone.utc),
             procedure_description=order.procedure_description,
             procedure_code=order.procedure_code,
             requested_procedure_id=order.accession_number,
             scheduled_station_ae_title=ae_title,
             scheduled_station_name=station_name,
             status=WorklistStatus.active,
+            # Deterministic, so it is known before the file is written (after commit)
+            wl_file_path=str(worklist_file_path(order.accession_number)) if settings.worklist_files_enabled else None,
         )
-        self.db.add(entry)
-        await self.db.flush()
 
-        # Write DICOM .wl file
-        try:
-            ds = build_mwl_dataset(
-                accession_number=order.accession_number,
-                patient_id=patient_id_for_dicom,
-                patient_name=patient_name_dicom,
-                patient_dob=dob_str,
-                patient_sex=sex_str,
-                modality=order.modality.value,
-                scheduled_datetime=scheduled_dt,
-                procedure_description=order.procedure_description,
-                procedure_code=order.procedure_code,
-            )
-            filepath = write_worklist_file(ds, order.accession_number)
-            entry.wl_file_path = filepath
-            await self.db.flush()
-            logger.info(f"Worklist file written: {filepath}")
-        except Exception as e:
-            logger.error(f"Failed to write worklist file for {order.accession_number}: {e}")
+    @staticmethod
+    def write_entry_file(entry: DicomWorklistEntry) -> str:
+        """Write the DICOM .wl file for an entry and return its path (blocking I/O)."""
+        return write_worklist_bytes(encode_mwl(**mwl_kwargs(entry)), entry.accession_number)
 
+    async def create_worklist_entry(
+        self, order: ImagingOrder, patient: Patient,
+        ae_title: Optional[str] = None, station_name: Optional[str] = None,
+    ) -> DicomWorklistEntry:
+        entry = DicomWorklistEntry(**self.entry_values(order, patient, ae_title, station_name))
+        self.db.add(entry)
+        await self.db.flush()
+        # The DICOM .wl file is written off the event loop once the transaction commits
+        write_after_commit(self.db, [entry])
         return entry
 
     async def complete_worklist_entry(self, accession_number: str) -> None:
@@ -84,7 +75,7 @@ class WorklistService:
             entry.status = WorklistStatus.completed
             await self.db.flush()
             # Remove .wl file
-            delete_worklist_file(accession_number)
+            delete_after_commit(self.db, [accession_number])
 
     async def get_active_worklist(self, modality: Optional[str] = None) -> List[DicomWorklistEntry]:
         stmt = select(DicomWorklistEntry).where(DicomWorklistEntry.status == WorklistStatus.active)
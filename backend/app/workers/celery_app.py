@@ -15,6 +15,9 @@ celery_app = Celery(
         "app.workers.hl7_tasks",
         "app.workers.dicom_tasks",
         "app.workers.report_tasks",
+        "app.workers.fhir_tasks",
+        "app.workers.reminder_tasks",
+        "app.workers.notification_tasks",
     ],
 )
 
@@ -27,6 +30,11 @@ celery_app.conf.update(
     task_track_started=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,
+    # Packets render in a ReportLab process pool, which prefork children (daemonic) cannot start;
+    # the report_packets queue is consumed by a --pool=solo worker
+    task_routes={
+        "app.workers.report_tasks.build_report_packet": {"queue": "report_packets"},
+    },
     beat_schedule={
         "retry-failed-hl7": {
             "task": "app.workers.hl7_tasks.retry_failed_messages",
@@ -36,5 +44,25 @@ celery_app.conf.update(
             "task": "app.workers.dicom_tasks.cleanup_expired_worklist_entries",
             "schedule": crontab(hour=2, minute=0),
         },
+        "reconcile-worklist-directory": {
+            "task": "app.workers.dicom_tasks.reconcile_worklist_directory",
+            "schedule": crontab(minute="*/15"),
+        },
+        "cleanup-expired-fhir-exports": {
+            "task": "app.workers.fhir_tasks.cleanup_expired_exports",
+            "schedule": crontab(minute=30),
+        },
+        "send-appointment-reminders": {
+            "task": "app.workers.reminder_tasks.send_appointment_reminders",
+            "schedule": crontab(minute="*/10"),
+        },
+        "archive-read-notifications": {
+            "task": "app.workers.notification_tasks.archive_read_notifications",
+            "schedule": crontab(hour=3, minute=0),
+        },
+        "cleanup-expired-report-packets": {
+            "task": "app.workers.report_tasks.cleanup_expired_packets",
+            "schedule": crontab(minute=45),
+        },
     },
 )
@@ -100,3 +100,26 @@ def cleanup_expired_worklist_entries():
             logger.info(f"Cleaned up {len(entries)} expired worklist entries")
 
     asyncio.run(_run())
+
+
+@celery_app.task(name="app.workers.dicom_tasks.reconcile_worklist_directory")
+def reconcile_worklist_directory():
+    """Diff worklist_dir against dicom_worklist_entries and repair the drift."""
+    import app.db.base  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.config import get_settings
+    from app.services.worklist_reconcile_service import WorklistReconcileService
+
+    settings = get_settings()
+
+    async def _run():
+        engine = create_async_engine(settings.database_url)
+        SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with SessionLocal() as db:
+                report = await WorklistReconcileService(db).reconcile()
+            return report.as_dict()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(_run())
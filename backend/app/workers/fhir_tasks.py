@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import logging
+
+from app.workers.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.workers.fhir_tasks.run_bulk_export")
+def run_bulk_export(job_id: str):
+    """Run a FHIR Bulk Data $export job, writing gzip'd NDJSON per resource type."""
+    import asyncio
+    import app.db.base  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.config import get_settings
+    from app.services.fhir_export_service import FHIRExportService
+
+    settings = get_settings()
+
+    async def _run():
+        engine = create_async_engine(settings.database_url)
+        SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with SessionLocal() as db:
+                await FHIRExportService(db).run(job_id)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(_run())
+
+
+@celery_app.task(name="app.workers.fhir_tasks.cleanup_expired_exports")
+def cleanup_expired_exports():
+    """Remove $export jobs and their files once the retention window has passed."""
+    import asyncio
+    import app.db.base  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.config import get_settings
+    from app.services.fhir_export_service import FHIRExportService
+
+    settings = get_settings()
+
+    async def _run():
+        engine = create_async_engine(settings.database_url)
+        SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with SessionLocal() as db:
+                purged = await FHIRExportService(db).purge_expired()
+                await db.commit()
+                logger.info(f"Purged {purged} expired FHIR export jobs")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(_run())
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import logging
+
+from app.workers.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.workers.notification_tasks.archive_read_notifications")
+def archive_read_notifications():
+    """Move read notifications older than NOTIFICATION_RETENTION_DAYS to the archive, in batches."""
+    import asyncio
+    from datetime import datetime, timedelta, timezone
+    import app.db.base  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.config import get_settings
+    from app.services.notification_service import NotificationService
+
+    settings = get_settings()
+
+    async def _run():
+        engine = create_async_engine(settings.database_url)
+        SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.notification_retention_days)
+        total = 0
+        try:
+            while True:
+                # One short transaction per batch
+                async with SessionLocal() as db:
+                    moved = await NotificationService(db).archive_read(cutoff, settings.notification_archive_batch_size)
+                    await db.commit()
+                total += moved
+                if moved < settings.notification_archive_batch_size:
+                    break
+            logger.info(f"Archived {total} read notifications older than {cutoff:%Y-%m-%d}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(_run())
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import logging
+
+from app.workers.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.workers.reminder_tasks.send_appointment_reminders")
+def send_appointment_reminders():
+    """Send reminders for appointments starting within REMINDER_LEAD_HOURS."""
+    import asyncio
+    import app.db.base  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.config import get_settings
+    from app.services.reminder_service import ReminderService, build_channels
+
+    settings = get_settings()
+    if not settings.reminders_enabled or not settings.reminder_channels.strip():
+        return
+
+    async def _run():
+        engine = create_async_engine(settings.database_url)
+        SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        channels = build_channels()
+        try:
+            async with SessionLocal() as db:
+                stats = await ReminderService(db, channels).run()
+                logger.info(f"Appointment reminders: {stats}")
+        finally:
+            for channel in channels:
+                await channel.aclose()
+            await engine.dispose()
+
+    asyncio.run(_run())
@@ -9,38 +9,89 @@ logger = logging.getLogger(__name__)
 
 @celery_app.task(name="app.workers.report_tasks.generate_report_pdf")
 def generate_report_pdf(report_id: int):
-    """Generate PDF for a signed report and store the path."""
+    """Render a report's PDF into the PDF cache (signed reports: stored and recorded in pdf_path)."""
     import asyncio
     import app.db.base  # noqa: F401
-    import os
     from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-    from sqlalchemy import select
     from app.config import get_settings
-    from app.models.report import RadiologyReport
+    from app.services.report_pdf_service import ReportPDFService
 
     settings = get_settings()
 
     async def _run():
         engine = create_async_engine(settings.database_url)
         SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
-        async with SessionLocal() as db:
-            from app.services.report_service import ReportService
-            svc = ReportService(db)
-            try:
-                pdf_bytes = await svc.generate_pdf(report_id)
-                pdf_dir = "/tmp/reports"
-                os.makedirs(pdf_dir, exist_ok=True)
-                pdf_path = f"{pdf_dir}/report_{report_id}.pdf"
-                with open(pdf_path, "wb") as f:
-                    f.write(pdf_bytes)
-
-                result = await db.execute(select(RadiologyReport).where(RadiologyReport.id == report_id))
-                report = result.scalar_one_or_none()
-                if report:
-                    report.pdf_path = pdf_path
-                    await db.commit()
-                logger.info(f"PDF generated for report {report_id}: {pdf_path}")
-            except Exception as e:
-                logger.error(f"Failed to generate PDF for report {report_id}: {e}")
+        try:
+            async with SessionLocal() as db:
+                path, _ = await ReportPDFService(db).pdf_file(report_id)
+                await db.commit()
+                logger.info(f"PDF generated for report {report_id}: {path}")
+        except Exception as e:
+            logger.error(f"Failed to generate PDF for report {report_id}: {e}")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(_run())
+
+
+@celery_app.task(name="app.workers.report_tasks.build_report_packet")
+def build_report_packet(job_id: str):
+    """Build a report packet (merged PDF or ZIP of the matching signed reports).
+
+    Routed to the ``report_packets`` queue, whose worker runs ``--pool=solo`` so
+    it can start the ReportLab process pool; a prefork child renders one by one.
+    """
+    import asyncio
+    import multiprocessing
+    import app.db.base  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.config import get_settings
+    from app.services.report_packet_service import ReportPacketService
+    from app.services.report_pdf_service import shutdown_pool
+
+    settings = get_settings()
+
+    async def _run():
+        engine = create_async_engine(settings.database_url)
+        SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with SessionLocal() as db:
+                await ReportPacketService(db).run(job_id)
+        finally:
+            await engine.dispose()
+
+    if multiprocessing.current_process().daemon:
+        logger.warning(
+            f"Report packet {job_id} built in a daemonic worker: reports render one at a time. "
+            f"Consume the report_packets queue with a --pool=solo worker"
+        )
+    try:
+        asyncio.run(_run())
+    finally:
+        # Render processes are not kept around between packets
+        shutdown_pool()
+
+
+@celery_app.task(name="app.workers.report_tasks.cleanup_expired_packets")
+def cleanup_expired_packets():
+    """Remove report packets and their files once the retention window has passed."""
+    import asyncio
+    import app.db.base  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from app.config import get_settings
+    from app.services.report_packet_service import ReportPacketService
+
+    settings = get_settings()
+
+    async def _run():
+        engine = create_async_engine(settings.database_url)
+        SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with SessionLocal() as db:
+                purged = await ReportPacketService(db).purge_expired()
+                await db.commit()
+                logger.info(f"Purged {purged} expired report packets")
+        finally:
+            await engine.dispose()
 
     asyncio.run(_run())
@@ -0,0 +1,77 @@
+"""Benchmark FHIR serialization: jsonable_encoder + json.dumps vs the orjson path.
+
+Runs offline (no server/DB needed):  python bench_fhir_serialization.py [N]
+"""
+import json
+import sys
+import time
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.responses import dumps, dumps_line
+from app.models.order import OrderPriority, OrderStatus
+from app.models.patient import Gender
+from app.models.report import ReportStatus
+from app.models.study import StudyStatus
+from app.services.fhir_service import FHIRService
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+ROUNDS = 5
+now = datetime.now(timezone.utc)
+fhir = FHIRService()
+
+patients, orders, studies, reports = [], [], [], []
+for i in range(1, N + 1):
+    p = SimpleNamespace(
+        id=i, mrn=f"MRN{i:06d}", dni=f"{i:08d}", first_name="Juan", last_name=f"Pérez {i}",
+        date_of_birth=date(1980, 1, 1), gender=Gender.male, is_active=True,
+        contacts=[SimpleNamespace(contact_type="phone", value="+51 999 999 999", label="mobile")],
+    )
+    o = SimpleNamespace(
+        id=i, patient_id=i, status=OrderStatus.scheduled, priority=OrderPriority.routine,
+        procedure_description="TC de tórax con contraste", accession_number=f"ACC{i:08d}",
+        requested_at=now,
+    )
+    s = SimpleNamespace(
+        id=i, study_instance_uid=f"1.2.826.0.1.3680043.2.{i}", status=StudyStatus.available,
+        series_count=3, instances_count=240, study_date=now, modality="CT",
+    )
+    r = SimpleNamespace(
+        id=i, status=ReportStatus.final, updated_at=now, signed_by="Dr. Radiólogo",
+        findings="Sin hallazgos patológicos. " * 10, impression="Estudio normal.",
+    )
+    patients.append(p)
+    orders.append(o)
+    studies.append(s)
+    reports.append(r)
+
+
+def resources():
+    out = []
+    for p, o, s, r in zip(patients, orders, studies, reports):
+        out.append(fhir.patient_to_fhir(p))
+        out.append(fhir.order_to_fhir(o, p))
+        out.append(fhir.study_to_fhir(s, o, p))
+        out.append(fhir.report_to_fhir(r, s, p))
+    return out
+
+
+def bench(label, fn):
+    best = float("inf")
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    per_k = best / (4 * N) * 1000 * 1000
+    print(f"  {label:<42} {best * 1000:8.1f} ms   {per_k:7.2f} ms / 1000 resources")
+
+
+print(f"\n{4 * N} FHIR resources ({N} x Patient/ServiceRequest/ImagingStudy/DiagnosticReport), best of {ROUNDS}")
+built = resources()
+bench("map only", resources)
+bench("json.dumps(jsonable_encoder(bundle))", lambda: json.dumps(jsonable_encoder({"entry": built})).encode())
+bench("orjson bundle (FHIRResponse)", lambda: dumps({"entry": built}))
+bench("json.dumps per line (NDJSON)", lambda: [json.dumps(x).encode() + b"\n" for x in built])
+bench("orjson per line (NDJSON export)", lambda: [dumps_line(x) for x in built])
@@ -0,0 +1,97 @@
+"""Benchmark MWL .wl encoding: build_mwl_dataset + pydicom.dcmwrite vs app.core.mwl_encoder.
+
+Runs offline (no server/DB needed):  python bench_mwl_encoder.py [N]
+Checks that both paths produce identical bytes for the same UIDs, then times
+encoding alone and encoding + atomic write of N files into a temp directory.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import pydicom
+from pydicom.dataset import FileMetaDataset
+from pydicom.uid import generate_uid
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+ROUNDS = 3
+
+workdir = tempfile.mkdtemp(prefix="bench_mwl_")
+os.environ["WORKLIST_DIR"] = workdir
+
+from app.core.dicom_utils import build_mwl_dataset, write_worklist_bytes, write_worklist_file  # noqa: E402
+from app.core.mwl_encoder import MWL_SOP_CLASS_UID, encode_mwl  # noqa: E402
+
+now = datetime.now(timezone.utc)
+modalities = ["CT", "MR", "CR", "US", "MG"]
+entries = [
+    dict(
+        accession_number=f"ACC{i:08d}",
+        patient_id=f"{i:08d}",
+        patient_name=f"PÉREZ GARCÍA^JOSÉ {i}",
+        patient_dob="19800101" if i % 3 else None,
+        patient_sex="MFO"[i % 3],
+        modality=modalities[i % len(modalities)],
+        scheduled_datetime=now + timedelta(minutes=15 * i),
+        procedure_description="TC de tórax con contraste",
+        scheduled_station_ae=f"{modalities[i % len(modalities)]}_ROOM{i % 4}" if i % 2 else None,
+        scheduled_station_name="Sala 1" if i % 4 == 1 else None,
+        procedure_code=f"P{i % 50:03d}" if i % 5 else None,
+    )
+    for i in range(N)
+]
+
+
+def legacy_bytes(kwargs, sop_uid=None, study_uid=None) -> bytes:
+    """What write_worklist_file puts on disk (minus the rename)."""
+    ds = build_mwl_dataset(**kwargs)
+    if study_uid:
+        ds.StudyInstanceUID = study_uid
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = MWL_SOP_CLASS_UID
+    file_meta.MediaStorageSOPInstanceUID = sop_uid or generate_uid()
+    file_meta.TransferSyntaxUID = pydicom.uid.ExplicitVRLittleEndian
+    file_ds = pydicom.Dataset()
+    file_ds.file_meta = file_meta
+    file_ds.is_implicit_VR = False
+    file_ds.is_little_endian = True
+    file_ds.SOPClassUID = MWL_SOP_CLASS_UID
+    file_ds.SOPInstanceUID = file_meta.MediaStorageSOPInstanceUID
+    for elem in ds:
+        file_ds.add(elem)
+    buf = io.BytesIO()
+    pydicom.dcmwrite(buf, file_ds, write_like_original=False)
+    return buf.getvalue()
+
+
+# Same UIDs → the fast encoder must be byte-identical to the pydicom path
+mismatches = 0
+for kwargs in entries[:500]:
+    sop, study = generate_uid(), generate_uid()
+    if legacy_bytes(kwargs, sop, study) != encode_mwl(**kwargs, sop_instance_uid=sop, study_instance_uid=study):
+        mismatches += 1
+print(f"\nbyte-identical output on 500 entries: {'yes' if not mismatches else f'NO ({mismatches} differ)'}")
+
+
+def bench(label, fn):
+    best = float("inf")
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"  {label:<46} {best * 1000:9.1f} ms   {best / N * 1e6:7.1f} µs / entry")
+
+
+print(f"{N} MWL entries, best of {ROUNDS}")
+bench("encode: build_mwl_dataset + dcmwrite", lambda: [legacy_bytes(e) for e in entries])
+bench("encode: mwl_encoder.encode_mwl", lambda: [encode_mwl(**e) for e in entries])
+bench("write: write_worklist_file (pydicom)",
+      lambda: [write_worklist_file(build_mwl_dataset(**e), e["accession_number"]) for e in entries])
+bench("write: encode_mwl + write_worklist_bytes",
+      lambda: [write_worklist_bytes(encode_mwl(**e), e["accession_number"]) for e in entries])
+
+for name in os.listdir(workdir):
+    os.remove(os.path.join(workdir, name))
+os.rmdir(workdir)
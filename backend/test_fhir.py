@@ -13,6 +13,10 @@ paths = [
     "/fhir/r4/ServiceRequest/1",
     "/fhir/r4/ImagingStudy/1",
     "/fhir/r4/DiagnosticReport/2",
+    "/fhir/r4/Patient?_count=5&_revinclude=ServiceRequest:patient",
+    "/fhir/r4/ServiceRequest?status=active&_include=ServiceRequest:patient",
+    "/fhir/r4/ImagingStudy?modality=CT&_include=ImagingStudy:basedon",
+    "/fhir/r4/DiagnosticReport?status=final&_count=10",
 ]
 
 for path in paths:
@@ -25,5 +29,43 @@ for path in paths:
         print(f"  status:       {data.get('status')}")
         if data.get("resourceType") == "Bundle":
             print(f"  total:        {data.get('total')}")
+            print(f"  entries:      {len(data.get('entry', []))}")
+            print(f"  next:         {any(link['relation'] == 'next' for link in data.get('link', []))}")
     else:
         print(f"  ERROR: {r.text[:300]}")
+
+# ── batch Bundle: new patient (conditional) + orders resolved by urn/id/MRN ──
+dcm = "http://dicom.nema.org/resources/ontology/DCM"
+def service_request(ref, modality):
+    return {
+        "resource": {
+            "resourceType": "ServiceRequest", "status": "active", "intent": "order",
+            "subject": {"reference": ref},
+            "category": [{"coding": [{"system": dcm, "code": modality}]}],
+            "code": {"text": f"Estudio {modality} (FHIR bundle test)"},
+        },
+        "request": {"method": "POST", "url": "ServiceRequest"},
+    }
+
+bundle = {
+    "resourceType": "Bundle", "type": "batch",
+    "entry": [
+        {
+            "fullUrl": "urn:uuid:11111111-1111-1111-1111-111111111111",
+            "resource": {
+                "resourceType": "Patient",
+                "name": [{"family": "Bundle", "given": ["Test"]}],
+                "identifier": [{"system": "urn:oid:dni", "value": "FHIRBUNDLE01"}],
+                "gender": "female",
+            },
+            "request": {"method": "POST", "url": "Patient", "ifNoneExist": "identifier=urn:oid:dni|FHIRBUNDLE01"},
+        },
+        service_request("urn:uuid:11111111-1111-1111-1111-111111111111", "CT"),
+        service_request("Patient/1", "MR"),
+        service_request("Patient/999999", "US"),
+    ],
+}
+r = httpx.post(f"{BASE}/fhir/r4", json=bundle, headers=h)
+print(f"\nPOST /fhir/r4 (batch) -> {r.status_code}")
+for e in r.json().get("entry", []):
+    print(f"  {e['response']['status']:<16} {e['response'].get('location', '')}")
@@ -0,0 +1,84 @@
+"""Test FHIR rest-hook Subscriptions against a local HTTP receiver.
+
+The receiver must be reachable from the API container; override RECEIVER_HOST
+when the API does not run in docker (e.g. RECEIVER_HOST=localhost).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+BASE = "http://localhost:8000"
+RECEIVER_HOST = os.environ.get("RECEIVER_HOST", "host.docker.internal")
+RECEIVER_PORT = int(os.environ.get("RECEIVER_PORT", "8765"))
+
+received = []
+
+
+class Receiver(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        received.append((self.path, self.headers.get("X-Test"), json.loads(body) if body else None))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("0.0.0.0", RECEIVER_PORT), Receiver)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+print(f"[1] Receiver listening on :{RECEIVER_PORT}")
+
+r = httpx.post(f"{BASE}/api/v1/auth/login", json={"username": "admin", "password": "Admin123!"})
+h = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+subscription = {
+    "resourceType": "Subscription",
+    "status": "requested",
+    "reason": "test_fhir_subscriptions.py",
+    "criteria": "ImagingStudy?status=available",
+    "channel": {
+        "type": "rest-hook",
+        "endpoint": f"http://{RECEIVER_HOST}:{RECEIVER_PORT}/notify",
+        "payload": "application/fhir+json",
+        "header": ["X-Test: subscription"],
+    },
+}
+r = httpx.post(f"{BASE}/fhir/r4/Subscription", json=subscription, headers=h)
+print(f"[2] POST /fhir/r4/Subscription -> {r.status_code} {r.headers.get('Location')}")
+sub = r.json()
+print(f"    status: {sub.get('status')}")
+
+# Simulate study arrivals through the Orthanc webhook (embedded tags, no PACS needed)
+for i in range(3):
+    payload = {
+        "ChangeType": "StableStudy",
+        "ResourceType": "Study",
+        "ID": f"test-sub-{uuid.uuid4().hex[:8]}",
+        "source": "test_fhir_subscriptions",
+        "MainDicomTags": {
+            "StudyInstanceUID": f"1.2.826.0.1.3680043.8.498.{uuid.uuid4().int % 10**12}",
+            "Modality": "CT",
+            "StudyDescription": f"Subscription test {i}",
+        },
+    }
+    r = httpx.post(f"{BASE}/api/v1/orthanc/webhook", json=payload)
+    print(f"[3] webhook {i} -> {r.status_code} {r.json()}")
+
+deadline = time.time() + 10
+while time.time() < deadline and sum(len(b["entry"]) for _, _, b in received if b) < 3:
+    time.sleep(0.2)
+
+print(f"[4] Notifications received: {len(received)}")
+for path, header, bundle in received:
+    ids = [e["resource"]["id"] for e in bundle["entry"]] if bundle else []
+    print(f"    {path} X-Test={header} type={bundle and bundle['type']} ImagingStudy ids={ids}")
+
+r = httpx.delete(f"{BASE}/fhir/r4/Subscription/{sub['id']}", headers=h)
+print(f"[5] DELETE Subscription/{sub['id']} -> {r.status_code}")
+server.shutdown()
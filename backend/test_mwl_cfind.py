@@ -0,0 +1,90 @@
+"""C-FIND load test for the built-in MWL SCP (MWL_SCP_ENABLED=true).
+
+Opens CONCURRENCY associations in parallel, each sending QUERIES Modality
+Worklist C-FINDs, and reports match counts, latency percentiles and
+throughput. Usage:
+
+    MWL_HOST=localhost MWL_PORT=11112 MODALITY=CT python test_mwl_cfind.py
+"""
+import os
+import statistics
+import threading
+import time
+from datetime import date
+
+from pydicom.dataset import Dataset
+from pynetdicom import AE
+from pynetdicom.sop_class import ModalityWorklistInformationFind
+
+HOST = os.environ.get("MWL_HOST", "localhost")
+PORT = int(os.environ.get("MWL_PORT", "11112"))
+CALLED_AE = os.environ.get("MWL_AE_TITLE", "HIS_RIS_MWL")
+MODALITY = os.environ.get("MODALITY", "")
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "10"))
+QUERIES = int(os.environ.get("QUERIES", "50"))
+
+
+def build_query() -> Dataset:
+    ds = Dataset()
+    ds.PatientName = ""
+    ds.PatientID = ""
+    ds.AccessionNumber = ""
+    ds.StudyInstanceUID = ""
+    sps = Dataset()
+    sps.Modality = MODALITY
+    sps.ScheduledStationAETitle = ""
+    sps.ScheduledProcedureStepStartDate = os.environ.get("SCHEDULED_DATE", date.today().strftime("%Y%m%d"))
+    sps.ScheduledProcedureStepStartTime = ""
+    sps.ScheduledProcedureStepDescription = ""
+    ds.ScheduledProcedureStepSequence = [sps]
+    return ds
+
+
+latencies: list[float] = []
+matches: list[int] = []
+failures: list[str] = []
+lock = threading.Lock()
+
+
+def worker(n: int) -> None:
+    ae = AE(ae_title=f"LOADSCU{n:02d}")
+    ae.add_requested_context(ModalityWorklistInformationFind)
+    assoc = ae.associate(HOST, PORT, ae_title=CALLED_AE)
+    if not assoc.is_established:
+        with lock:
+            failures.append(f"worker {n}: association rejected/aborted")
+        return
+    query = build_query()
+    for _ in range(QUERIES):
+        start = time.perf_counter()
+        count, ok = 0, True
+        for status, identifier in assoc.send_c_find(query, ModalityWorklistInformationFind):
+            if not status or status.Status not in (0xFF00, 0xFF01, 0x0000):
+                ok = False
+            elif identifier is not None:
+                count += 1
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+            matches.append(count)
+            if not ok:
+                failures.append(f"worker {n}: C-FIND failed")
+    assoc.release()
+
+
+print(f"[1] {CONCURRENCY} associations x {QUERIES} C-FIND -> {CALLED_AE}@{HOST}:{PORT} (modality={MODALITY or '*'})")
+start = time.perf_counter()
+threads = [threading.Thread(target=worker, args=(i,)) for i in range(CONCURRENCY)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+elapsed = time.perf_counter() - start
+
+if latencies:
+    q = statistics.quantiles(latencies, n=100)
+    print(f"[2] {len(latencies)} queries in {elapsed:.2f}s -> {len(latencies) / elapsed:.1f} queries/s")
+    print(f"    matches per query: {min(matches)}..{max(matches)}")
+    print(f"    latency ms: p50={q[49]:.1f} p95={q[94]:.1f} p99={q[98]:.1f} max={max(latencies):.1f}")
+print(f"[3] failures: {len(failures)}")
+for f in failures[:10]:
+    print(f"    {f}")
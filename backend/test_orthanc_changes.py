@@ -0,0 +1,167 @@
+"""Drive OrthancSyncService against a local Orthanc stand-in.
+
+The stand-in is a small HTTP server that serves a canned ``/changes`` feed plus
+``/studies/{id}`` and ``/studies/{id}/statistics``; nothing else is needed but
+DATABASE_URL. The ``changes`` cursor is moved to 0 for the run and restored
+afterwards. Checks:
+
+* repeated StableStudy events of a study are fetched once per page (counted on
+  ``/statistics``, which only the poller requests; the metadata and preview
+  warmers run after the commit and read ``/studies/{id}`` as well);
+* events of other types and studies deleted meanwhile (404) are skipped;
+* the cursor follows the feed page by page;
+* a study seen again is updated in place, not inserted twice.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STANDIN_PORT = int(os.environ.get("STANDIN_PORT", "8766"))
+os.environ["ORTHANC_URL"] = f"http://127.0.0.1:{STANDIN_PORT}"
+os.environ["ORTHANC_CHANGES_BATCH_LIMIT"] = "7"
+
+import app.db.base  # noqa: E402,F401
+from app.db.session import AsyncSessionLocal  # noqa: E402
+from app.models.orthanc_sync import OrthancSyncState  # noqa: E402
+from app.models.study import ImagingStudy  # noqa: E402
+from app.services.orthanc_sync_service import FEED, OrthancSyncService  # noqa: E402
+from sqlalchemy import delete, select  # noqa: E402
+
+run = uuid.uuid4().hex[:8]
+uid_root = f"1.2.826.0.1.3680043.8.498.{uuid.uuid4().int % 10**12}"
+studies = {
+    f"standin-a-{run}": {"uid": f"{uid_root}.1", "series": 2, "instances": 40},
+    f"standin-b-{run}": {"uid": f"{uid_root}.2", "series": 1, "instances": 12},
+}
+a_id, b_id = list(studies)
+gone_id = f"standin-gone-{run}"
+
+# Page 1 (limit 7): A three times, B once, a deleted study, two events of other types.
+# Page 2: A again after more instances arrived, plus a series event.
+feed = [
+    ("NewStudy", "Study", a_id),
+    ("StableStudy", "Study", a_id),
+    ("StableStudy", "Study", a_id),
+    ("NewInstance", "Instance", "standin-instance"),
+    ("StableStudy", "Study", b_id),
+    ("StableStudy", "Study", a_id),
+    ("StableStudy", "Study", gone_id),
+    ("StableStudy", "Study", a_id),
+    ("StableSeries", "Series", "standin-series"),
+]
+changes = [
+    {"Seq": seq, "ChangeType": change, "ResourceType": kind, "ID": orthanc_id, "Path": f"/{kind.lower()}s/{orthanc_id}"}
+    for seq, (change, kind, orthanc_id) in enumerate(feed, start=1)
+]
+requests = Counter()
+
+
+class StandIn(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        requests[url.path] += 1
+        parts = url.path.strip("/").split("/")
+        if parts == ["changes"]:
+            q = parse_qs(url.query)
+            since, limit = int(q["since"][0]), int(q["limit"][0])
+            page = [c for c in changes if c["Seq"] > since][:limit]
+            last = page[-1]["Seq"] if page else changes[-1]["Seq"]
+            return self._json({"Changes": page, "Done": last == changes[-1]["Seq"], "Last": last})
+        if len(parts) >= 2 and parts[0] == "studies" and parts[1] in studies:
+            s = studies[parts[1]]
+            if len(parts) == 2:
+                return self._json({
+                    "ID": parts[1],
+                    "MainDicomTags": {"StudyInstanceUID": s["uid"], "StudyDescription": f"Stand-in {parts[1]}"},
+                    "PatientMainDicomTags": {},
+                    "Series": [f"{parts[1]}-s{i}" for i in range(s["series"])],
+                })
+            if parts[2:] == ["statistics"]:
+                return self._json({"CountSeries": s["series"], "CountInstances": s["instances"]})
+        self.send_response(404)
+        self.end_headers()
+
+    def _json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+# The warmers ask the stand-in for series and instances it does not serve
+logging.getLogger("app.services.study_metadata_service").setLevel(logging.ERROR)
+logging.getLogger("app.services.preview_service").setLevel(logging.ERROR)
+
+server = ThreadingHTTPServer(("127.0.0.1", STANDIN_PORT), StandIn)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+print(f"[1] Orthanc stand-in on :{STANDIN_PORT}, {len(changes)} changes")
+
+
+async def cursor(db) -> int:
+    return (await db.execute(select(OrthancSyncState.last_seq).where(OrthancSyncState.name == FEED))).scalar_one()
+
+
+async def rows() -> dict[str, ImagingStudy]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(ImagingStudy).where(ImagingStudy.study_instance_uid.like(f"{uid_root}.%")))
+        return {s.orthanc_study_id: s for s in result.scalars().all()}
+
+
+async def main():
+    async with AsyncSessionLocal() as db:
+        await OrthancSyncService(db)._lock_cursor()
+        saved_seq = await cursor(db)
+        (await db.execute(select(OrthancSyncState).where(OrthancSyncState.name == FEED))).scalar_one().last_seq = 0
+        await db.commit()
+
+    try:
+        async with AsyncSessionLocal() as db:
+            upserted, done = await OrthancSyncService(db).poll_once()
+            seq = await cursor(db)
+        print(f"[2] page 1: {upserted} upserted, done={done}, cursor={seq}")
+        fetched = {k: requests[f"/studies/{i}/statistics"] for k, i in (("a", a_id), ("b", b_id), ("gone", gone_id))}
+        print(f"    study fetches: {fetched}")
+        assert (upserted, done, seq) == (2, False, 7)
+        assert fetched == {"a": 1, "b": 1, "gone": 1}, "StableStudy events not de-duplicated"
+        first = await rows()
+        assert set(first) == {a_id, b_id}
+        assert (first[a_id].series_count, first[a_id].instances_count) == (2, 40)
+        assert (first[b_id].series_count, first[b_id].instances_count) == (1, 12)
+
+        studies[a_id]["instances"] = 55
+        async with AsyncSessionLocal() as db:
+            upserted, done = await OrthancSyncService(db).poll_once()
+            seq = await cursor(db)
+        print(f"[3] page 2: {upserted} upserted, done={done}, cursor={seq}")
+        assert (upserted, done, seq) == (1, True, 9)
+        assert requests[f"/studies/{a_id}/statistics"] == 2
+        second = await rows()
+        assert second[a_id].id == first[a_id].id and second[a_id].instances_count == 55, "A not updated in place"
+        assert second[a_id].received_at == first[a_id].received_at
+
+        async with AsyncSessionLocal() as db:
+            upserted, done = await OrthancSyncService(db).poll_once()
+            seq = await cursor(db)
+        print(f"[4] drained feed: {upserted} upserted, done={done}, cursor={seq}")
+        assert (upserted, done, seq) == (0, True, 9)
+        print("    OK")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(ImagingStudy).where(ImagingStudy.study_instance_uid.like(f"{uid_root}.%")))
+            (await db.execute(select(OrthancSyncState).where(OrthancSyncState.name == FEED))).scalar_one().last_seq = saved_seq
+            await db.commit()
+        server.shutdown()
+
+
+asyncio.run(main())
@@ -0,0 +1,54 @@
+"""Run one appointment-reminder pass with the local LogChannel stand-ins and report what went out.
+
+Run inside the API container (needs DATABASE_URL). Rolls the reminder_sent
+flags back afterwards so the pass can be repeated; nothing is really sent.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import app.db.base  # noqa: F401
+from app.config import get_settings
+from app.db.session import AsyncSessionLocal
+from app.models.schedule import Appointment
+from app.services.reminder_service import REMINDABLE_STATUSES, LogChannel, ReminderService
+from sqlalchemy import func, select, update
+
+settings = get_settings()
+
+
+async def main():
+    now = datetime.now(timezone.utc)
+    horizon = now + timedelta(hours=settings.reminder_lead_hours)
+    async with AsyncSessionLocal() as db:
+        due = (await db.execute(
+            select(Appointment.id).where(
+                Appointment.reminder_sent.is_(False),
+                Appointment.start_datetime >= now,
+                Appointment.start_datetime < horizon,
+                Appointment.status.in_(REMINDABLE_STATUSES),
+            )
+        )).scalars().all()
+        print(f"[1] {len(due)} appointments due in the next {settings.reminder_lead_hours} h")
+
+    email, phone = LogChannel("email"), LogChannel("phone")
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        stats = await ReminderService(db, [email, phone]).run(now)
+    print(f"[2] {stats} in {time.perf_counter() - start:.2f}s "
+          f"({len(email.sent)} e-mails, {len(phone.sent)} SMS)")
+    for to, subject, body in (email.sent + phone.sent)[:3]:
+        print(f"    {to}: {body}")
+
+    async with AsyncSessionLocal() as db:
+        left = (await db.execute(
+            select(func.count()).select_from(Appointment).where(Appointment.id.in_(due), Appointment.reminder_sent.is_(False))
+        )).scalar()
+        print(f"[3] still unsent: {left} (expected {stats['failed']})")
+        if due:
+            await db.execute(update(Appointment).where(Appointment.id.in_(due)).values(reminder_sent=False))
+            await db.commit()
+        print(f"[4] reset reminder_sent on {len(due)} appointments")
+
+
+asyncio.run(main())
@@ -0,0 +1,66 @@
+"""Build report packets (merged PDF and ZIP) for the last 30 days through the API.
+
+Needs the API and a Celery worker running. Reports whose signed PDF is already
+stored are reused, so the second packet should finish much faster.
+"""
+import io
+import time
+import zipfile
+from datetime import date, timedelta
+
+import httpx
+
+BASE = "http://localhost:8000/api/v1"
+
+
+def build(h: dict, fmt: str, date_from: date, date_to: date) -> bytes:
+    r = httpx.post(f"{BASE}/reports/packets", headers=h,
+                   json={"format": fmt, "date_from": str(date_from), "date_to": str(date_to)})
+    assert r.status_code == 202, f"Packet request failed: {r.status_code} {r.text}"
+    status_url = r.headers["Content-Location"]
+    print(f"    job {r.json()['id']}: {r.json()['total']} reports")
+
+    start = time.perf_counter()
+    while True:
+        r = httpx.get(status_url, headers=h)
+        if r.status_code == 202:
+            print(f"    {r.headers['X-Progress']}")
+            time.sleep(1)
+            continue
+        break
+    job = r.json()
+    assert job["status"] == "completed", f"Packet {job['status']}: {job['error']}"
+    print(f"    completed in {time.perf_counter() - start:.2f}s")
+
+    r = httpx.get(f"{status_url}/download", headers=h, timeout=60)
+    assert r.status_code == 200, f"Download failed: {r.status_code}"
+    httpx.delete(status_url, headers=h)
+    return r.content
+
+
+def main():
+    r = httpx.post(f"{BASE}/auth/login", json={"username": "radiologo", "password": "Radiologo123!"})
+    assert r.status_code == 200, f"Login failed: {r.text}"
+    h = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    date_to = date.today()
+    date_from = date_to - timedelta(days=30)
+
+    print(f"[1] PDF packet {date_from} .. {date_to}")
+    pdf = build(h, "pdf", date_from, date_to)
+    assert pdf.startswith(b"%PDF"), "Not a PDF"
+    print(f"    {len(pdf)} bytes -> OK")
+
+    print(f"[2] ZIP packet {date_from} .. {date_to} (PDFs already stored)")
+    data = build(h, "zip", date_from, date_to)
+    names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+    print(f"    {len(names)} PDFs, e.g. {names[:3]} -> OK")
+
+    print("[3] Request without a filter is rejected")
+    r = httpx.post(f"{BASE}/reports/packets", headers=h, json={"format": "pdf"})
+    assert r.status_code == 400, r.text
+    print("    400 -> OK")
+
+
+if __name__ == "__main__":
+    main()
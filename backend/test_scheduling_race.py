@@ -0,0 +1,65 @@
+"""Concurrent double-booking stress test for the appointment exclusion constraints.
+
+Fires CONCURRENCY simultaneous POST /appointments for the same slot, first on
+one resource with different patients, then for one patient with no resource.
+Exactly one request per round may win (201); every other one must get a 409,
+never a 500 and never a second booking. Winners are cancelled afterwards.
+
+    BASE=http://localhost:8000 CONCURRENCY=20 python test_scheduling_race.py
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+BASE = os.environ.get("BASE", "http://localhost:8000")
+API = f"{BASE}/api/v1"
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "20"))
+
+
+async def round_(client: httpx.AsyncClient, label: str, payloads: list[dict]) -> list[int]:
+    responses = await asyncio.gather(*(client.post(f"{API}/appointments", json=p) for p in payloads))
+    codes = [r.status_code for r in responses]
+    won = [r.json()["id"] for r in responses if r.status_code == 201]
+    others = sorted(set(c for c in codes if c != 201))
+    ok = len(won) == 1 and others in ([409], [])
+    print(f"  {label}: {codes.count(201)} booked, {codes.count(409)} conflicts, other={others} -> {'OK' if ok else 'FAIL'}")
+    return won
+
+
+async def main():
+    async with httpx.AsyncClient(timeout=30) as client:
+        token = (await client.post(f"{API}/auth/login", json={"username": "admin", "password": "Admin123!"})).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        resources = (await client.get(f"{API}/resources")).json()
+        patients = (await client.get(f"{API}/patients", params={"page_size": 100})).json()["items"]
+        if not resources or len(patients) < 2:
+            print("Need at least one resource and two patients")
+            return
+        resource = resources[0]
+
+        # A slot inside operating hours, far enough ahead to be free
+        day = datetime.now(timezone.utc) + timedelta(days=300)
+        hour = max(resource.get("operating_start_hour", 8), 8)
+        start = day.replace(hour=hour, minute=0, second=0, microsecond=0)
+        print(f"[1] {CONCURRENCY} concurrent bookings per round, from {start.isoformat()}")
+
+        booked = await round_(client, f"same resource '{resource['name']}'", [
+            {"patient_id": patients[i % len(patients)]["id"], "resource_id": resource["id"],
+             "start_datetime": start.isoformat(), "duration_minutes": 30}
+            for i in range(CONCURRENCY)
+        ])
+        booked += await round_(client, f"same patient {patients[1]['id']}", [
+            {"patient_id": patients[1]["id"], "start_datetime": (start + timedelta(hours=2)).isoformat(),
+             "duration_minutes": 45}
+            for _ in range(CONCURRENCY)
+        ])
+
+        for appt_id in booked:
+            await client.put(f"{API}/appointments/{appt_id}", json={"status": "cancelled"})
+        print(f"[2] cancelled {len(booked)} test appointments")
+
+
+asyncio.run(main())
@@ -15,4 +15,10 @@ export const notificationsApi = {
   unreadCount: () => apiClient.get<{ count: number }>('/notifications/unread-count').then((r) => r.data.count),
   markRead: (id: number) => apiClient.put(`/notifications/${id}/read`),
   markAllRead: () => apiClient.put('/notifications/read-all'),
+  // EventSource cannot send headers: the stream is opened with a short-lived,
+  // stream-only token in the query string, never the access token
+  streamToken: () =>
+    apiClient.post<{ token: string; expires_in: number }>('/notifications/stream-token').then((r) => r.data.token),
+  streamUrl: (token: string) =>
+    `${apiClient.defaults.baseURL}/notifications/stream?token=${encodeURIComponent(token)}`,
 }
@@ -3,24 +3,55 @@ import { useNavigate } from 'react-router-dom'
 import { Bell, Check, CheckCheck } from 'lucide-react'
 import { clsx } from 'clsx'
 import { notificationsApi, type Notification } from '@/api/notifications'
+import { useAuthStore } from '@/store/authStore'
 
 export default function NotificationBell() {
   const navigate = useNavigate()
+  const accessToken = useAuthStore((s) => s.accessToken)
   const [open, setOpen] = useState(false)
   const [unread, setUnread] = useState(0)
   const [items, setItems] = useState<Notification[]>([])
   const [loading, setLoading] = useState(false)
   const ref = useRef<HTMLDivElement>(null)
 
-  // Poll unread count every 30s
+  // Server push: the unread count on connect and on every change, plus new notifications
   useEffect(() => {
-    const fetch = () => {
-      notificationsApi.unreadCount().then(setUnread).catch(() => {})
+    if (!accessToken) return
+    let source: EventSource | null = null
+    let retry: ReturnType<typeof setTimeout> | undefined
+    let cancelled = false
+    const connect = async () => {
+      let token: string
+      try {
+        token = await notificationsApi.streamToken()
+      } catch {
+        retry = setTimeout(connect, 30_000)
+        return
+      }
+      if (cancelled) return
+      source = new EventSource(notificationsApi.streamUrl(token))
+      source.addEventListener('unread', (e) => {
+        setUnread(JSON.parse((e as MessageEvent).data).count)
+      })
+      source.addEventListener('notification', (e) => {
+        const n: Notification = JSON.parse((e as MessageEvent).data)
+        setItems(prev => [n, ...prev.filter(i => i.id !== n.id)].slice(0, 20))
+      })
+      source.onerror = () => {
+        // The stream token has expired by now, so the browser's own reconnect
+        // would be refused: reconnect with a fresh token instead
+        source?.close()
+        notificationsApi.unreadCount().then(setUnread).catch(() => {})
+        retry = setTimeout(connect, 5_000)
+      }
     }
-    fetch()
-    const interval = setInterval(fetch, 30_000)
-    return () => clearInterval(interval)
-  }, [])
+    connect()
+    return () => {
+      cancelled = true
+      source?.close()
+      clearTimeout(retry)
+    }
+  }, [accessToken])
 
   // Close on outside click
   useEffect(() => {